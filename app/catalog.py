@@ -0,0 +1,208 @@
+"""
+Immutable scheme catalog - scheme master and details joined once at load time
+"""
+
+import json
+import sys
+from types import MappingProxyType
+from typing import Any, Iterable
+
+from app.catalog_snapshot import LIST_FIELDS, CatalogSnapshot, SnapshotRow
+from app.eligibility_matrix import EligibilityMatrix
+from app.search_index import SchemeSearchIndex, field_tokens
+
+# All public scheme fields, in dict order
+FIELDS = (
+    "scheme_id",
+    "scheme_name",
+    "state",
+    "objective",
+    "tags",
+    "benefits",
+    "eligibility",
+    "documents_required",
+    "source_url",
+)
+
+
+def _intern(value: str | None) -> str:
+    """Intern short repeated strings (state names, tags) so schemes share one copy."""
+    return sys.intern(value) if value else ""
+
+
+class Scheme:
+    """
+    Read-only scheme record with master and detail fields already joined.
+
+    Hot fields (id, name, state, tags, url) are stored on the record. Cold
+    fields (objective, benefits, eligibility, documents) are either an
+    in-memory tuple or a lazy SnapshotRow decoded from the mmapped snapshot.
+    """
+
+    __slots__ = ("scheme_id", "scheme_name", "state", "tags", "source_url", "_cold")
+
+    def __init__(self, scheme_id: int, scheme_name: str, state: str, tags, source_url: str, cold):
+        setter = object.__setattr__
+        setter(self, "scheme_id", scheme_id)
+        setter(self, "scheme_name", scheme_name or "")
+        setter(self, "state", _intern(state))
+        setter(self, "tags", tuple(_intern(t) for t in tags or ()))
+        setter(self, "source_url", source_url or "")
+        setter(self, "_cold", cold)
+
+    @classmethod
+    def from_tables(cls, master: dict[str, Any], details: dict[str, Any]) -> "Scheme":
+        """Build a record from one scheme master row and its scheme details row."""
+        cold = (
+            details.get("objective") or "",
+            tuple(details.get("benefits") or []),
+            tuple(details.get("eligibility") or []),
+            tuple(details.get("documents_required") or []),
+        )
+        return cls(
+            master.get("scheme_id"),
+            master.get("scheme_name"),
+            details.get("state"),
+            details.get("tags"),
+            details.get("source_url"),
+            cold,
+        )
+
+    @property
+    def objective(self) -> str:
+        return self._cold[0]
+
+    @property
+    def benefits(self) -> tuple[str, ...]:
+        return self._cold[1]
+
+    @property
+    def eligibility(self) -> tuple[str, ...]:
+        return self._cold[2]
+
+    @property
+    def documents_required(self) -> tuple[str, ...]:
+        return self._cold[3]
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Scheme records are read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError("Scheme records are read-only")
+
+    def __repr__(self) -> str:
+        return f"Scheme({self.scheme_id}, {self.scheme_name!r})"
+
+    def get(self, key: str, default=None):
+        """Dict-style field access so records can be read like the old JSON dicts."""
+        if key in FIELDS:
+            return getattr(self, key)
+        return default
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return a fresh, caller-owned dict copy of this scheme."""
+        result = {}
+        for key in FIELDS:
+            value = getattr(self, key)
+            result[key] = list(value) if key in LIST_FIELDS else value
+        return result
+
+
+class SchemeCatalog:
+    """
+    All schemes joined into immutable records, with lookup and search indexes.
+
+    Callers get read-only views (tuples / mapping proxies); use
+    Scheme.to_dict() when a mutable copy is needed.
+
+    `tokens` are precomputed {field: tokens} rows aligned with `schemes`
+    (a snapshot's token table); without them the search fields are
+    tokenized from the records. `rules` come from the compiled rules file
+    only - schemes it does not cover have no rules and stay undecided.
+    """
+
+    def __init__(self, schemes: list[Scheme], rules: dict[int, dict[str, Any]] | None = None,
+                 tokens: Iterable[dict[str, list[str]]] | None = None):
+        # Set by CatalogManager before the catalog is published
+        self.version = 0
+        self.schemes: tuple[Scheme, ...] = tuple(schemes)
+        by_id: dict[int, Scheme] = {}
+        id_by_name: dict[str, int] = {}
+        for scheme in self.schemes:
+            by_id.setdefault(scheme.scheme_id, scheme)
+            name = scheme.scheme_name.strip().lower()
+            if name:
+                id_by_name.setdefault(name, scheme.scheme_id)
+        self.by_id = MappingProxyType(by_id)
+        self.id_by_name = MappingProxyType(id_by_name)
+        # Token rows feed both the search index and the eligibility matrix, then are dropped
+        if tokens is None:
+            tokens = [field_tokens(scheme) for scheme in self.schemes]
+        else:
+            tokens = list(tokens)
+        self.index = SchemeSearchIndex.from_tokens(
+            (scheme.scheme_id, row) for scheme, row in zip(self.schemes, tokens)
+        )
+
+        # Structured eligibility rules, precompiled by data/compile_rules.py
+        rules = rules or {}
+        self.rules = MappingProxyType({
+            scheme_id: rules[scheme_id] for scheme_id in by_id if scheme_id in rules
+        })
+
+        # Scheme x feature matrix for the eligibility shortlist. Built here, so a
+        # reload pays for it in the reload thread before the catalog is published
+        self.eligibility_matrix = EligibilityMatrix(self.schemes, self.rules, tokens)
+
+    def __len__(self) -> int:
+        return len(self.schemes)
+
+    def get(self, scheme_id: int) -> Scheme | None:
+        """Primary key lookup."""
+        return self.by_id.get(scheme_id)
+
+    def get_by_name(self, scheme_name: str) -> Scheme | None:
+        """Exact (case-insensitive) scheme name lookup."""
+        scheme_id = self.id_by_name.get(scheme_name.strip().lower())
+        return self.by_id.get(scheme_id) if scheme_id is not None else None
+
+    @classmethod
+    def from_tables(cls, master: list[dict[str, Any]], details: list[dict[str, Any]],
+                    rules: dict[int, dict[str, Any]] | None = None) -> "SchemeCatalog":
+        """JOIN scheme master with scheme details on scheme_id (master order)."""
+        details_dict: dict[int, dict[str, Any]] = {}
+        for detail in details:
+            details_dict.setdefault(detail.get("scheme_id"), detail)
+        schemes = [
+            Scheme.from_tables(entry, details_dict[entry.get("scheme_id")])
+            for entry in master
+            if entry.get("scheme_id") in details_dict
+        ]
+        return cls(schemes, rules)
+
+    @classmethod
+    def from_json(cls, master_path: str, details_path: str,
+                  rules: dict[int, dict[str, Any]] | None = None) -> "SchemeCatalog":
+        """Load scheme_master.json + scheme_details.json into a catalog."""
+        with open(master_path, "r", encoding="utf-8") as f:
+            master = json.load(f)
+        with open(details_path, "r", encoding="utf-8") as f:
+            details = json.load(f)
+        return cls.from_tables(master, details, rules)
+
+    @classmethod
+    def from_snapshot(cls, path: str, rules: dict[int, dict[str, Any]] | None = None) -> "SchemeCatalog":
+        """Map a compiled snapshot; cold fields stay on disk until accessed, search uses its token table."""
+        snapshot = CatalogSnapshot(path)
+        schemes = []
+        for row in range(len(snapshot)):
+            hot = snapshot.hot_fields(row)
+            schemes.append(Scheme(
+                hot["scheme_id"],
+                hot["scheme_name"],
+                hot["state"],
+                hot["tags"],
+                hot["source_url"],
+                SnapshotRow(snapshot, row),
+            ))
+        return cls(schemes, rules, (snapshot.field_tokens(row) for row in range(len(snapshot))))
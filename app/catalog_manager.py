@@ -0,0 +1,149 @@
+"""
+Catalog manager - owns the live SchemeCatalog and hot-reloads it from disk
+"""
+
+import os
+import threading
+import time
+
+from app.catalog import SchemeCatalog
+from app.eligibility_rules import StaleRulesError, load_rules, source_digest
+
+
+class CatalogManager:
+    """
+    Holds a versioned reference to the current SchemeCatalog.
+
+    Reloads build a complete new catalog (records + indexes) off to the side
+    and then swap the reference in one assignment. Callers that grabbed a
+    catalog with get() keep using that snapshot until they are done.
+    """
+
+    def __init__(self, master_path: str, details_path: str, snapshot_path: str | None = None,
+                 rules_path: str | None = None, rules_required: bool = False):
+        self.master_path = master_path
+        self.details_path = details_path
+        self.snapshot_path = snapshot_path
+        self.rules_path = rules_path
+        self.rules_required = rules_required
+        self._current: SchemeCatalog | None = None
+        self._version = 0
+        self._reload_lock = threading.Lock()
+        self._watch_thread: threading.Thread | None = None
+        self._watch_stop = threading.Event()
+        self._source_mtimes: tuple = ()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def loaded(self) -> bool:
+        """True once a catalog has been loaded successfully."""
+        return self._current is not None
+
+    def _source_paths(self) -> tuple[str, ...]:
+        paths = [self.master_path, self.details_path]
+        for path in (self.snapshot_path, self.rules_path):
+            if path:
+                paths.append(path)
+        return tuple(paths)
+
+    def _read_mtimes(self) -> tuple:
+        return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in self._source_paths())
+
+    def _is_fresh(self, path: str | None) -> bool:
+        """True if a compiled artifact exists and is not older than its JSON sources."""
+        if not path or not os.path.exists(path):
+            return False
+        compiled_mtime = os.path.getmtime(path)
+        return all(
+            not os.path.exists(p) or os.path.getmtime(p) <= compiled_mtime
+            for p in (self.master_path, self.details_path)
+        )
+
+    def _load_rules(self) -> dict | None:
+        """
+        Precompiled rules, if they were compiled from the current scheme
+        details (checked by content hash). Otherwise every scheme is left to
+        the LLM - or, with RULES_REQUIRED, the load fails.
+        """
+        try:
+            if not self.rules_path:
+                raise FileNotFoundError("no rules path configured")
+            return load_rules(self.rules_path, source_digest(self.details_path))
+        except (OSError, StaleRulesError) as e:
+            if self.rules_required:
+                raise
+            print(f"[CATALOG] WARNING: rule engine disabled ({e}); run data/compile_rules.py")
+            return None
+
+    def _build(self) -> tuple[SchemeCatalog, str]:
+        """Build a new catalog, preferring the compiled snapshot and rules when up to date."""
+        rules = self._load_rules()
+        if self._is_fresh(self.snapshot_path):
+            return SchemeCatalog.from_snapshot(self.snapshot_path, rules), self.snapshot_path
+        return SchemeCatalog.from_json(self.master_path, self.details_path, rules), "JSON tables"
+
+    def get(self) -> SchemeCatalog:
+        """Return the current catalog, loading it on first use."""
+        catalog = self._current
+        if catalog is None:
+            with self._reload_lock:
+                if self._current is None:
+                    self._load_locked()
+                catalog = self._current
+        return catalog
+
+    def reload(self) -> SchemeCatalog:
+        """Rebuild the catalog from disk and atomically swap it in (blocking)."""
+        with self._reload_lock:
+            return self._load_locked()
+
+    def _load_locked(self) -> SchemeCatalog:
+        mtimes = self._read_mtimes()
+        started = time.perf_counter()
+        catalog, source = self._build()
+        catalog.version = self._version + 1
+
+        # Single reference assignment - readers see either the old or the new catalog
+        self._current = catalog
+        self._version = catalog.version
+        self._source_mtimes = mtimes
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(f"[CATALOG] v{catalog.version}: loaded {len(catalog)} schemes from {source}, "
+              f"{len(catalog.index.vocabulary)} search tokens, {len(catalog.eligibility_matrix.features)} eligibility features, "
+              f"{sum(1 for r in catalog.rules.values() if r['compiled'])} fully compiled rule sets "
+              f"in {elapsed_ms:.0f} ms")
+        return catalog
+
+    def reload_if_changed(self) -> bool:
+        """Reload when any data file changed since the last load."""
+        if self._read_mtimes() == self._source_mtimes:
+            return False
+        try:
+            self.reload()
+            return True
+        except Exception as e:
+            # Keep serving the previous catalog if the new files are broken
+            print(f"[CATALOG] Reload failed, keeping v{self._version}: {e}")
+            return False
+
+    def start_watching(self, interval: float) -> None:
+        """Poll the data files from a daemon thread and hot-reload on change."""
+        if self._watch_thread is not None or interval <= 0:
+            return
+        self._watch_stop.clear()
+
+        def watch():
+            while not self._watch_stop.wait(interval):
+                self.reload_if_changed()
+
+        self._watch_thread = threading.Thread(target=watch, name="catalog-watcher", daemon=True)
+        self._watch_thread.start()
+        print(f"[CATALOG] Watching data files every {interval:g}s")
+
+    def stop_watching(self) -> None:
+        self._watch_stop.set()
+        self._watch_thread = None
@@ -0,0 +1,206 @@
+"""
+Compiled binary snapshot of the scheme catalog.
+
+Layout (little-endian):
+    header      magic "MSSC", format version, scheme count, hot/cold blob
+                and token table offsets
+    records     one fixed-width row per scheme: scheme_id + (offset, length)
+                of every field inside its blob + (offset, count) of every
+                search field's tokens inside the token ids
+    hot blob    UTF-8 strings of fields needed for listing
+    cold blob   UTF-8 strings only needed when a scheme is actually shown
+    token table vocabulary size in bytes and token id count, the vocabulary
+                as newline-joined UTF-8 words, then uint32 token ids
+
+List fields are stored as one string joined with LIST_SEPARATOR. The
+runtime memory-maps the file, decodes hot fields and the token table at
+load time (enough to build the search index) and decodes cold fields on
+first access.
+"""
+
+import mmap
+import os
+import struct
+import sys
+from array import array
+from typing import Any
+
+from app.search_index import SEARCH_FIELDS, field_tokens
+
+SNAPSHOT_MAGIC = b"MSSC"
+SNAPSHOT_VERSION = 2
+
+HOT_FIELDS = ("scheme_name", "state", "tags", "source_url")
+COLD_FIELDS = ("objective", "benefits", "eligibility", "documents_required")
+LIST_FIELDS = ("tags", "benefits", "eligibility", "documents_required")
+LIST_SEPARATOR = "\x1f"
+
+# magic, version, reserved, scheme count, hot blob offset, cold blob offset, token table offset
+_HEADER = struct.Struct("<4sHHIQQQ")
+# scheme_id, (offset, length) for every hot then cold field, (offset, count) for every search field
+_RECORD = struct.Struct("<I" + "II" * (len(HOT_FIELDS) + len(COLD_FIELDS) + len(SEARCH_FIELDS)))
+# vocabulary bytes, token id count
+_TOKEN_TABLE = struct.Struct("<II")
+_TOKEN_BASE = 1 + 2 * (len(HOT_FIELDS) + len(COLD_FIELDS))
+
+
+def _encode_field(field: str, value: Any) -> bytes:
+    if field in LIST_FIELDS:
+        value = LIST_SEPARATOR.join(value or [])
+    return (value or "").encode("utf-8")
+
+
+def _decode_field(field: str, raw: bytes) -> Any:
+    text = raw.decode("utf-8")
+    if field in LIST_FIELDS:
+        return tuple(text.split(LIST_SEPARATOR)) if text else ()
+    return text
+
+
+def write_snapshot(schemes: list[dict[str, Any]], path: str) -> None:
+    """
+    Write joined scheme dicts (master + details fields) as a binary snapshot.
+
+    The file is written next to the target and renamed into place, so a
+    running bot never maps a half-written snapshot.
+    """
+    hot_blob = bytearray()
+    cold_blob = bytearray()
+    token_ids = array("I")
+    vocabulary: dict[str, int] = {}
+    records = []
+
+    for scheme in schemes:
+        row = [int(scheme["scheme_id"])]
+        for fields, blob in ((HOT_FIELDS, hot_blob), (COLD_FIELDS, cold_blob)):
+            for field in fields:
+                encoded = _encode_field(field, scheme.get(field))
+                row.extend((len(blob), len(encoded)))
+                blob.extend(encoded)
+        tokens_by_field = field_tokens(scheme)
+        for field in SEARCH_FIELDS:
+            tokens = tokens_by_field[field]
+            row.extend((len(token_ids), len(tokens)))
+            token_ids.extend(vocabulary.setdefault(t, len(vocabulary)) for t in tokens)
+        records.append(_RECORD.pack(*row))
+
+    if sys.byteorder != "little":
+        token_ids.byteswap()
+    vocabulary_blob = "\n".join(vocabulary).encode("utf-8")
+
+    hot_offset = _HEADER.size + _RECORD.size * len(records)
+    cold_offset = hot_offset + len(hot_blob)
+    token_offset = cold_offset + len(cold_blob)
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, len(records), hot_offset, cold_offset, token_offset)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for record in records:
+            f.write(record)
+        f.write(hot_blob)
+        f.write(cold_blob)
+        f.write(_TOKEN_TABLE.pack(len(vocabulary_blob), len(token_ids)))
+        f.write(vocabulary_blob)
+        f.write(token_ids.tobytes())
+    os.replace(tmp_path, path)
+
+
+_MISSING = object()
+
+
+class SnapshotRow:
+    """
+    Lazy handle on one scheme's cold fields; indexed like a COLD_FIELDS tuple.
+
+    Each field is decoded on first access and kept, so repeated reads
+    (formatting, eligibility prompts) do not decode it again.
+    """
+
+    __slots__ = ("snapshot", "row", "_fields")
+
+    def __init__(self, snapshot: "CatalogSnapshot", row: int):
+        self.snapshot = snapshot
+        self.row = row
+        self._fields = [_MISSING] * len(COLD_FIELDS)
+
+    def __getitem__(self, position: int) -> Any:
+        value = self._fields[position]
+        if value is _MISSING:
+            # Concurrent first reads decode the same immutable value; either copy may win
+            value = self._fields[position] = self.snapshot.cold_field(self.row, position)
+        return value
+
+
+class CatalogSnapshot:
+    """Memory-mapped reader for a compiled catalog snapshot."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = struct.unpack_from("<4sH", self._mmap, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            self._mmap.close()
+            raise ValueError(f"Unsupported catalog snapshot {path} (magic={magic!r}, version={version})")
+
+        _, _, _, count, hot_offset, cold_offset, token_offset = _HEADER.unpack_from(self._mmap, 0)
+        self.count = count
+        self._hot_offset = hot_offset
+        self._cold_offset = cold_offset
+        self._token_offset = token_offset
+        self._vocabulary: list[str] | None = None
+        self._token_ids: array | None = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _record(self, row: int) -> tuple:
+        return _RECORD.unpack_from(self._mmap, _HEADER.size + row * _RECORD.size)
+
+    def hot_fields(self, row: int) -> dict[str, Any]:
+        """Decode scheme_id and all hot fields of one row."""
+        record = self._record(row)
+        result = {"scheme_id": record[0]}
+        for i, field in enumerate(HOT_FIELDS):
+            offset, length = record[1 + 2 * i], record[2 + 2 * i]
+            start = self._hot_offset + offset
+            result[field] = _decode_field(field, self._mmap[start:start + length])
+        return result
+
+    def _load_token_table(self) -> None:
+        vocabulary_size, id_count = _TOKEN_TABLE.unpack_from(self._mmap, self._token_offset)
+        start = self._token_offset + _TOKEN_TABLE.size
+        vocabulary = self._mmap[start:start + vocabulary_size].decode("utf-8")
+        self._vocabulary = vocabulary.split("\n") if vocabulary else []
+        start += vocabulary_size
+        token_ids = array("I")
+        token_ids.frombytes(self._mmap[start:start + id_count * token_ids.itemsize])
+        if sys.byteorder != "little":
+            token_ids.byteswap()
+        self._token_ids = token_ids
+
+    def field_tokens(self, row: int) -> dict[str, list[str]]:
+        """{field: tokens} of the search fields of one row, from the token table (no text decoding)."""
+        if self._token_ids is None:
+            self._load_token_table()
+        record = self._record(row)
+        vocabulary, token_ids = self._vocabulary, self._token_ids
+        result = {}
+        for i, field in enumerate(SEARCH_FIELDS):
+            offset, count = record[_TOKEN_BASE + 2 * i], record[_TOKEN_BASE + 1 + 2 * i]
+            result[field] = [vocabulary[t] for t in token_ids[offset:offset + count]]
+        return result
+
+    def cold_field(self, row: int, position: int) -> Any:
+        """Decode one cold field (COLD_FIELDS[position]) of one row."""
+        record = self._record(row)
+        base = 1 + 2 * (len(HOT_FIELDS) + position)
+        offset, length = record[base], record[base + 1]
+        start = self._cold_offset + offset
+        return _decode_field(COLD_FIELDS[position], self._mmap[start:start + length])
+
+    def close(self) -> None:
+        self._vocabulary = self._token_ids = None
+        self._mmap.close()
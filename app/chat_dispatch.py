@@ -0,0 +1,92 @@
+"""
+Concurrent update processing that keeps each chat's updates in order
+"""
+
+import asyncio
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def chat_key(update: object) -> str | None:
+    """Chat an update belongs to (as the str used for session ids), or None."""
+    if isinstance(update, Update) and update.effective_chat is not None:
+        return str(update.effective_chat.id)
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Handles updates from different chats concurrently, and updates from
+    one chat one at a time, in the order they arrived.
+
+    Each chat gets an asyncio.Lock (FIFO) while it has updates in flight;
+    it is dropped as soon as the last one finishes, so idle chats cost
+    nothing. At most `max_concurrent_updates` handlers run at once. The
+    limit is taken *after* the chat lock, so a burst from one chat waits
+    on its own lock instead of occupying slots other chats could use;
+    `max_pending_updates` caps how many updates may wait in total.
+    """
+
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: int | None = None):
+        super().__init__(max_pending_updates or max_concurrent_updates * 32)
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._locks: dict[str, asyncio.Lock] = {}
+        # chat -> updates holding or waiting for its lock
+        self._waiters: dict[str, int] = {}
+        self.running = 0
+        self.processed = 0
+        self.queued = 0
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    def active_chats(self) -> set[str]:
+        """Chats with an update being handled or waiting."""
+        return set(self._locks)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = chat_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+            self._waiters[key] = 0
+        elif lock.locked():
+            self.queued += 1
+        self._waiters[key] += 1
+        try:
+            async with lock:
+                await self._run(coroutine)
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._running:
+            self.running += 1
+            try:
+                await coroutine
+            finally:
+                self.running -= 1
+                self.processed += 1
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "chats": len(self._locks),
+            "processed": self.processed,
+            "queued": self.queued,
+        }
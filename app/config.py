@@ -9,3 +9,84 @@ TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
 
 MODEL_NAME = os.getenv("MODEL_NAME", "llama-3.1-8b-instant")
 SCHEME_JSON_PATH = os.getenv("SCHEME_JSON_PATH", "data/final_structured_schemes.json")
+SCHEME_SNAPSHOT_PATH = os.getenv("SCHEME_SNAPSHOT_PATH", "data/scheme_catalog.bin")
+SCHEME_RULES_PATH = os.getenv("SCHEME_RULES_PATH", "data/scheme_rules.json")
+# Refuse to load the catalog when the rules file is missing or compiled from other scheme details
+RULES_REQUIRED = os.getenv("RULES_REQUIRED", "false").lower() in ("1", "true", "yes")
+# Offline Indic-script / romanized -> English search term lexicon
+INDIC_LEXICON_PATH = os.getenv("INDIC_LEXICON_PATH", "data/indic_lexicon.json")
+
+# Hot reload: poll data files every N seconds (0 disables); /reload is limited to these chats
+CATALOG_WATCH_INTERVAL = float(os.getenv("CATALOG_WATCH_INTERVAL", "60"))
+ADMIN_CHAT_IDS = {c.strip() for c in os.getenv("ADMIN_CHAT_IDS", "").split(",") if c.strip()}
+
+# Eligibility matching LLM deadline (seconds)
+ELIGIBILITY_LLM_TIMEOUT = float(os.getenv("ELIGIBILITY_LLM_TIMEOUT", "20"))
+# Catalog size above which search / eligibility CPU work runs in a worker thread
+CATALOG_OFFLOAD_THRESHOLD = int(os.getenv("CATALOG_OFFLOAD_THRESHOLD", "500"))
+
+# Web search (Tavily): hard deadline, hedged duplicate request delay, and how long the
+# web search waits for local results before sending a paid request (all seconds)
+WEB_SEARCH_DEADLINE = float(os.getenv("WEB_SEARCH_DEADLINE", "4"))
+WEB_SEARCH_HEDGE_DELAY = float(os.getenv("WEB_SEARCH_HEDGE_DELAY", "1.5"))
+WEB_SEARCH_START_DELAY = float(os.getenv("WEB_SEARCH_START_DELAY", "0.2"))
+# Local BM25 score at which local results are good enough to skip the web search
+LOCAL_SEARCH_MIN_SCORE = float(os.getenv("LOCAL_SEARCH_MIN_SCORE", "0.5"))
+
+# AI eligibility result cache: max entries and time-to-live (seconds)
+ELIGIBILITY_CACHE_SIZE = int(os.getenv("ELIGIBILITY_CACHE_SIZE", "2048"))
+ELIGIBILITY_CACHE_TTL = float(os.getenv("ELIGIBILITY_CACHE_TTL", "3600"))
+
+# Eligibility LLM micro-batching: collect requests for N ms (0 disables) or until the batch is full
+ELIGIBILITY_BATCH_WINDOW_MS = float(os.getenv("ELIGIBILITY_BATCH_WINDOW_MS", "0"))
+ELIGIBILITY_BATCH_MAX = int(os.getenv("ELIGIBILITY_BATCH_MAX", "8"))
+
+# Prompt token budgets per section (estimated locally, see app/prompt_builder.py)
+PROMPT_BUDGETS = {
+    "profile": int(os.getenv("PROMPT_PROFILE_TOKENS", "120")),
+    "history": int(os.getenv("PROMPT_HISTORY_TOKENS", "250")),
+    "summary": int(os.getenv("PROMPT_SUMMARY_TOKENS", "100")),
+    "schemes": int(os.getenv("PROMPT_SCHEMES_TOKENS", "600")),
+}
+
+# Shared LLM gateway: concurrent calls, requests/tokens per minute (0 = unlimited), retries
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_RPM = float(os.getenv("LLM_RPM", "30"))
+LLM_TPM = float(os.getenv("LLM_TPM", "6000"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+
+# Stream general / greeting replies by editing one message (min seconds between edits).
+# Streamed replies are not coalesced across chats; turn off to share identical general answers
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "true").lower() in ("1", "true", "yes")
+STREAM_EDIT_INTERVAL = float(os.getenv("STREAM_EDIT_INTERVAL", "1.0"))
+
+# Session persistence: SQLite file for profiles / chat memory ("" keeps sessions in memory only)
+# and how long changes are batched before being written back (seconds)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sessions.db")
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "2"))
+
+# Bounded session memory: messages kept per chat (ring buffers), sessions kept in memory,
+# idle time before a session is evicted (seconds; it is reloaded from SESSION_DB_PATH on
+# the next message, or forgotten without a database) and how often the sweeper runs
+CHAT_MEMORY_LIMIT = int(os.getenv("CHAT_MEMORY_LIMIT", "30"))
+PROFILE_RAW_TEXT_LIMIT = int(os.getenv("PROFILE_RAW_TEXT_LIMIT", "10"))
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "5000"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "60"))
+
+# Updates handled at once (different chats run concurrently; one chat's updates run in order)
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "16"))
+
+# "polling" (long-poll Telegram, health route on a Flask thread) or "webhook" (one aiohttp server
+# receives updates at WEBHOOK_URL + WEBHOOK_PATH; an empty WEBHOOK_SECRET picks a random one per start)
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+# HTTP port for the health route / webhook (assigned by the host, e.g. Render)
+PORT = int(os.getenv("PORT", "8080"))
+
+# /readyz fails while the event loop runs timers later than this (seconds); lag is sampled every
+# LOOP_LAG_INTERVAL seconds
+READY_MAX_LOOP_LAG = float(os.getenv("READY_MAX_LOOP_LAG", "2.0"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "1.0"))
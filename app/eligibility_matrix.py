@@ -0,0 +1,301 @@
+"""
+Scheme x feature matrix used to shortlist schemes for the eligibility LLM.
+
+Every scheme becomes a weighted 0/1 row over a small feature vocabulary
+(state, gender, occupation, age band, disability, caste and tag words).
+A user profile becomes a vector over the same features - 1 for what the
+user is, a negative weight for what the profile contradicts (the other
+gender, disability schemes for users who did not report one) - so a
+single matrix-vector product scores the whole catalog and argpartition
+picks the top-k without sorting every scheme. Schemes limited to other
+states than the user's are masked out entirely.
+
+Rows have a few dozen features at most while tag words grow with the
+catalog, so the matrix is stored sparse (one (row, column, weight) entry
+per set feature): memory and scoring are O(entries), not schemes x
+features.
+"""
+
+import re
+from typing import Any, Iterable
+
+import numpy as np
+
+from app.india import NORTH_EASTERN_STATES, STATES_AND_UTS
+from app.search_index import field_tokens
+
+# Weight of a matching feature, by feature group
+FEATURE_WEIGHTS = {
+    "state": 3.0,
+    "gender": 2.0,
+    "occupation": 2.0,
+    "age": 1.5,
+    "disability": 2.0,
+    "caste": 1.5,
+    "tag": 1.0,
+}
+
+GENDER_KEYWORDS = {
+    "female": {"woman", "women", "girl", "girls", "female", "widow", "widows", "mother", "mothers"},
+    "male": {"man", "men", "boy", "boys", "male"},
+}
+
+OCCUPATION_KEYWORDS = {
+    "student": {"student", "students", "scholarship", "school", "college", "education", "study"},
+    "farmer": {"farmer", "farmers", "agriculture", "agricultural", "kisan", "crop", "crops", "grower", "growers"},
+    "business": {"business", "businessman", "entrepreneur", "entrepreneurship", "enterprise", "startup", "self"},
+    "unemployed": {"unemployed", "unemployment", "jobless"},
+    "laborer": {"labour", "labourer", "labourers", "laborer", "worker", "workers", "construction"},
+    "retired": {"retired", "pensioner", "pensioners"},
+    "employee": {"employee", "employees", "salaried"},
+    "teacher": {"teacher", "teachers"},
+}
+
+# Profile vector entry for a feature the profile contradicts (scores weight x penalty)
+CONTRADICTION_PENALTY = {
+    "gender": -2.0,
+    # Profiles only ever record "Yes", so a missing answer only down-weights
+    "disability": -0.5,
+}
+
+# Profile occupation values that share a feature
+OCCUPATION_ALIASES = {"businessman": "business", "self-employed": "business"}
+
+AGE_BANDS = (
+    ("child", 0, 17),
+    ("youth", 18, 25),
+    ("adult", 26, 40),
+    ("middle", 41, 59),
+    ("senior", 60, 200),
+)
+AGE_KEYWORDS = {
+    "child": {"child", "children", "minor", "minors"},
+    "youth": {"youth", "youths", "young"},
+    "senior": {"senior", "elderly", "old"},
+}
+
+DISABILITY_KEYWORDS = {"disability", "disabilities", "disabled", "divyang", "handicapped"}
+CASTE_KEYWORDS = {
+    "SC": ("scheduled caste", "dalit"),
+    "ST": ("scheduled tribe", "tribal"),
+    "OBC": ("obc", "backward class"),
+}
+
+# Words too common to carry signal as tag features
+STOPWORDS = {
+    "and", "for", "the", "with", "from", "under", "scheme", "yojana", "india", "indian",
+    "government", "assistance", "financial", "welfare", "development", "ministry",
+}
+
+# Profile keys and chat speaker labels: structure, not something a scheme is about
+LABEL_WORDS = {
+    "age", "income", "state", "occupation", "education", "gender", "caste", "disability",
+    "employment", "status", "business", "type", "family", "has", "land", "language",
+    "raw", "text", "user", "bot", "yes", "no", "none",
+}
+# Profile fields that never describe the user's situation
+NON_PROFILE_FIELDS = ("raw_text", "language")
+
+_WORD = re.compile(r"[a-z]+")
+_STATE_PATTERN = re.compile(r"\b(" + "|".join(re.escape(s.lower()) for s in STATES_AND_UTS) + r")\b")
+
+
+def _words(text: str) -> set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def _age_band(age: int) -> str | None:
+    for band, low, high in AGE_BANDS:
+        if low <= age <= high:
+            return band
+    return None
+
+
+def _scheme_states(state_field: str, rule_states: list[str]) -> set[str]:
+    """States a scheme is limited to; empty set means nationwide."""
+    text = state_field.lower()
+    if rule_states:
+        return {s.lower() for s in rule_states}
+    states = set(_STATE_PATTERN.findall(text))
+    if "north east" in text:
+        states.update(s.lower() for s in NORTH_EASTERN_STATES)
+    # "All India", "National" and unrecognised regions count as nationwide
+    return states
+
+
+def _scheme_features(scheme: Any, rules: dict[str, Any] | None, tokens: dict[str, list[str]]) -> set[str]:
+    rules = rules or {}
+    # Search-index tokens, so snapshot-backed schemes never decode their cold text here
+    text = " ".join(" ".join(tokens[f]) for f in ("scheme_name", "objective", "eligibility", "tags"))
+    words = set(text.split())
+    features = set()
+
+    # No state feature means nationwide
+    features.update(f"state:{s}" for s in _scheme_states(scheme.state, rules.get("states") or []))
+
+    if rules.get("gender"):
+        features.add(f"gender:{rules['gender'].lower()}")
+    else:
+        genders = {g for g, keys in GENDER_KEYWORDS.items() if words & keys}
+        # Text naming both ("men and women") says nothing about gender
+        if len(genders) == 1:
+            features.add(f"gender:{genders.pop()}")
+
+    if rules.get("occupations"):
+        features.update(f"occupation:{OCCUPATION_ALIASES.get(o.lower(), o.lower())}" for o in rules["occupations"])
+    else:
+        features.update(f"occupation:{o}" for o, keys in OCCUPATION_KEYWORDS.items() if words & keys)
+
+    age_min, age_max = rules.get("age_min"), rules.get("age_max")
+    if age_min is not None or age_max is not None:
+        low, high = age_min or 0, age_max or 200
+        features.update(f"age:{band}" for band, b_low, b_high in AGE_BANDS if b_low <= high and low <= b_high)
+    else:
+        features.update(f"age:{band}" for band, keys in AGE_KEYWORDS.items() if words & keys)
+
+    if rules.get("disability") or words & DISABILITY_KEYWORDS:
+        features.add("disability")
+
+    castes = set(rules.get("castes") or [])
+    castes.update(c for c, phrases in CASTE_KEYWORDS.items() if any(p in text for p in phrases))
+    features.update(f"caste:{c}" for c in castes)
+
+    # Name and tag words describe what the scheme is about
+    features.update(
+        f"tag:{w}" for w in (*tokens["scheme_name"], *tokens["tags"])
+        if len(w) > 2 and w not in STOPWORDS and not w.isdigit()
+    )
+    return features
+
+
+class EligibilityMatrix:
+    """Sparse scheme x feature matrix (coordinate lists, float32 weights) with a top-k scorer."""
+
+    def __init__(self, schemes: Iterable[Any], rules: dict[int, dict[str, Any]],
+                 tokens: Iterable[dict[str, list[str]]] | None = None):
+        schemes = list(schemes)
+        if tokens is None:
+            tokens = (field_tokens(s) for s in schemes)
+        rows = [_scheme_features(s, rules.get(s.scheme_id), t) for s, t in zip(schemes, tokens)]
+
+        self.scheme_ids = np.array([s.scheme_id for s in schemes], dtype=np.int64)
+        self.row_of = {int(sid): i for i, sid in enumerate(self.scheme_ids)}
+        self.features = sorted(set().union(*rows)) if rows else []
+        self.column_of = {f: i for i, f in enumerate(self.features)}
+
+        # One entry per (scheme, feature) pair, in row order
+        entries = [(i, self.column_of[f]) for i, row in enumerate(rows) for f in sorted(row)]
+        self.rows = np.array([i for i, _ in entries], dtype=np.int32)
+        self.columns = np.array([c for _, c in entries], dtype=np.int32)
+        self.weights = np.array(
+            [FEATURE_WEIGHTS[self.features[c].split(":", 1)[0]] for _, c in entries], dtype=np.float32
+        )
+
+        self._gender_columns = {f.split(":", 1)[1]: self.column_of[f] for f in self.features if f.startswith("gender:")}
+        # Rows of schemes limited to some states
+        is_state = np.array([f.startswith("state:") for f in self.features], dtype=bool)
+        self._state_limited = self._rows_with(is_state[self.columns])
+
+    def _rows_with(self, entry_mask) -> np.ndarray:
+        """Boolean row array: rows holding at least one of the selected entries."""
+        has = np.zeros(len(self.scheme_ids), dtype=bool)
+        has[self.rows[entry_mask]] = True
+        return has
+
+    def scores(self, vector: np.ndarray) -> np.ndarray:
+        """Matrix-vector product: one score per scheme row."""
+        return np.bincount(
+            self.rows, weights=self.weights * vector[self.columns], minlength=len(self.scheme_ids)
+        ).astype(np.float32)
+
+    def vectorize(self, profile: dict[str, Any] | None, text: str = "") -> np.ndarray:
+        """
+        Profile fields (UserProfile.get_profile()) -> feature vector.
+
+        Words come from the profile values only; `text` (e.g. raw chat
+        history) is used only when the profile has no values at all.
+        Field names and speaker labels never become tag words.
+        """
+        profile = profile or {}
+        values = [v for k, v in profile.items() if k not in NON_PROFILE_FIELDS and v not in (None, "")]
+        source = " ".join(str(v) for v in values) if values else text
+        words = _words(source) - LABEL_WORDS
+        features = set()
+
+        state = profile.get("state")
+        states = {state.lower()} if state else set(_STATE_PATTERN.findall(source.lower()))
+        features.update(f"state:{s}" for s in states)
+
+        gender = profile.get("gender")
+        if gender:
+            features.add(f"gender:{gender.lower()}")
+        else:
+            features.update(f"gender:{g}" for g, keys in GENDER_KEYWORDS.items() if words & keys)
+
+        occupation = profile.get("occupation")
+        if occupation:
+            occupation = occupation.lower()
+            features.add(f"occupation:{OCCUPATION_ALIASES.get(occupation, occupation)}")
+        else:
+            features.update(f"occupation:{o}" for o, keys in OCCUPATION_KEYWORDS.items() if words & keys)
+
+        age = profile.get("age")
+        if isinstance(age, int) and _age_band(age):
+            features.add(f"age:{_age_band(age)}")
+
+        if profile.get("disability") == "Yes" or words & DISABILITY_KEYWORDS:
+            features.add("disability")
+
+        caste = profile.get("caste")
+        if caste:
+            features.add(f"caste:{caste.upper()}")
+
+        features.update(f"tag:{w}" for w in words)
+
+        vector = np.zeros(len(self.features), dtype=np.float32)
+        columns = [self.column_of[f] for f in features if f in self.column_of]
+        vector[columns] = 1.0
+
+        if gender:
+            for other, column in self._gender_columns.items():
+                if other != gender.lower():
+                    vector[column] = CONTRADICTION_PENALTY["gender"]
+        if values and "disability" not in features and "disability" in self.column_of:
+            vector[self.column_of["disability"]] = CONTRADICTION_PENALTY["disability"]
+        return vector
+
+    def state_mask(self, profile: dict[str, Any] | None) -> np.ndarray | None:
+        """Rows of schemes limited to states other than the profile's (None without a state)."""
+        state = (profile or {}).get("state")
+        if not state:
+            return None
+        column = self.column_of.get(f"state:{state.lower()}")
+        if column is None:
+            return self._state_limited
+        return self._state_limited & ~self._rows_with(self.columns == column)
+
+    def top_k(self, vector: np.ndarray, k: int, exclude: Iterable[int] = (),
+              mask: np.ndarray | None = None) -> list[int]:
+        """
+        scheme_ids of the k best scoring schemes (score > 0), best first, ties in file order.
+
+        `mask` is a boolean row array (e.g. state_mask()) of schemes never to return.
+        """
+        if not len(self.scheme_ids) or k <= 0:
+            return []
+        scores = self.scores(vector)
+        excluded_rows = [self.row_of[sid] for sid in exclude if sid in self.row_of]
+        if excluded_rows:
+            scores[excluded_rows] = 0.0
+        if mask is not None:
+            scores[mask] = 0.0
+
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            # Keep every row tying with the k-th best score, so the earliest
+            # rows win the tie below rather than whichever argpartition kept
+            kth = -np.partition(-scores[candidates], k - 1)[k - 1]
+            candidates = candidates[scores[candidates] >= kth]
+        # Best score first; lexsort's last key is primary, row index breaks ties
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+        return [int(self.scheme_ids[row]) for row in candidates]
@@ -0,0 +1,365 @@
+"""
+Structured eligibility rules compiled from the free-text scheme criteria.
+
+compile_eligibility() turns the `eligibility` lines of a scheme into
+predicates (age range, gender, state, occupation, income limits,
+disability, caste). It is deliberately conservative:
+
+- a line only counts as understood when it matches a known template
+- some lines yield a *necessary* condition (e.g. "Residence of 5 years in
+  Delhi" requires Delhi) without being fully understood
+- anything else is kept in `unparsed`
+
+evaluate_rules() checks a user profile against the predicates and answers
+True (eligible), False (a necessary condition fails) or None (undecided -
+ask the LLM).
+
+Compiled and loaded rules are read-only mappings with tuple values, so
+the catalog can share them between requests safely.
+"""
+
+import hashlib
+import json
+import os
+import re
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from app.india import STATES_AND_UTS
+
+OCCUPATIONS = [
+    "student", "farmer", "businessman", "employee", "doctor", "engineer",
+    "teacher", "nurse", "laborer", "self-employed", "unemployed", "retired",
+]
+
+CASTE_GROUPS = {
+    "scheduled caste": "SC",
+    "scheduled castes": "SC",
+    "sc": "SC",
+    "scheduled tribe": "ST",
+    "scheduled tribes": "ST",
+    "st": "ST",
+    "obc": "OBC",
+    "other backward class": "OBC",
+    "other backward classes": "OBC",
+    "ews": "EWS",
+}
+
+_STATE_PATTERN = re.compile(r"\b(" + "|".join(re.escape(s.lower()) for s in STATES_AND_UTS) + r")\b")
+_AMOUNT_PATTERN = re.compile(r"(?:₹|\brs\.?|\binr)\s*([\d,]+(?:\.\d+)?)\s*(lakhs?|lacs?|crores?)?")
+
+# Leading / trailing filler around the actual condition
+_LEAD_FILLER = re.compile(
+    r"^(?:the )?(?:applicant|candidate|beneficiary)?(?:'s)?\s*(?:age )?\s*(?:must|should|shall)?\s*(?:be )?"
+)
+_TRAIL_FILLER = re.compile(
+    r"(?: for all categories| in age| as on .*| on the first day .*| at the time of (?:application|applying).*)$"
+)
+
+# Conditions that make a line conditional / exception-based -> never compile
+_CONDITIONAL_WORDS = (
+    "relax", "if ", "except", "preference", "priority", "no income limit", "for general",
+    "in-service", "whichever", ";",
+)
+# Lines about someone other than the applicant
+_OTHER_PERSON_WORDS = ("bride", "groom", "girl whose", "daughter", "son ", "spouse", "parents", "guardian", "child")
+
+_AGE_TEMPLATES = [
+    (re.compile(r"^(?:age )?(?:must be |should be )?between (\d+) and (\d+) years$"), "range"),
+    (re.compile(r"^(\d+) years (?:of age )?(?:or|and) (?:above|older|more)$"), "min"),
+    (re.compile(r"^at least (\d+) years(?: old| of age)?$"), "min"),
+    (re.compile(r"^(\d+) years (?:of age )?or (?:younger|below|less)$"), "max"),
+    (re.compile(r"^(?:age )?(?:not exceeding|up to|upto|below) (\d+) years$"), "max"),
+]
+_RESIDENCE_TEMPLATE = re.compile(
+    r"^(?:a )?(?:permanent resident|resident|domicile(?: / permanent resident)?|domiciled in and a resident|native)"
+    r"(?: of)?(?: the)?(?: state of)? ([a-z ]+?)(?: state)?(?: and residing in [a-z ]+)?$"
+)
+_GENDER_TEMPLATE = re.compile(r"^(?:a |an )?(woman|female|man|male)$")
+_OCCUPATION_TEMPLATE = re.compile(
+    r"^(?:a |an )?(?:bonafide )?(" + "|".join(re.escape(o) for o in OCCUPATIONS) + r")(?: engaged in agriculture)?$"
+)
+_ALL_OCCUPATION_TEMPLATE = re.compile(
+    r"^all (" + "|".join(re.escape(o) for o in OCCUPATIONS) + r")s\b.* are eligible$"
+)
+_CASTE_TEMPLATE = re.compile(r"^(?:the applicant )?(?:should |must )?belongs? to (?:the )?(.+?)(?: categor(?:y|ies))?$")
+_IGNORABLE_TEMPLATES = [
+    re.compile(r"^(?:a citizen of india|an? indian citizen|an? indian national)$"),
+    re.compile(r"\baadhaar\b.*\b(?:number|details|card)\b"),
+    re.compile(r"^(?:the )?application must be submitted\b"),
+]
+_INCOME_MAX_WORDS = ("less than", "not exceed", "not exceeding", "up to", "upto", "below", "maximum", "within")
+_INCOME_MIN_WORDS = ("greater than", "more than", "above", "at least")
+
+
+def _normalize(line: str) -> str:
+    line = line.lower().replace("‑", "-").replace("–", "-").replace("’", "'")
+    line = re.sub(r"\s+", " ", line).strip()
+    return line.rstrip(".").strip()
+
+
+def _strip_filler(line: str) -> str:
+    line = _LEAD_FILLER.sub("", line, count=1).strip()
+    return _TRAIL_FILLER.sub("", line).strip()
+
+
+def _parse_amount(match: re.Match) -> int:
+    value = float(match.group(1).replace(",", ""))
+    unit = (match.group(2) or "").rstrip("s")
+    if unit in ("lakh", "lac"):
+        value *= 100_000
+    elif unit == "crore":
+        value *= 10_000_000
+    return int(value)
+
+
+def _empty_rules() -> dict[str, Any]:
+    return {
+        "compiled": True,
+        "age_min": None,
+        "age_max": None,
+        "gender": None,
+        "states": [],
+        "occupations": [],
+        "income_min": None,
+        "income_max": None,
+        "disability": None,
+        "castes": [],
+        "unparsed": [],
+    }
+
+
+def _compile_line(raw: str, rules: dict[str, Any]) -> bool:
+    """Add the predicates of one eligibility line to rules; True if fully understood."""
+    line = _normalize(raw)
+    if not line:
+        return True
+    if any(p.search(line) for p in _IGNORABLE_TEMPLATES):
+        return True
+    if any(word in line for word in _CONDITIONAL_WORDS):
+        return False
+
+    about_applicant = not any(word in line for word in _OTHER_PERSON_WORDS)
+    core = _strip_filler(line)
+
+    # Age
+    if about_applicant:
+        for template, kind in _AGE_TEMPLATES:
+            m = template.match(core)
+            if m:
+                if kind == "range":
+                    rules["age_min"], rules["age_max"] = int(m.group(1)), int(m.group(2))
+                elif kind == "min":
+                    rules["age_min"] = int(m.group(1))
+                else:
+                    rules["age_max"] = int(m.group(1))
+                return True
+
+    # Gender
+    m = _GENDER_TEMPLATE.match(core)
+    if m and about_applicant:
+        rules["gender"] = "Female" if m.group(1) in ("woman", "female") else "Male"
+        return True
+
+    # Occupation
+    m = _OCCUPATION_TEMPLATE.match(core) or _ALL_OCCUPATION_TEMPLATE.match(core)
+    if m:
+        rules["occupations"] = [m.group(1).title()]
+        return True
+
+    # Caste (only when every listed group is recognised)
+    m = _CASTE_TEMPLATE.match(core)
+    if m:
+        groups = [g.strip() for g in re.split(r",|/| or | and ", m.group(1)) if g.strip()]
+        if groups and all(g in CASTE_GROUPS for g in groups):
+            rules["castes"] = sorted({CASTE_GROUPS[g] for g in groups})
+            return True
+        return False
+
+    # State of residence
+    states = _STATE_PATTERN.findall(line)
+    mentions_residence = any(w in line for w in ("resid", "domicile", "native", "citizens of"))
+    if mentions_residence and len(set(states)) == 1 and " or " not in line:
+        state = next(s for s in STATES_AND_UTS if s.lower() == states[0])
+        # Necessary condition even when the line says more (e.g. "for 5 years")
+        rules["states"] = [state]
+        m = _RESIDENCE_TEMPLATE.match(core)
+        return bool(m and m.group(1).strip() == states[0])
+
+    # Disability (necessary; degree / certificate details stay with the LLM)
+    if "disabilit" in line and " or " not in line:
+        rules["disability"] = "Yes"
+        return False
+
+    # Income
+    if "income" in line:
+        amounts = list(_AMOUNT_PATTERN.finditer(line))
+        if len(amounts) != 1:
+            return False
+        amount = _parse_amount(amounts[0])
+        if "month" in line:
+            amount *= 12
+        if any(w in line for w in _INCOME_MAX_WORDS):
+            rules["income_max"] = amount
+            return True
+        if any(w in line for w in _INCOME_MIN_WORDS):
+            rules["income_min"] = amount
+            return True
+        return False
+
+    return False
+
+
+def _freeze(rules: dict[str, Any]) -> Mapping[str, Any]:
+    """Read-only view of a rules dict with list values turned into tuples."""
+    return MappingProxyType({
+        key: tuple(value) if isinstance(value, list) else value
+        for key, value in rules.items()
+    })
+
+
+def compile_eligibility(eligibility: list[str] | tuple[str, ...]) -> Mapping[str, Any]:
+    """
+    Compile a scheme's eligibility lines into structured predicates.
+
+    Returns:
+        Read-only rules mapping; `compiled` is True only when every line was understood.
+    """
+    rules = _empty_rules()
+    for line in eligibility:
+        if not _compile_line(line, rules):
+            rules["unparsed"].append(line)
+    rules["compiled"] = not rules["unparsed"]
+    return _freeze(rules)
+
+
+def _to_number(value) -> float | None:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    return None
+
+
+def evaluate_rules(rules: Mapping[str, Any] | None, profile: dict[str, Any]) -> tuple[bool | None, str]:
+    """
+    Check a user profile (UserProfile.get_profile()) against compiled rules.
+
+    Returns:
+        (True, reason)  - every criterion is compiled and satisfied
+        (False, reason) - a necessary condition is violated
+        (None, "")      - undecided (missing profile data, uncompiled criteria,
+                          or no criterion to check at all)
+    """
+    if not rules:
+        return None, ""
+
+    unknown = False
+    met = []
+
+    age = _to_number(profile.get("age"))
+    if rules.get("age_min") is not None or rules.get("age_max") is not None:
+        low, high = rules.get("age_min"), rules.get("age_max")
+        if age is None:
+            unknown = True
+        elif (low is not None and age < low) or (high is not None and age > high):
+            return False, f"age {age} outside {low or 0}-{high or 'any'}"
+        else:
+            met.append(f"age {age}")
+
+    gender = profile.get("gender")
+    if rules.get("gender"):
+        if not gender:
+            unknown = True
+        elif gender.lower() != rules["gender"].lower():
+            return False, f"only for {rules['gender'].lower()} applicants"
+        else:
+            met.append(gender.lower())
+
+    state = profile.get("state")
+    if rules.get("states"):
+        if not state:
+            unknown = True
+        elif state.lower() not in {s.lower() for s in rules["states"]}:
+            return False, f"only for residents of {', '.join(rules['states'])}"
+        else:
+            met.append(f"resident of {state}")
+
+    occupation = profile.get("occupation")
+    if rules.get("occupations"):
+        if not occupation:
+            unknown = True
+        elif occupation.lower() not in {o.lower() for o in rules["occupations"]}:
+            return False, f"only for {', '.join(rules['occupations']).lower()}s"
+        else:
+            met.append(occupation.lower())
+
+    income = _to_number(profile.get("income"))
+    if rules.get("income_max") is not None or rules.get("income_min") is not None:
+        if income is None:
+            unknown = True
+        elif rules.get("income_max") is not None and income > rules["income_max"]:
+            return False, f"income above ₹{rules['income_max']:,}"
+        elif rules.get("income_min") is not None and income < rules["income_min"]:
+            return False, f"income below ₹{rules['income_min']:,}"
+        else:
+            met.append("income within limit")
+
+    if rules.get("disability"):
+        if profile.get("disability") == "Yes":
+            met.append("person with disability")
+        else:
+            # Profiles only ever record "Yes", so absence is not proof
+            unknown = True
+
+    caste = profile.get("caste")
+    if rules.get("castes"):
+        if not caste:
+            unknown = True
+        elif caste.upper() not in rules["castes"]:
+            return False, f"only for {'/'.join(rules['castes'])} applicants"
+        else:
+            met.append(caste.upper())
+
+    # No criterion checked means the text had none we understand - not proof of eligibility
+    if unknown or not met or not rules.get("compiled"):
+        return None, ""
+    return True, "Meets criteria: " + ", ".join(met)
+
+
+class StaleRulesError(ValueError):
+    """The rules file was compiled from different scheme details than the ones on disk."""
+
+
+def source_digest(path: str) -> str:
+    """
+    SHA-256 of a source file's content (line endings normalized), used to
+    tie a rules file to the scheme details it was compiled from - unlike
+    mtimes, it survives git checkouts and copies.
+    """
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read().replace(b"\r\n", b"\n")).hexdigest()
+
+
+def write_rules(details: list[dict[str, Any]], path: str, digest: str = "") -> None:
+    """
+    Compile every scheme's eligibility and save as JSON:
+    {"source_sha256": digest of the details file, "rules": {scheme_id: rules}}.
+    """
+    rules = {str(d["scheme_id"]): dict(compile_eligibility(d.get("eligibility") or [])) for d in details}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"source_sha256": digest, "rules": rules}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_rules(path: str, digest: str | None = None) -> dict[int, Mapping[str, Any]]:
+    """
+    Load compiled rules written by write_rules() as read-only mappings.
+
+    With `digest`, raises StaleRulesError unless the file was compiled
+    from a details file with that source_digest().
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if digest is not None and data.get("source_sha256") != digest:
+        raise StaleRulesError(f"{path} was compiled from different scheme details")
+    return {int(scheme_id): _freeze(rules) for scheme_id, rules in data["rules"].items()}
@@ -0,0 +1,94 @@
+"""
+Reference data about India shared by profile extraction and eligibility rules
+"""
+
+# All 28 states and 8 union territories (canonical names)
+STATES = [
+    "Andhra Pradesh", "Arunachal Pradesh", "Assam", "Bihar", "Chhattisgarh", "Goa",
+    "Gujarat", "Haryana", "Himachal Pradesh", "Jharkhand", "Karnataka", "Kerala",
+    "Madhya Pradesh", "Maharashtra", "Manipur", "Meghalaya", "Mizoram", "Nagaland",
+    "Odisha", "Punjab", "Rajasthan", "Sikkim", "Tamil Nadu", "Telangana", "Tripura",
+    "Uttar Pradesh", "Uttarakhand", "West Bengal",
+]
+
+UNION_TERRITORIES = [
+    "Andaman and Nicobar Islands", "Chandigarh", "Dadra and Nagar Haveli and Daman and Diu",
+    "Delhi", "Jammu and Kashmir", "Ladakh", "Lakshadweep", "Puducherry",
+]
+
+STATES_AND_UTS = STATES + UNION_TERRITORIES
+
+NORTH_EASTERN_STATES = [
+    "Arunachal Pradesh", "Assam", "Manipur", "Meghalaya", "Mizoram", "Nagaland", "Sikkim", "Tripura",
+]
+
+# Old names, abbreviations and major cities -> canonical state / UT name
+STATE_SYNONYMS = {
+    "orissa": "Odisha",
+    "uttaranchal": "Uttarakhand",
+    "chattisgarh": "Chhattisgarh",
+    "pondicherry": "Puducherry",
+    "new delhi": "Delhi",
+    "nct of delhi": "Delhi",
+    "j&k": "Jammu and Kashmir",
+    "jammu": "Jammu and Kashmir",
+    "kashmir": "Jammu and Kashmir",
+    "srinagar": "Jammu and Kashmir",
+    "andaman": "Andaman and Nicobar Islands",
+    "port blair": "Andaman and Nicobar Islands",
+    "daman": "Dadra and Nagar Haveli and Daman and Diu",
+    "diu": "Dadra and Nagar Haveli and Daman and Diu",
+    "dadra and nagar haveli": "Dadra and Nagar Haveli and Daman and Diu",
+    "mumbai": "Maharashtra",
+    "bombay": "Maharashtra",
+    "pune": "Maharashtra",
+    "nagpur": "Maharashtra",
+    "bengaluru": "Karnataka",
+    "bangalore": "Karnataka",
+    "mysuru": "Karnataka",
+    "mysore": "Karnataka",
+    "chennai": "Tamil Nadu",
+    "madras": "Tamil Nadu",
+    "coimbatore": "Tamil Nadu",
+    "kolkata": "West Bengal",
+    "calcutta": "West Bengal",
+    "hyderabad": "Telangana",
+    "lucknow": "Uttar Pradesh",
+    "kanpur": "Uttar Pradesh",
+    "noida": "Uttar Pradesh",
+    "varanasi": "Uttar Pradesh",
+    "gurugram": "Haryana",
+    "gurgaon": "Haryana",
+    "faridabad": "Haryana",
+    "patna": "Bihar",
+    "jaipur": "Rajasthan",
+    "jodhpur": "Rajasthan",
+    "ahmedabad": "Gujarat",
+    "surat": "Gujarat",
+    "bhopal": "Madhya Pradesh",
+    "indore": "Madhya Pradesh",
+    "raipur": "Chhattisgarh",
+    "ranchi": "Jharkhand",
+    "bhubaneswar": "Odisha",
+    "guwahati": "Assam",
+    "shimla": "Himachal Pradesh",
+    "dehradun": "Uttarakhand",
+    "visakhapatnam": "Andhra Pradesh",
+    "vizag": "Andhra Pradesh",
+    "vijayawada": "Andhra Pradesh",
+    "thiruvananthapuram": "Kerala",
+    "trivandrum": "Kerala",
+    "kochi": "Kerala",
+    "cochin": "Kerala",
+    "ludhiana": "Punjab",
+    "amritsar": "Punjab",
+    "panaji": "Goa",
+    "imphal": "Manipur",
+    "shillong": "Meghalaya",
+    "aizawl": "Mizoram",
+    "kohima": "Nagaland",
+    "gangtok": "Sikkim",
+    "agartala": "Tripura",
+    "itanagar": "Arunachal Pradesh",
+    "leh": "Ladakh",
+}
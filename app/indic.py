@@ -0,0 +1,234 @@
+"""
+Indic-script and romanized query support for local search.
+
+The nine major Indic scripts (Devanagari, Bengali/Assamese, Gurmukhi,
+Gujarati, Odia, Tamil, Telugu, Kannada, Malayalam) sit in consecutive
+128-codepoint Unicode blocks from U+0900 with a shared ISCII-derived
+layout: the same offset holds the same letter in every block. So script
+detection is one subtraction and shift per character, and a single
+offset table romanizes all of them.
+
+Query words are mapped onto catalog (English) terms through an offline
+lexicon (data/indic_lexicon.json). Indic-script words are compared with
+lexicon forms by a phonetic key, so किसान and কিসান hit the same entry.
+Latin words match a romanized lexicon form exactly (kisan); only Latin
+words that are neither catalog words nor state names fall back to the
+phonetic key (kisaan), since plain English and place names collide with
+it ("pradesh" ~ "pardesh"). Words not in the lexicon are still
+romanized, which matches the many scheme names that are romanized Hindi
+("Yojana", "Bima").
+"""
+
+import json
+import os
+import re
+from typing import Container
+
+from app.india import STATE_SYNONYMS, STATES_AND_UTS
+
+_INDIC_START = 0x0900
+_INDIC_END = 0x0D80
+BLOCK_SCRIPTS = (
+    "devanagari", "bengali", "gurmukhi", "gujarati", "odia", "tamil", "telugu", "kannada", "malayalam",
+)
+
+# Block offset -> romanization; consonants without their inherent "a"
+_VOWELS = {
+    0x05: "a", 0x06: "aa", 0x07: "i", 0x08: "ii", 0x09: "u", 0x0A: "uu", 0x0B: "ri", 0x0C: "li",
+    0x0D: "e", 0x0E: "e", 0x0F: "e", 0x10: "ai", 0x11: "o", 0x12: "o", 0x13: "o", 0x14: "au",
+    0x60: "rii", 0x61: "lii",
+}
+_CONSONANTS = {
+    0x15: "k", 0x16: "kh", 0x17: "g", 0x18: "gh", 0x19: "ng",
+    0x1A: "ch", 0x1B: "chh", 0x1C: "j", 0x1D: "jh", 0x1E: "ny",
+    0x1F: "t", 0x20: "th", 0x21: "d", 0x22: "dh", 0x23: "n",
+    0x24: "t", 0x25: "th", 0x26: "d", 0x27: "dh", 0x28: "n", 0x29: "n",
+    0x2A: "p", 0x2B: "ph", 0x2C: "b", 0x2D: "bh", 0x2E: "m",
+    0x2F: "y", 0x30: "r", 0x31: "r", 0x32: "l", 0x33: "l", 0x34: "l", 0x35: "v",
+    0x36: "sh", 0x37: "sh", 0x38: "s", 0x39: "h",
+    # Precomposed nukta letters
+    0x58: "q", 0x59: "kh", 0x5A: "g", 0x5B: "z", 0x5C: "r", 0x5D: "rh", 0x5E: "f", 0x5F: "y",
+}
+_VOWEL_SIGNS = {
+    0x3E: "aa", 0x3F: "i", 0x40: "ii", 0x41: "u", 0x42: "uu", 0x43: "ri", 0x44: "rii",
+    0x45: "e", 0x46: "e", 0x47: "e", 0x48: "ai", 0x49: "o", 0x4A: "o", 0x4B: "o", 0x4C: "au",
+    0x57: "au", 0x62: "li", 0x63: "lii",
+}
+_SIGNS = {
+    0x01: "n", 0x02: "n", 0x03: "h",
+    0x4E: "t",  # Bengali khanda ta
+    0x70: "n",  # Gurmukhi tippi
+    # Malayalam chillu letters
+    0x7A: "n", 0x7B: "n", 0x7C: "r", 0x7D: "l", 0x7E: "l", 0x7F: "k",
+}
+_SIGNS.update({0x66 + d: str(d) for d in range(10)})
+_VIRAMA = 0x4D
+_NUKTA = 0x3C
+
+# Indic words (danda punctuation excluded) or Latin words
+_TOKEN = re.compile(r"[\u0900-\u0963\u0966-\u0D7F\u200c\u200d]+|[A-Za-z0-9]+")
+_DOUBLE_VOWEL = re.compile(r"([aiu])\1")
+_REPEAT = re.compile(r"(.)\1+")
+# Romanization variants that sound the same, folded for the phonetic key
+_KEY_REWRITES = (
+    ("chh", "ch"), ("sh", "s"), ("ph", "f"), ("kh", "k"), ("gh", "g"), ("jh", "j"),
+    ("th", "t"), ("dh", "d"), ("bh", "b"), ("ee", "i"), ("oo", "u"), ("w", "v"), ("z", "j"), ("q", "k"),
+)
+# Shortest phonetic key looked up for a Latin word (short keys collide with English)
+_MIN_LATIN_KEY = 3
+# Words of state / UT names; never phonetically rewritten
+_STATE_WORDS = frozenset(
+    word for name in (*STATES_AND_UTS, *STATE_SYNONYMS) for word in re.findall(r"[a-z]+", name.lower())
+)
+
+
+def _block(ch: str) -> int:
+    """Index into BLOCK_SCRIPTS, or -1 for characters outside the Indic blocks."""
+    cp = ord(ch)
+    return (cp - _INDIC_START) >> 7 if _INDIC_START <= cp < _INDIC_END else -1
+
+
+def detect_script(text: str) -> str:
+    """Dominant script of text: one of BLOCK_SCRIPTS, or "latin" when no Indic letters."""
+    if text.isascii():
+        return "latin"
+    counts = [0] * len(BLOCK_SCRIPTS)
+    for ch in text:
+        block = _block(ch)
+        if block >= 0:
+            counts[block] += 1
+    best = max(range(len(counts)), key=counts.__getitem__)
+    return BLOCK_SCRIPTS[best] if counts[best] else "latin"
+
+
+def is_indic(word: str) -> bool:
+    return not word.isascii() and any(_block(ch) >= 0 for ch in word)
+
+
+def romanize(word: str) -> str:
+    """
+    Romanize one Indic word (any of the nine scripts) into plain ASCII.
+
+    Consonants carry an inherent "a" unless followed by a vowel sign or
+    virama; the word-final inherent "a" is dropped (किसान -> kisan) and long
+    vowels are written single (योजना -> yojana) to match common spellings.
+    """
+    out: list[str] = []
+    pending_a = False
+    for ch in word:
+        block = _block(ch)
+        if block < 0:
+            continue
+        offset = ord(ch) - _INDIC_START - (block << 7)
+        if offset == _NUKTA:
+            continue
+        if offset in _VOWEL_SIGNS:
+            out.append(_VOWEL_SIGNS[offset])
+            pending_a = False
+            continue
+        if offset == _VIRAMA:
+            pending_a = False
+            continue
+        if pending_a:
+            out.append("a")
+            pending_a = False
+        if offset in _CONSONANTS:
+            out.append(_CONSONANTS[offset])
+            pending_a = True
+        elif offset in _VOWELS:
+            out.append(_VOWELS[offset])
+        elif offset in _SIGNS:
+            out.append(_SIGNS[offset])
+    if pending_a and len(out) == 1:
+        # Single-letter words keep their vowel
+        out.append("a")
+    return _DOUBLE_VOWEL.sub(r"\1", "".join(out))
+
+
+def phonetic_key(word: str) -> str:
+    """
+    Spelling-insensitive key for a romanized word: aspirates and long
+    vowels folded, doubled letters collapsed and every non-initial "a"
+    dropped, so yojana / yojna and chhatravritti / chatravriti agree.
+    """
+    key = word.lower()
+    for old, new in _KEY_REWRITES:
+        key = key.replace(old, new)
+    key = _REPEAT.sub(r"\1", key)
+    return key[:1] + key[1:].replace("a", "")
+
+
+def _word_key(word: str) -> str:
+    return phonetic_key(romanize(word) if is_indic(word) else word)
+
+
+class IndicLexicon:
+    """
+    Phonetic-key -> catalog terms map built from the lexicon file.
+
+    File format:
+        {"stopwords": [...Indic-script words...],
+         "terms": [{"en": ["farmer", ...], "forms": ["किसान", "kisan", ...]}, ...]}
+    """
+
+    def __init__(self, entries: list[dict] | None = None, stopwords: list[str] | None = None):
+        # phonetic key -> catalog terms (Indic words, unknown Latin words)
+        self.terms: dict[str, tuple[str, ...]] = {}
+        # exact lowercase romanized form -> catalog terms (Latin words)
+        self.latin_forms: dict[str, tuple[str, ...]] = {}
+        for entry in entries or ():
+            english = tuple(entry.get("en", ()))
+            for form in entry.get("forms", ()):
+                key = _word_key(form)
+                if key:
+                    self.terms[key] = tuple(dict.fromkeys(self.terms.get(key, ()) + english))
+                if form.isascii():
+                    form = form.lower()
+                    self.latin_forms[form] = tuple(dict.fromkeys(self.latin_forms.get(form, ()) + english))
+        self.stopwords = frozenset(_word_key(w) for w in stopwords or ())
+
+    @classmethod
+    def from_json(cls, path: str) -> "IndicLexicon":
+        if not os.path.exists(path):
+            print(f"[INDIC] Lexicon {path} not found - romanizing Indic queries only")
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        lexicon = cls(data.get("terms", []), data.get("stopwords", []))
+        print(f"[INDIC] Loaded {len(lexicon.terms)} lexicon keys from {path}")
+        return lexicon
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def translate(self, query: str, vocabulary: Container[str] = ()) -> str:
+        """
+        Rewrite a query into catalog terms.
+
+        Latin words are kept and followed by their lexicon terms (kisan ->
+        kisan farmer ...): by exact romanized form, or by phonetic key
+        only when the word is not in `vocabulary` (the catalog's words) or
+        a state name. Indic words are replaced by their lexicon terms, or
+        by their romanization when the lexicon has no entry; Indic
+        stopwords are dropped.
+        """
+        if query.isascii() and not self.terms:
+            return query
+        words = []
+        for token in _TOKEN.findall(query):
+            if token.isascii():
+                words.append(token)
+                lowered = token.lower()
+                if lowered in self.latin_forms:
+                    words.extend(self.latin_forms[lowered])
+                elif lowered not in vocabulary and lowered not in _STATE_WORDS:
+                    key = phonetic_key(lowered)
+                    if len(key) >= _MIN_LATIN_KEY:
+                        words.extend(self.terms.get(key, ()))
+                continue
+            roman = romanize(token)
+            key = phonetic_key(roman)
+            if key in self.stopwords:
+                continue
+            words.extend(self.terms.get(key) or (roman,))
+        return " ".join(words)
@@ -1,16 +1,34 @@
-from flask import Flask
+from flask import Flask, Response
 from threading import Thread
 
+from app import metrics
+from app.config import PORT
+
 app = Flask('')
 
 @app.route('/')
 def home():
     return "I am alive! Bot is running."
 
+@app.route('/healthz')
+def healthz():
+    status, body = metrics.health_response()
+    return Response(body, status=status, mimetype='text/plain')
+
+@app.route('/readyz')
+def readyz():
+    status, body = metrics.readiness_response()
+    return Response(body, status=status, mimetype='application/json')
+
+@app.route('/metrics')
+def prometheus_metrics():
+    status, body = metrics.metrics_response()
+    return Response(body, status=status, content_type=metrics.CONTENT_TYPE)
+
 def run():
     # Render expects the server to listen on port 0.0.0.0
     # It will assign a port via the PORT environment variable, usually 10000
-    app.run(host='0.0.0.0', port=8080)
+    app.run(host='0.0.0.0', port=PORT)
 
 def keep_alive():
     t = Thread(target=run)
@@ -0,0 +1,216 @@
+"""
+Micro-batching of concurrent eligibility LLM requests.
+
+Requests that arrive within a short window (or until the batch is full)
+are packed into one multi-user prompt. The LLM answers with one JSON
+object keyed by user label, which is split back into per-request results
+that resolve each caller's future. A batch of one is sent with the
+caller's own single-user prompt, so the batcher adds no quality cost at
+low traffic.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class _EligibilityRequest:
+    __slots__ = ("prompt", "user_context", "scheme_lines", "scheme_ids", "priority", "timeout", "future")
+
+    def __init__(self, prompt: str, user_context: str, scheme_lines: list[str], scheme_ids: list[int],
+                 priority: int, timeout: float, future: asyncio.Future):
+        self.prompt = prompt
+        self.user_context = user_context
+        self.scheme_lines = scheme_lines
+        self.scheme_ids = scheme_ids
+        self.priority = priority
+        self.timeout = timeout
+        self.future = future
+
+
+def build_batch_prompt(requests: list[_EligibilityRequest]) -> str:
+    """One prompt covering several users, each with their own scheme shortlist."""
+    sections = []
+    for i, request in enumerate(requests, start=1):
+        sections.append(f"""User U{i}:
+{request.user_context}
+
+Schemes for U{i}:
+{chr(10).join(request.scheme_lines)}
+""")
+
+    labels = ", ".join(f'"U{i}": [...]' for i in range(1, len(requests) + 1))
+    return f"""
+You are an Indian government scheme eligibility expert.
+
+Below are {len(requests)} separate users, each with a SHORT list of schemes with IDs.
+For EACH user, select ONLY the schemes from THAT user's list they are clearly eligible for.
+
+{chr(10).join(sections)}
+Return ONLY one valid JSON object with one key per user ({labels}), for example:
+{{
+  "U1": [
+    {{
+      "scheme_id": 1,
+      "eligibility_reason": "short reason"
+    }}
+  ],
+  "U2": []
+}}
+
+Rules:
+- If eligibility is unclear, EXCLUDE the scheme
+- Max 5 schemes per user
+- Must include scheme_id
+- Never use a scheme from another user's list
+"""
+
+
+def _extract_json(text: str, open_char: str, close_char: str):
+    start = text.find(open_char)
+    end = text.rfind(close_char) + 1
+    if start == -1 or end == 0:
+        raise ValueError(f"No JSON {open_char}{close_char} found in response")
+    return json.loads(text[start:end])
+
+
+def _shortlisted_items(items: list, scheme_ids: list[int]) -> list[dict]:
+    """
+    Answer items for schemes on the shortlist, each once, with scheme_id
+    coerced to int ("12" and 12.0 are accepted, anything else dropped).
+    """
+    allowed = set(scheme_ids)
+    seen = set()
+    kept = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        try:
+            scheme_id = int(item.get("scheme_id"))
+        except (TypeError, ValueError):
+            continue
+        if scheme_id not in allowed or scheme_id in seen:
+            continue
+        seen.add(scheme_id)
+        kept.append({**item, "scheme_id": scheme_id})
+    return kept
+
+
+def parse_single_response(text: str, scheme_ids: list[int]) -> list[dict]:
+    result = _extract_json(text.strip(), "[", "]")
+    if not isinstance(result, list):
+        raise ValueError(f"Response is not a list: {type(result)}")
+    return _shortlisted_items(result, scheme_ids)
+
+
+def parse_batch_response(text: str, requests: list[_EligibilityRequest]) -> list[list[dict] | None]:
+    """Split a batched answer into per-request lists (None for a user the LLM skipped)."""
+    result = _extract_json(text.strip(), "{", "}")
+    if not isinstance(result, dict):
+        raise ValueError(f"Response is not an object: {type(result)}")
+
+    answers = []
+    for i, request in enumerate(requests, start=1):
+        items = result.get(f"U{i}")
+        if not isinstance(items, list):
+            answers.append(None)
+            continue
+        # Drop schemes that were not on this user's shortlist
+        answers.append(_shortlisted_items(items, request.scheme_ids))
+    return answers
+
+
+class EligibilityBatcher:
+    """
+    Collects eligibility requests for `window` seconds or until `max_batch`
+    are queued, then makes one LLM call for all of them.
+
+    invoke(prompt, priority) must return the LLM's text answer; a batch is
+    sent with the most urgent priority of its requests and the longest
+    timeout among them, while each caller still stops waiting after its
+    own timeout. Each submit() resolves to that caller's list of
+    {"scheme_id", "eligibility_reason"} dicts, or None when the call
+    failed, timed out or the answer could not be parsed. Exceptions listed
+    in `propagate` are re-raised to callers.
+    """
+
+    def __init__(self, invoke: Callable[[str, int], Awaitable[str]], window: float, max_batch: int, timeout: float,
+                 propagate: tuple[type[Exception], ...] = ()):
+        self._invoke = invoke
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self.timeout = timeout
+        self.propagate = propagate
+        self._pending: list[_EligibilityRequest] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, prompt: str, user_context: str, scheme_lines: list[str],
+                     scheme_ids: list[int], priority: int = 0, timeout: float | None = None) -> list[dict] | None:
+        """Queue one request; `timeout` (default: the batcher's) covers the batching window too."""
+        if timeout is None:
+            timeout = self.timeout
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(
+            _EligibilityRequest(prompt, user_context, scheme_lines, scheme_ids, priority, timeout, future)
+        )
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        try:
+            # Cancels the future on expiry, so the batch skips this caller
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Eligibility request timed out after %ss", timeout)
+            return None
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch = [r for r in self._pending if not r.future.done()]
+        self._pending = []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        # Keep a reference so the batch task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[_EligibilityRequest]) -> None:
+        self.batches += 1
+        prompt = batch[0].prompt if len(batch) == 1 else build_batch_prompt(batch)
+        logger.debug("Sending %d eligibility request(s) in one call", len(batch))
+
+        priority = min(r.priority for r in batch)
+        timeout = max(r.timeout for r in batch)
+        try:
+            text = await asyncio.wait_for(self._invoke(prompt, priority), timeout)
+            if len(batch) == 1:
+                answers = [parse_single_response(text, batch[0].scheme_ids)]
+            else:
+                answers = parse_batch_response(text, batch)
+        except asyncio.TimeoutError:
+            logger.warning("Batched eligibility LLM call timed out after %ss", timeout)
+            answers = [None] * len(batch)
+        except self.propagate as e:
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        except Exception as e:
+            logger.warning("Batched eligibility call failed: %s", e)
+            answers = [None] * len(batch)
+
+        for request, answer in zip(batch, answers):
+            if not request.future.done():
+                request.future.set_result(answer)
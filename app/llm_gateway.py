@@ -0,0 +1,228 @@
+"""
+Shared gateway for all Groq LLM calls.
+
+- caps the number of concurrent calls
+- token buckets for requests/minute and tokens/minute, waited on
+  before a call slot is taken (and again, without a slot, per retry)
+- priority queue for call slots: interactive replies go before
+  background work (PDF eligibility)
+- retries 429 / 5xx / connection errors with jittered exponential
+  backoff, honoring Retry-After; a 429 pauses *all* calls until the
+  Retry-After time ("tripped"), so the bot stops hammering the API
+- raises LLMBusyError when it gives up, so handlers can answer with a
+  friendly "busy" message instead of a generic error
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Any, AsyncIterator
+
+import groq
+from langchain_core.messages import HumanMessage
+
+from app.prompt_builder import count_tokens
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+# Completion tokens assumed per call when charging the tokens/minute bucket
+EXPECTED_OUTPUT_TOKENS = 300
+
+BUSY_MESSAGE = "I'm getting a lot of questions right now 🙏 Please try again in a minute."
+
+_RETRYABLE = (groq.RateLimitError, groq.InternalServerError, groq.APIConnectionError, groq.APITimeoutError)
+
+
+class LLMBusyError(Exception):
+    """The LLM stayed rate-limited / unavailable after all retries."""
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to a burst of `per_minute`; 0 disables."""
+
+    def __init__(self, per_minute: float, clock=time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._clock = clock
+        self._tokens = per_minute
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take amount units (possibly going into debt); return seconds to wait before using them."""
+        if self.capacity <= 0:
+            return 0.0
+        self._refill()
+        # A single request larger than the bucket still goes through eventually
+        self._tokens -= min(amount, self.capacity)
+        return max(0.0, -self._tokens / self.rate)
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMGateway:
+    """Concurrency-limited, rate-limited, retrying front door to the LLM."""
+
+    def __init__(self, llm: Any, max_concurrency: int, rpm: float, tpm: float,
+                 max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 20.0):
+        self.llm = llm
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    @property
+    def tripped(self) -> bool:
+        """True while calls are paused after a 429."""
+        return time.monotonic() < self._paused_until
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, f in self._waiters if not f.done())
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    async def _acquire(self, priority: int) -> None:
+        if self._active < self.max_concurrency and not self.queued:
+            self._active += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Slot was handed over just as we were cancelled - pass it on
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                # Hand the slot straight to the next waiter (active count unchanged)
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.5)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    async def _wait_for_budget(self, prompt: str) -> None:
+        wait = max(
+            self._paused_until - time.monotonic(),
+            self.requests.reserve(1),
+            self.tokens.reserve(count_tokens(prompt) + EXPECTED_OUTPUT_TOKENS),
+        )
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def _after_error(self, error: Exception, attempt: int) -> None:
+        """Back off after a retryable error, or raise LLMBusyError on the last attempt."""
+        retry_after = _retry_after(error)
+        if isinstance(error, groq.RateLimitError):
+            self.rate_limited += 1
+            # Pause every caller, not just this one
+            pause = retry_after if retry_after is not None else self._backoff(attempt, None)
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        if attempt == self.max_retries:
+            self.failures += 1
+            raise LLMBusyError(f"LLM unavailable after {attempt + 1} attempts: {error}") from error
+        delay = self._backoff(attempt, retry_after)
+        self.retries += 1
+        logger.info("%s, retry %d/%d in %.1fs", type(error).__name__, attempt + 1, self.max_retries, delay)
+        await asyncio.sleep(delay)
+
+    async def ainvoke(self, prompt: str, priority: int = PRIORITY_INTERACTIVE, llm: Any = None) -> Any:
+        """
+        Send one prompt (as a HumanMessage) and return the LLM message.
+
+        llm overrides the gateway's default model for this call; it still
+        shares the gateway's limits.
+        """
+        llm = llm or self.llm
+        for attempt in range(self.max_retries + 1):
+            # Budget first: a caller sleeping on the rate limit must not hold a call slot
+            await self._wait_for_budget(prompt)
+            await self._acquire(priority)
+            try:
+                self.calls += 1
+                return await llm.ainvoke([HumanMessage(content=prompt)])
+            except _RETRYABLE as e:
+                error = e
+            finally:
+                self._release()
+            await self._after_error(error, attempt)
+
+    async def astream(self, prompt: str, priority: int = PRIORITY_INTERACTIVE, llm: Any = None) -> AsyncIterator[str]:
+        """
+        Stream the reply to one prompt as text chunks, under the same limits.
+
+        Errors before the first chunk are retried like ainvoke; an error
+        after text has been streamed raises LLMBusyError (a half-sent reply
+        cannot be retried). Close the generator (contextlib.aclosing) if
+        you stop iterating early, so the call slot is released.
+        """
+        llm = llm or self.llm
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_budget(prompt)
+            await self._acquire(priority)
+            started = False
+            try:
+                self.calls += 1
+                async for chunk in llm.astream([HumanMessage(content=prompt)]):
+                    started = True
+                    if chunk.content:
+                        yield chunk.content
+                return
+            except _RETRYABLE as e:
+                if started:
+                    self.failures += 1
+                    raise LLMBusyError(f"LLM stream interrupted: {e}") from e
+                error = e
+            finally:
+                self._release()
+            await self._after_error(error, attempt)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "active": self._active,
+            "queued": self.queued,
+            "calls": self.calls,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+            "tripped": self.tripped,
+        }
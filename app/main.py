@@ -2,8 +2,8 @@
 # GLOBAL STATE
 # ===============================
 
-chat_memory = {}
-last_shown_schemes: dict[str, list[dict]] = {}
+# Per-chat profile, chat memory and last shown schemes live in persistent
+# sessions (app/session_store.py)
 
 # ===============================
 # HELPER FUNCTIONS
@@ -11,12 +11,8 @@ last_shown_schemes: dict[str, list[dict]] = {}
 
 def clear_chat_data(chat_id: str):
     """Clear all stored data for a chat (for fresh starts)."""
-    if chat_id in chat_memory:
-        del chat_memory[chat_id]
-    if chat_id in last_shown_schemes:
-        del last_shown_schemes[chat_id]
-    from app.user_profile import clear_profile
-    clear_profile(chat_id)
+    get_sessions().clear(chat_id)
+    prompt_builder.forget(chat_id)
     print(f"[CHAT CLEARED] Cleared all data for chat {chat_id}")
 
 # ===============================
@@ -27,31 +23,55 @@ from telegram import Update
 from telegram.ext import Application, MessageHandler, CommandHandler, CallbackQueryHandler, filters, ContextTypes
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
 from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
 
-from app.config import TELEGRAM_BOT_TOKEN, GROQ_API_KEY, SCHEME_JSON_PATH
+from app.config import TELEGRAM_BOT_TOKEN, GROQ_API_KEY, CATALOG_WATCH_INTERVAL, ADMIN_CHAT_IDS, PROMPT_BUDGETS, STREAM_REPLIES, STREAM_EDIT_INTERVAL, SESSION_SWEEP_INTERVAL, MAX_CONCURRENT_UPDATES, BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, PORT, READY_MAX_LOOP_LAG, LOOP_LAG_INTERVAL
 from app.schemes_service import (
-    get_eligible_schemes_using_ai,
-    search_schemes,
-    search_schemes_as_list,
-    get_all_schemes
+    aget_eligible_schemes_using_ai,
+    llm_gateway,
+    arun_search,
+    load_catalog,
+    get_catalog_manager,
+    eligibility_cache,
+    eligibility_flight,
+    search_flight,
+    web_search_flight
 )
 from app.pdf_generator import generate_schemes_pdf
 from app.user_profile import get_or_create_profile
-
+from app.session_store import get_sessions
+from app.singleflight import SingleFlight, normalize_query
+from app.prompt_builder import PromptBuilder
+from app.llm_gateway import LLMBusyError, BUSY_MESSAGE, PRIORITY_BACKGROUND
+from app.streaming import stream_reply
+from app.profile_extraction import extract_profile_fields
+from app.chat_dispatch import ChatOrderedUpdateProcessor
+from app import metrics
+from app.metrics import REQUESTS, HANDLER_ERRORS, STAGE_SECONDS
+
+import asyncio
+import logging
 import traceback
 import re
 import os
+import time
 from app.keep_alive import keep_alive
-import json
+from app.webhook_server import run_webhook
+
+logger = logging.getLogger(__name__)
 
 # ===============================
-# SAFETY CONSTANTS
+# PROMPT BUDGETS
 # ===============================
 
-MAX_MESSAGES = 6
-MAX_CONTEXT_CHARS = 1500
-MAX_SCHEME_CHARS = 800
+# Token budgets per prompt section (profile, history, summary, schemes)
+prompt_builder = PromptBuilder(PROMPT_BUDGETS)
+
+# ===============================
+# UPDATE PROCESSING
+# ===============================
+
+# Chats are handled concurrently, each chat's messages one at a time and in order
+update_processor = ChatOrderedUpdateProcessor(MAX_CONCURRENT_UPDATES)
 
 # ===============================
 # LLM INITIALIZATION
@@ -60,98 +80,57 @@ MAX_SCHEME_CHARS = 800
 llm = ChatGroq(
     api_key=GROQ_API_KEY,
     model="llama-3.1-8b-instant",
-    temperature=0
+    temperature=0,
+    max_retries=0  # retries / backoff are handled by llm_gateway
 )
 
+# Coalesces identical in-flight general-query answers across chats, keyed by the
+# normalized question, the schemes shown and the profile section (the only parts
+# of the prompt). Applies with STREAM_REPLIES off; streamed replies are per chat.
+general_llm_flight = SingleFlight("general LLM")
+
 # ===============================
-# UTILITY FUNCTIONS
+# METRICS / READINESS
 # ===============================
 
-def safe_truncate(text: str, limit: int) -> str:
-    if not text:
-        return ""
-    return text[-limit:]
+def _session_metrics():
+    """Cache and write-back metrics for the session cache from one stats() snapshot."""
+    stats = get_sessions().stats()
+    return [
+        *metrics.cache_collector("sessions", lambda: stats)(),
+        *metrics.stats_collector(
+            "sessions", "Session cache", lambda: stats,
+            counters=("writes", "flushes"), fields=("bytes", "pending", "writes", "flushes"),
+        )(),
+    ]
+
+metrics.REGISTRY.register(metrics.cache_collector("eligibility", eligibility_cache.stats))
+metrics.REGISTRY.register(_session_metrics)
+metrics.REGISTRY.register(metrics.singleflight_collector(
+    search_flight, web_search_flight, eligibility_flight, general_llm_flight
+))
+metrics.REGISTRY.register(metrics.stats_collector(
+    "llm", "LLM gateway", llm_gateway.stats, counters=("calls", "retries", "rate_limited", "failures"),
+))
+metrics.REGISTRY.register(metrics.stats_collector(
+    "updates", "Update processing", update_processor.stats, counters=("processed", "queued"),
+))
+
+metrics.add_readiness_check("catalog_loaded", lambda: get_catalog_manager().loaded)
+metrics.add_readiness_check("event_loop", lambda: metrics.loop_monitor.lag < READY_MAX_LOOP_LAG)
+metrics.add_readiness_check("llm_available", lambda: not llm_gateway.tripped)
 
 # ===============================
 # PROFILE EXTRACTION
 # ===============================
 
-import re
-
-# Keywords and patterns for profile extraction
-STATES = ["delhi", "maharashtra", "karnataka", "tamil nadu", "uttar pradesh", "west bengal", 
-          "punjab", "haryana", "telangana", "rajasthan", "bihar", "odisha", "madhya pradesh",
-          "andhra pradesh", "gujarat", "himachal pradesh", "jharkhand", "goa", "kerala", 
-          "tripura", "manipur", "meghalaya", "assam", "arunachal pradesh"]
-
-AGE_PATTERN = r'(\d{1,3})\s*(?:year|yr|years|yrs|old)'
-AGE_PATTERN = r'(?:age|years?|yrs?|old)[\s:]*(\d{1,3})|(\d{1,3})\s*(?:year|yr|years|yrs|old)'
-
 async def extract_user_info_from_text(text: str, profile) -> None:
-    """Extract user profile info using both pattern matching and AI."""
-    text_lower = text.lower()
-    
-    # Pattern-based extraction (fast)
+    """Extract user profile info with the single-pass keyword / pattern matcher."""
     print(f"[EXTRACTION] Parsing user text: {text[:50]}...")
     
-    # Age extraction - improved to catch "age is 20", "20 years old", etc.
-    age_match = re.search(AGE_PATTERN, text_lower)
-    if age_match:
-        # Get the age from either group 1 or group 2
-        age_str = age_match.group(1) or age_match.group(2)
-        if age_str:
-            age = int(age_str)
-            profile.add_info("age", age)
-            print(f"[EXTRACTION] Found age: {age}")
-    
-    # State extraction
-    for state in STATES:
-        if state in text_lower:
-            profile.add_info("state", state.title())
-            print(f"[EXTRACTION] Found state: {state.title()}")
-            break
-    
-    # Gender extraction - normalize all gender keywords
-    male_keywords = ["male", "man", "boy", "mr.", "he", "i am a male", "i'm male", "i am male"]
-    female_keywords = ["female", "woman", "girl", "mrs.", "ms.", "she", "i am a female", "i'm female", "i am female", "i am a woman", "i'm a woman"]
-    
-    found_gender = None
-    for keyword in male_keywords:
-        if keyword in text_lower:
-            found_gender = "Male"
-            break
-    
-    if not found_gender:
-        for keyword in female_keywords:
-            if keyword in text_lower:
-                found_gender = "Female"
-                break
-    
-    if found_gender:
-        profile.add_info("gender", found_gender)
-        print(f"[EXTRACTION] Found gender: {found_gender}")
-    
-    # Occupation keywords
-    occupations = ["student", "farmer", "businessman", "employee", "doctor", "engineer", 
-                   "teacher", "nurse", "laborer", "self-employed", "unemployed", "retired"]
-    for occ in occupations:
-        if occ in text_lower:
-            profile.add_info("occupation", occ.title())
-            print(f"[EXTRACTION] Found occupation: {occ.title()}")
-            break
-    
-    # Disability keywords
-    if any(word in text_lower for word in ["disabled", "disability", "pwd", "physically challenged"]):
-        profile.add_info("disability", "Yes")
-        print(f"[EXTRACTION] Found disability: Yes")
-    
-    # Income/poverty keywords
-    if any(word in text_lower for word in ["poor", "low income", "below poverty", "bpl"]):
-        profile.add_info("family_income", "Low")
-        print(f"[EXTRACTION] Found income: Low")
-    elif any(word in text_lower for word in ["middle class", "medium income", "stable income"]):
-        profile.add_info("family_income", "Medium")
-        print(f"[EXTRACTION] Found income: Medium")
+    for field, value in extract_profile_fields(text).items():
+        profile.add_info(field, value)
+        print(f"[EXTRACTION] Found {field}: {value}")
     
     # Store raw text
     profile.add_raw_text(text)
@@ -174,23 +153,24 @@ async def is_greeting_or_simple_message(text: str) -> bool:
 # NATURAL RESPONSE
 # ===============================
 
-async def generate_natural_response(text, profile, chat_history) -> str:
-    prompt = f"""
+def build_natural_response_prompt(text, profile, chat_history) -> str:
+    # chat_history holds earlier turns only; the current message is quoted once below
+    history = f"\nRecent conversation:\n{chat_history}\n" if chat_history else ""
+    return f"""
 You are a friendly Indian government schemes assistant.
 
 User profile:
-{profile.get_profile_summary()}
-
-Recent conversation:
-{safe_truncate(chat_history, 500)}
-
+{prompt_builder.profile_section(profile)}
+{history}
 User said:
 {text}
 
 Respond naturally in 1–2 sentences.
 """
 
-    response = await llm.ainvoke([HumanMessage(content=prompt)])
+async def generate_natural_response(text, profile, chat_history) -> str:
+    prompt = build_natural_response_prompt(text, profile, chat_history)
+    response = await llm_gateway.ainvoke(prompt, llm=llm)
     return response.content
 
 # ===============================
@@ -219,6 +199,7 @@ async def detect_intent(text: str) -> str:
 # ===============================
 
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    started = time.perf_counter()
     try:
         user_text = update.message.text
         chat_id = str(update.effective_chat.id)
@@ -227,27 +208,36 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         print(f"[USER {chat_id}] {user_text}")
         print(f"{'='*60}")
 
+        # Pin one catalog version for the whole request (hot reloads swap it)
+        catalog = load_catalog()
+
         # ---------------------------
         # CHAT MEMORY
         # ---------------------------
 
-        chat_memory.setdefault(chat_id, []).append(user_text)
-        recent_messages = chat_memory[chat_id][-MAX_MESSAGES:]
-        full_chat_context = safe_truncate(" ".join(recent_messages), MAX_CONTEXT_CHARS)
+        # Loaded off the event loop on a cache miss; later lookups this turn are hits
+        session = await get_sessions().aget(chat_id)
+        # Earlier messages within the history token budget, older ones summarized;
+        # built before this turn is stored, since prompts quote it separately
+        chat_history = prompt_builder.history_section(chat_id, session.memory, session.message_count)
+        session.add_message(user_text)
 
         # ---------------------------
         # USER PROFILE
         # ---------------------------
 
         user_profile = get_or_create_profile(chat_id)
-        await extract_user_info_from_text(user_text, user_profile)
+        with STAGE_SECONDS.time(stage="profile"):
+            await extract_user_info_from_text(user_text, user_profile)
 
         # ---------------------------
         # INTENT
         # ---------------------------
 
-        intent = await detect_intent(user_text)
+        with STAGE_SECONDS.time(stage="intent"):
+            intent = await detect_intent(user_text)
         print(f"[INTENT] {intent}")
+        REQUESTS.inc(intent=intent)
 
         # ---------------------------
         # GREETING / SIMPLE
@@ -255,10 +245,15 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         if intent == "greeting":
             print(f"[HANDLER] Treating as greeting")
-            reply = await generate_natural_response(
-                user_text, user_profile, full_chat_context
-            )
-            await update.message.reply_text(reply)
+            with STAGE_SECONDS.time(stage="reply"):
+                if STREAM_REPLIES:
+                    prompt = build_natural_response_prompt(user_text, user_profile, chat_history)
+                    await stream_reply(update.message, llm_gateway.astream(prompt, llm=llm), STREAM_EDIT_INTERVAL)
+                    return
+                reply = await generate_natural_response(
+                    user_text, user_profile, chat_history
+                )
+                await update.message.reply_text(reply)
             return
 
         # ---------------------------
@@ -266,9 +261,9 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # ---------------------------
 
         m = re.search(r"\d+", user_text)
-        if m and chat_id in last_shown_schemes:
+        if m and session.last_shown:
             idx = int(m.group()) - 1
-            schemes = last_shown_schemes[chat_id]
+            schemes = session.last_shown
             if 0 <= idx < len(schemes):
                 s = schemes[idx]
                 await update.message.reply_text(
@@ -282,11 +277,23 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         if intent == "pdf_request":
             print(f"[HANDLER] PDF request")
-            safe_context = safe_truncate(full_chat_context, 1000)
+            profile_data = user_profile.get_profile()
 
-            schemes_list = get_eligible_schemes_using_ai(
-                safe_context
-            )
+            with STAGE_SECONDS.time(stage="eligibility"):
+                if profile_data.get("age") is not None and profile_data.get("state") is not None:
+                    # Same structured context as the eligibility query -> shares its cache entry
+                    schemes_list = await aget_eligible_schemes_using_ai(
+                        user_profile.get_eligibility_summary(),
+                        catalog=catalog,
+                        profile_fingerprint=user_profile.get_fingerprint(),
+                        profile_data=profile_data,
+                        priority=PRIORITY_BACKGROUND
+                    )
+                else:
+                    schemes_list = await aget_eligible_schemes_using_ai(
+                        chat_history, catalog=catalog, profile_data=profile_data,
+                        priority=PRIORITY_BACKGROUND
+                    )
             
             print(f"[PDF] Found {len(schemes_list)} eligible schemes")
 
@@ -295,17 +302,18 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 I need a bit more information like your age, income, state,
 and occupation to generate your scheme PDF.
 """
-                resp = await llm.ainvoke([HumanMessage(content=clarification)])
+                resp = await llm_gateway.ainvoke(clarification, llm=llm)
                 await update.message.reply_text(resp.content)
                 return
 
             pdf_path = f"eligible_schemes_{chat_id}.pdf"
 
-            generate_schemes_pdf(
-                schemes_list,
-                pdf_path,
-                user_profile.get_profile_summary()
-            )
+            with STAGE_SECONDS.time(stage="pdf"):
+                generate_schemes_pdf(
+                    schemes_list,
+                    pdf_path,
+                    user_profile.get_profile_summary()
+                )
 
             with open(pdf_path, "rb") as f:
                 await update.message.reply_document(f, filename="eligible_schemes.pdf")
@@ -344,11 +352,18 @@ and occupation to generate your scheme PDF.
                 return
             
             # User has provided enough info, get eligible schemes
+            # (structured fields only, so identical profiles share cached answers)
             print(f"[ELIGIBILITY] User profile sufficient. Checking eligibility...")
-            profile_summary = user_profile.get_profile_summary()
+            profile_summary = user_profile.get_eligibility_summary()
             print(f"[ELIGIBILITY] Profile summary:\n{profile_summary}")
             
-            schemes_list = get_eligible_schemes_using_ai(profile_summary)
+            with STAGE_SECONDS.time(stage="eligibility"):
+                schemes_list = await aget_eligible_schemes_using_ai(
+                    profile_summary,
+                    catalog=catalog,
+                    profile_fingerprint=user_profile.get_fingerprint(),
+                    profile_data=user_profile.get_profile()
+                )
             
             print(f"[ELIGIBILITY] Found {len(schemes_list)} eligible schemes")
 
@@ -375,32 +390,31 @@ and occupation to generate your scheme PDF.
         print(f"[HANDLER] General query - searching for schemes")
         
         # Clear old search results for this user
-        if chat_id in last_shown_schemes:
-            del last_shown_schemes[chat_id]
+        if session.last_shown:
+            session.last_shown = []
             print(f"[SEARCH] Cleared old results for user {chat_id}")
         
         # Search using ONLY the current user message, not full context
-        schemes_info = search_schemes(user_text)
-        schemes_info = safe_truncate(schemes_info, MAX_SCHEME_CHARS)
+        # (local and web search race; one pass feeds both the prompt and the list)
+        with STAGE_SECONDS.time(stage="search"):
+            search_result = await arun_search(user_text, catalog=catalog)
+        logger.debug("Matched %d schemes (%s)", len(search_result), search_result.source)
+
+        # Each scheme gets a share of the schemes budget, cut at sentence boundaries
+        schemes_info = prompt_builder.schemes_section(search_result.as_list(5))
         
         print(f"[SEARCH] Results:\n{schemes_info[:200]}...")
-
-        matched = search_schemes_as_list(user_text)
-        print(f"[SEARCH] Matched {len(matched)} schemes")
         
-        if matched:
-            last_shown_schemes[chat_id] = [
-                {
-                    "scheme_name": s.get("scheme_name"),
-                    "source_url": s.get("source_url"),
-                    "objective": s.get("objective")
-                }
-                for s in matched[:5]
-            ]
+        if search_result.items:
+            session.last_shown = search_result.as_last_shown(5)
+        # Changed after awaiting the search - make sure the next write-back sees it
+        get_sessions().touch(chat_id)
 
+        # No chat history here: the answer depends only on the parts in the coalescing key
+        profile_text = prompt_builder.profile_section(user_profile)
         prompt = f"""
 User profile:
-{user_profile.get_profile_summary()}
+{profile_text}
 
 User asked:
 {user_text}
@@ -411,16 +425,36 @@ Matching schemes:
 Answer the user's question clearly. If schemes were found, describe them. If not found locally, suggest using the official government website.
 """
 
-        response = await llm.ainvoke([HumanMessage(content=prompt)])
-        await update.message.reply_text(response.content)
+        with STAGE_SECONDS.time(stage="reply"):
+            if STREAM_REPLIES:
+                # Show tokens as they arrive (streams are per chat, so not coalesced)
+                await stream_reply(update.message, llm_gateway.astream(prompt, llm=llm), STREAM_EDIT_INTERVAL)
+                return
+
+            # Same question, same schemes, same profile in flight -> one LLM call
+            flight_key = ("general", normalize_query(user_text), search_result.result_key(5), profile_text)
+            response = await general_llm_flight.do(
+                flight_key, lambda: llm_gateway.ainvoke(prompt, llm=llm)
+            )
+            await update.message.reply_text(response.content)
+
+    except LLMBusyError as e:
+        # Rate-limited even after backoff - tell the user instead of failing hard
+        logger.warning("LLM busy: %s", e)
+        HANDLER_ERRORS.inc(kind="llm_busy")
+        await update.message.reply_text(BUSY_MESSAGE)
 
     except Exception as e:
         print("ERROR:", e)
         print(traceback.format_exc())
+        HANDLER_ERRORS.inc(kind="exception")
         await update.message.reply_text(
             "Something went wrong. Please try again."
         )
 
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="total")
+
 # ===============================
 # START COMMAND HANDLER
 # ===============================
@@ -476,6 +510,27 @@ Please select your preferred language:
     reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text(welcome_message, reply_markup=reply_markup)
 
+# ===============================
+# RELOAD COMMAND HANDLER
+# ===============================
+
+async def reload_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Handle /reload command - rebuild the scheme catalog without a restart (admins only)."""
+    chat_id = str(update.effective_chat.id)
+    if chat_id not in ADMIN_CHAT_IDS:
+        logger.warning("Ignored /reload from non-admin chat %s", chat_id)
+        return
+
+    # Build off the event loop; in-flight requests keep their catalog version
+    try:
+        catalog = await asyncio.to_thread(get_catalog_manager().reload)
+    except Exception as e:
+        logger.exception("Catalog reload failed")
+        await update.message.reply_text(f"Catalog reload failed: {e}")
+        return
+
+    await update.message.reply_text(f"Catalog reloaded: v{catalog.version}, {len(catalog)} schemes.")
+
 # ===============================
 # LANGUAGE SELECTION CALLBACK
 # ===============================
@@ -504,7 +559,7 @@ async def language_selected(update: Update, context: ContextTypes.DEFAULT_TYPE):
     selected_language = language_map.get(query.data, "English")
     
     # Store language preference in user profile
-    user_profile = get_or_create_profile(chat_id)
+    user_profile = (await get_sessions().aget(chat_id)).profile
     user_profile.add_info("language", selected_language)
     
     print(f"[LANGUAGE] User {chat_id} selected: {selected_language}")
@@ -537,24 +592,54 @@ Type /help for more commands.
 # BOT STARTUP
 # ===============================
 
+async def start_background_tasks(application: Application) -> None:
+    """Evict idle sessions (and their prompt summaries) and watch event loop lag in the background."""
+    sessions = get_sessions()
+    sessions.on_evict(prompt_builder.forget)
+    sessions.start_sweeper(SESSION_SWEEP_INTERVAL, busy=update_processor.active_chats)
+    metrics.loop_monitor.start(LOOP_LAG_INTERVAL)
+
+async def save_sessions(application: Application) -> None:
+    """Write back outstanding session changes before the bot exits."""
+    sessions = get_sessions()
+    await sessions.close()
+    logger.info("Sessions closed (%d writes in %d batches)", sessions.writes, sessions.flushes)
+
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     print("[*] Starting Telegram bot...")
 
-    schemes = get_all_schemes()
-    print(f"[OK] Loaded {len(schemes)} schemes")
-
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    catalog = load_catalog()
+    print(f"[OK] Loaded {len(catalog)} schemes")
+    get_catalog_manager().start_watching(CATALOG_WATCH_INTERVAL)
+
+    app = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(update_processor)
+        .post_init(start_background_tasks)
+        .post_shutdown(save_sessions)
+        .build()
+    )
     
     # Add /start command handler
     app.add_handler(CommandHandler("start", start_command))
     
+    # Add /reload command handler (hot-swap the scheme catalog)
+    app.add_handler(CommandHandler("reload", reload_command))
+    
     # Add language selection callback handler
     app.add_handler(CallbackQueryHandler(language_selected, pattern="^lang_"))
     
     # Add message handler for regular messages
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
-    app.run_polling()
+
+    if BOT_MODE == "webhook":
+        # Updates and the health route on one async server, no extra thread
+        asyncio.run(run_webhook(app, PORT, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET))
+    else:
+        keep_alive()
+        app.run_polling()
 
 if __name__ == "__main__":
-    keep_alive()
     main()
@@ -0,0 +1,341 @@
+"""
+Health, readiness and Prometheus metrics.
+
+Handlers record into module-level metrics (REQUESTS, STAGE_SECONDS,
+OUTBOUND_REQUESTS, ...). Components that already keep their own
+counters (caches, single-flight groups, the LLM gateway, the session
+cache) are exported through collectors that read their stats() when
+/metrics is scraped, so nothing is counted twice.
+
+Readiness is a set of named checks (catalog loaded, event loop
+responsive, LLM not rate-limited) registered at startup; /readyz is 503
+while any of them fails. Both HTTP servers (the Flask keep-alive thread
+and the aiohttp webhook server) serve the same three routes from here.
+"""
+
+import asyncio
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+PREFIX = "schemesathi_"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; handler stages range from sub-millisecond lookups to LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# (labels, value) pairs of one metric family
+Samples = list[tuple[dict[str, str], float]]
+# Collector output: (name without prefix, "counter" | "gauge", help, samples)
+Family = tuple[str, str, str, Samples]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels (thread-safe)."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[n]) for n in self.labelnames), 0.0)
+
+    def lines(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{PREFIX}{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels (thread-safe)."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # labels -> [per-bucket counts..., sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0.0] * (len(self.buckets) + 1)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe how long the with-block took (also when it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def lines(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((key, list(counts)) for key, counts in self._values.items())
+        for key, counts in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels({**labels, "le": _format_value(bound)})
+                yield f"{PREFIX}{self.name}_bucket{le} {_format_value(cumulative)}"
+            yield f"{PREFIX}{self.name}_sum{_format_labels(labels)} {_format_value(counts[-1])}"
+            yield f"{PREFIX}{self.name}_count{_format_labels(labels)} {_format_value(cumulative)}"
+
+
+class Registry:
+    """Metrics and collectors rendered together in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labelnames: tuple[str, ...] = (),
+                  buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register(self, collector: Callable[[], Iterable[Family]]) -> None:
+        """Add a function called on every scrape that returns metric families."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {PREFIX}{metric.name} {metric.help}")
+            lines.append(f"# TYPE {PREFIX}{metric.name} {metric.kind}")
+            lines.extend(metric.lines())
+
+        # Collectors may report the same family (e.g. one per cache); merge their samples
+        families: dict[str, tuple[str, str, Samples]] = {}
+        for collector in self._collectors:
+            try:
+                collected = list(collector())
+            except Exception as e:
+                print(f"[METRICS] Collector {getattr(collector, '__name__', collector)} failed: {e}")
+                continue
+            for name, kind, help, samples in collected:
+                families.setdefault(name, (kind, help, []))[2].extend(samples)
+        for name, (kind, help, samples) in families.items():
+            lines.append(f"# HELP {PREFIX}{name} {help}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines.extend(f"{PREFIX}{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter("requests_total", "Messages handled, by detected intent", ("intent",))
+HANDLER_ERRORS = REGISTRY.counter("handler_errors_total", "Messages that ended in an error reply", ("kind",))
+STAGE_SECONDS = REGISTRY.histogram("stage_seconds", "Time spent per message handling stage", ("stage",))
+OUTBOUND_REQUESTS = REGISTRY.counter(
+    "outbound_requests_total", "Requests to external services (LLM calls are in llm_calls_total)",
+    ("service", "outcome"),
+)
+
+
+# ---------------------------
+# COLLECTORS
+# ---------------------------
+
+def cache_collector(name: str, stats: Callable[[], dict[str, Any]]) -> Callable[[], list[Family]]:
+    """Hit / miss counters, hit ratio and size of a cache with TTLCache-style stats()."""
+    def collect() -> list[Family]:
+        s = stats()
+        hits, misses = s.get("hits", 0), s.get("misses", 0)
+        labels = {"cache": name}
+        families = [
+            ("cache_hits_total", "counter", "Cache hits", [(labels, hits)]),
+            ("cache_misses_total", "counter", "Cache misses", [(labels, misses)]),
+            ("cache_hit_ratio", "gauge", "Cache hits / lookups since start",
+             [(labels, hits / (hits + misses) if hits + misses else 0.0)]),
+        ]
+        if "size" in s or "cached" in s:
+            families.append(("cache_entries", "gauge", "Entries held in memory", [(labels, s.get("size", s.get("cached")))]))
+        if "evictions" in s:
+            families.append(("cache_evictions_total", "counter", "Entries evicted", [(labels, s["evictions"])]))
+        return families
+    collect.__name__ = f"cache_collector_{name}"
+    return collect
+
+
+def singleflight_collector(*flights) -> Callable[[], list[Family]]:
+    """Calls started vs. callers that joined an in-flight call, per SingleFlight group."""
+    def collect() -> list[Family]:
+        return [
+            ("singleflight_calls_total", "counter", "Calls actually started",
+             [({"group": f.name}, f.calls) for f in flights]),
+            ("singleflight_shared_total", "counter", "Callers served by an in-flight call",
+             [({"group": f.name}, f.shared) for f in flights]),
+        ]
+    return collect
+
+
+def stats_collector(name: str, help: str, stats: Callable[[], dict[str, Any]], counters: tuple[str, ...] = (),
+                    fields: tuple[str, ...] | None = None) -> Callable[[], list[Family]]:
+    """
+    Numeric stats() fields (all, or just `fields`) as `<name>_<field>`;
+    fields in `counters` are exported as counters.
+    """
+    def collect() -> list[Family]:
+        families = []
+        for field, value in stats().items():
+            if fields is not None and field not in fields:
+                continue
+            if isinstance(value, (bool, int, float)):
+                kind = "counter" if field in counters else "gauge"
+                suffix = "_total" if kind == "counter" else ""
+                families.append((f"{name}_{field}{suffix}", kind, f"{help}: {field}", [({}, float(value))]))
+        return families
+    collect.__name__ = f"stats_collector_{name}"
+    return collect
+
+
+# ---------------------------
+# READINESS
+# ---------------------------
+
+class LoopLagMonitor:
+    """
+    Measures event loop responsiveness: a task sleeps `interval` seconds
+    and records how late it woke up. While the loop is blocked the task
+    cannot run, so lag also counts the time since it was last due.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._last_beat = time.monotonic()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def lag(self) -> float:
+        overdue = time.monotonic() - self._last_beat - self.interval
+        return max(self.last_lag, overdue, 0.0)
+
+    def start(self, interval: float | None = None) -> None:
+        """Start sampling on the running event loop (every `interval` seconds if given)."""
+        if interval:
+            self.interval = interval
+        if self._task is None or self._task.done():
+            self._last_beat = time.monotonic()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.last_lag = max(now - expected, 0.0)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            self._last_beat = now
+
+    def collect(self) -> list[Family]:
+        return [
+            ("event_loop_lag_seconds", "gauge", "How late the event loop ran a timer", [({}, self.lag)]),
+            ("event_loop_lag_max_seconds", "gauge", "Worst event loop lag since start", [({}, self.max_lag)]),
+        ]
+
+
+loop_monitor = LoopLagMonitor()
+REGISTRY.register(loop_monitor.collect)
+
+_readiness_checks: dict[str, Callable[[], bool]] = {}
+
+
+def add_readiness_check(name: str, check: Callable[[], bool]) -> None:
+    """Register a check for /readyz; it should be cheap and must not block."""
+    _readiness_checks[name] = check
+
+
+def readiness() -> tuple[bool, dict[str, bool]]:
+    """(all checks passed, {check name: passed}); a check that raises counts as failed."""
+    results = {}
+    for name, check in _readiness_checks.items():
+        try:
+            results[name] = bool(check())
+        except Exception as e:
+            print(f"[METRICS] Readiness check {name} failed: {e}")
+            results[name] = False
+    return all(results.values()), results
+
+
+def _readiness_collector() -> list[Family]:
+    ready, checks = readiness()
+    return [
+        ("ready", "gauge", "1 when every readiness check passes", [({}, float(ready))]),
+        ("readiness_check", "gauge", "1 when the readiness check passes",
+         [({"check": name}, float(ok)) for name, ok in checks.items()]),
+    ]
+
+
+REGISTRY.register(_readiness_collector)
+
+
+# ---------------------------
+# HTTP RESPONSES (shared by both servers)
+# ---------------------------
+
+def health_response() -> tuple[int, str]:
+    """/healthz: the process is up and serving HTTP."""
+    return 200, "ok"
+
+
+def readiness_response() -> tuple[int, str]:
+    """/readyz: 200 with the check results when ready, 503 otherwise."""
+    ready, checks = readiness()
+    return (200 if ready else 503), json.dumps({"ready": ready, "checks": checks})
+
+
+def metrics_response() -> tuple[int, str]:
+    """/metrics: everything in Prometheus text format (CONTENT_TYPE)."""
+    return 200, REGISTRY.render()
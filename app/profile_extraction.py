@@ -0,0 +1,251 @@
+"""
+Single-pass extraction of profile fields from a chat message.
+
+Every keyword (states and UTs with their synonyms, gender, occupation,
+disability, income class, caste) is compiled into one word-bounded
+alternation alongside the age and income-amount patterns, so a message
+is scanned once. Each match is turned into a (field, value) pair by the
+action table for its alternative; the first match per field wins.
+
+Gender and occupation words inside a scheme name ("PM Kisan", "Mahila
+Samman Yojana") describe the scheme, not the user, and are skipped.
+"""
+
+import re
+from typing import Any
+
+from app.eligibility_rules import OCCUPATIONS
+from app.india import STATES_AND_UTS, STATE_SYNONYMS
+
+GENDER_WORDS = {
+    "Male": ("male", "man", "boy", "gentleman", "mr", "ladka", "purush"),
+    "Female": ("female", "woman", "girl", "lady", "mrs", "ms", "ladki", "mahila"),
+}
+
+OCCUPATION_SYNONYMS = {
+    "Student": ("studying", "college student", "school student"),
+    "Farmer": ("farming", "agriculturist", "cultivator", "kisan"),
+    "Businessman": ("business owner", "businesswoman", "shopkeeper", "entrepreneur", "trader"),
+    "Employee": ("salaried", "government employee", "private job", "government job"),
+    "Laborer": ("labourer", "labour", "daily wage", "daily wager", "construction worker", "mazdoor"),
+    "Self-Employed": ("self employed",),
+    "Unemployed": ("jobless", "no job", "job seeker"),
+    "Retired": ("pensioner",),
+}
+
+DISABILITY_WORDS = (
+    "disabled", "disability", "pwd", "physically challenged", "handicapped", "divyang",
+    "blind", "deaf", "visually impaired", "hearing impaired", "wheelchair",
+)
+
+INCOME_CLASS_WORDS = {
+    "Low": ("poor", "low income", "below poverty line", "below poverty", "bpl"),
+    "Medium": ("middle class", "medium income", "stable income"),
+}
+
+CASTE_WORDS = {
+    "SC": ("scheduled caste", "dalit", "sc category"),
+    "ST": ("scheduled tribe", "adivasi", "st category"),
+    "OBC": ("obc", "other backward class", "other backward classes", "backward class"),
+    "EWS": ("ews", "economically weaker section"),
+    "General": ("general category",),
+}
+
+# Irregular plurals of keyword words; the rest take "s"
+IRREGULAR_PLURALS = {"man": "men", "woman": "women", "gentleman": "gentlemen", "lady": "ladies"}
+# Fields whose keywords also match in the plural, but only about the user
+# ("we are farmers"); "scholarship for girls" describes the scheme
+PLURAL_FIELDS = ("gender", "occupation")
+
+# Words that open or close a scheme name around a keyword
+SCHEME_NAME_PREFIXES = ("pm", "pradhan mantri", "mukhyamantri", "mukhya mantri", "cm", "rashtriya", "national")
+SCHEME_NAME_WORDS = (
+    "scheme", "schemes", "yojana", "yojna", "nidhi", "samman", "abhiyan", "mission", "card", "bima", "kendra",
+)
+# Fields whose keywords are skipped inside a scheme name
+SCHEME_NAME_FIELDS = ("gender", "occupation")
+
+RUPEE_UNITS = {"lakh": 100_000, "lac": 100_000, "crore": 10_000_000, "thousand": 1_000, "k": 1_000}
+
+# Smallest income taken without a currency sign or unit ("income 20" is not rupees)
+_MIN_BARE_INCOME = 1_000
+
+# Shortest / longest plausible age
+_AGE_RANGE = (1, 120)
+
+
+def _keyword_actions() -> dict[str, tuple[str, Any]]:
+    actions: dict[str, tuple[str, Any]] = {}
+    for state in STATES_AND_UTS:
+        actions[state.lower()] = ("state", state)
+    for synonym, state in STATE_SYNONYMS.items():
+        actions[synonym] = ("state", state)
+    for gender, words in GENDER_WORDS.items():
+        actions.update((w, ("gender", gender)) for w in words)
+    for occupation in OCCUPATIONS:
+        actions[occupation] = ("occupation", occupation.title())
+    for occupation, words in OCCUPATION_SYNONYMS.items():
+        actions.update((w, ("occupation", occupation)) for w in words)
+    actions.update((w, ("disability", "Yes")) for w in DISABILITY_WORDS)
+    for income_class, words in INCOME_CLASS_WORDS.items():
+        actions.update((w, ("family_income", income_class)) for w in words)
+    for caste, words in CASTE_WORDS.items():
+        actions.update((w, ("caste", caste)) for w in words)
+    for word, action in list(actions.items()):
+        if action[0] in PLURAL_FIELDS and _plural(word) not in actions:
+            actions[_plural(word)] = action
+            PLURAL_KEYWORDS.add(_plural(word))
+    return actions
+
+
+def _plural(phrase: str) -> str:
+    """Plural of a keyword phrase (its last word): "girl" -> "girls", "woman" -> "women"."""
+    *head, last = phrase.split(" ")
+    if last in IRREGULAR_PLURALS:
+        last = IRREGULAR_PLURALS[last]
+    elif not last.endswith("s") and len(last) > 2:
+        last += "s"
+    return " ".join((*head, last))
+
+
+# Plural forms added by _keyword_actions (only counted after "we are")
+PLURAL_KEYWORDS: set[str] = set()
+# Normalized keyword -> (profile field, value)
+KEYWORD_ACTIONS = _keyword_actions()
+
+
+def _trie_pattern(phrases) -> str:
+    """
+    One regex alternation for phrases, factored as a character trie
+    ("mahila|male|man" -> "ma(?:hila|le|n)") so the engine branches once
+    per character instead of trying every phrase at every position.
+    Longer continuations are tried first; spaces match any whitespace.
+    """
+    trie: dict = {}
+    for phrase in phrases:
+        node = trie
+        for ch in " ".join(phrase.split()):
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [(r"\s+" if ch == " " else re.escape(ch)) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if len(branches) == 1 and "" not in node:
+            return branches[0]
+        group = "(?:" + "|".join(branches) + ")"
+        return group + "?" if "" in node else group
+
+    return build(trie)
+
+
+_INCOME = (
+    r"(?:(?:monthly|annual|yearly|family|household|total)\s+)*"
+    r"(?:income|salary|earnings?|earn(?:s|ing)?)\b"
+    # Only filler words between the keyword and the amount, so the match
+    # cannot run on into another clause ("I earn nothing, I am 20")
+    r"(?:\s*(?:[:=~-]|\b(?:is|was|of|about|around|approx(?:imately)?|nearly|roughly|only|just|under|below"
+    r"|less\s+than|up\s*to)\b))*"
+    r"\s*(?P<currency>₹|\brs\.?|\binr)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)\s*(?P<unit>lakhs?|lacs?|crores?|thousand|k)?\b"
+    r"(?P<per_month>\s*(?:per|a|/|every)\s*month|\s*monthly|\s*p\.?m\.?)?"
+)
+_AGE = (
+    r"(?:age|aged)\b(?:\s*(?:is|:|=|of))*\s*(?P<age_after>\d{1,3})\b"
+    # "I am 22 years"
+    r"|(?:i\s+am|i'm|im)\s+(?P<age_stated>\d{1,3})\s*(?:years?|yrs?)\b"
+    # "22 years old", "22yrs of age", "22-year-old", "22 y/o"; a bare
+    # "5 years" is usually a duration ("2 years of experience")
+    r"|(?<!for )(?<!since )(?<!past )(?<!last )(?P<age_before>\d{1,3})"
+    r"\s*(?:-?\s*(?:years?|yrs?)\s*-?\s*(?:old|of\s+age)\b|y/o\b)"
+)
+# Bare SC / ST (only counted when written in capitals, see below)
+_CASTE_ABBREVIATION = r"(?:sc|st)\b"
+
+# Runs on lowercased text (IGNORECASE makes the keyword trie several times
+# slower). Every alternative starts at a word boundary, checked once per
+# position; alternatives are then tried in order.
+_MATCHER = re.compile(
+    rf"\b(?:(?P<income>{_INCOME})"
+    rf"|(?P<age>{_AGE})"
+    rf"|(?P<caste_abbreviation>{_CASTE_ABBREVIATION})"
+    rf"|(?P<keyword>{_trie_pattern(KEYWORD_ACTIONS)}\b))"
+)
+
+
+def _income_action(match: re.Match, text: str) -> tuple[str, Any] | None:
+    amount = float(match.group("amount").replace(",", ""))
+    unit = (match.group("unit") or "").rstrip("s")
+    if not unit and not match.group("currency") and amount < _MIN_BARE_INCOME:
+        return None
+    amount *= RUPEE_UNITS.get(unit, 1)
+    if match.group("per_month") or "month" in match.group("income"):
+        amount *= 12
+    return ("income", int(amount)) if amount > 0 else None
+
+
+def _age_action(match: re.Match, text: str) -> tuple[str, Any] | None:
+    age = int(match.group("age_after") or match.group("age_stated") or match.group("age_before"))
+    low, high = _AGE_RANGE
+    return ("age", age) if low <= age <= high else None
+
+
+def _caste_abbreviation_action(match: re.Match, text: str) -> tuple[str, Any] | None:
+    # "I am SC" is a caste, "St. Xavier's" is not
+    original = text[match.start():match.end()]
+    return ("caste", original) if original.isupper() else None
+
+
+_SCHEME_NAME_BEFORE = re.compile(r"\b(?:" + "|".join(SCHEME_NAME_PREFIXES).replace(" ", r"\s+") + r")\s+$")
+# The keyword, then at most one more word, then a scheme-name word
+_SCHEME_NAME_AFTER = re.compile(r"(?:\s+[a-z]+)?\s+(?:" + "|".join(SCHEME_NAME_WORDS) + r")\b")
+# "we are", "we're" or "we", then at most one more word ("we are small farmers")
+_FIRST_PERSON_PLURAL = re.compile(r"\bwe(?:\s+are|'re)?\s+(?:[a-z]+\s+)?$")
+
+
+def _in_scheme_name(match: re.Match) -> bool:
+    lowered = match.string
+    before = lowered[max(0, match.start() - 30):match.start()]
+    return bool(_SCHEME_NAME_BEFORE.search(before) or _SCHEME_NAME_AFTER.match(lowered, match.end()))
+
+
+def _about_user(match: re.Match) -> bool:
+    lowered = match.string
+    return bool(_FIRST_PERSON_PLURAL.search(lowered[max(0, match.start() - 30):match.start()]))
+
+
+def _keyword_action(match: re.Match, text: str) -> tuple[str, Any] | None:
+    keyword = " ".join(match.group().split())
+    action = KEYWORD_ACTIONS.get(keyword)
+    if action is not None and action[0] in SCHEME_NAME_FIELDS and _in_scheme_name(match):
+        return None
+    if keyword in PLURAL_KEYWORDS and not _about_user(match):
+        return None
+    return action
+
+
+# Matched alternative -> action returning (field, value) or None
+_FIELD_ACTIONS = {
+    "income": _income_action,
+    "age": _age_action,
+    "caste_abbreviation": _caste_abbreviation_action,
+    "keyword": _keyword_action,
+}
+
+
+def extract_profile_fields(text: str) -> dict[str, Any]:
+    """
+    Profile fields mentioned in one message.
+
+    Returns:
+        {field: value} for the fields found, e.g. {"age": 20, "state":
+        "Maharashtra", "income": 180000}; `income` is annual rupees.
+    """
+    fields: dict[str, Any] = {}
+    # str.lower() keeps offsets for the scripts users type here, so match
+    # spans index the original text too
+    for match in _MATCHER.finditer(text.lower()):
+        action = _FIELD_ACTIONS[match.lastgroup](match, text)
+        if action is not None:
+            fields.setdefault(*action)
+    return fields
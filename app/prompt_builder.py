@@ -0,0 +1,193 @@
+"""
+Token-budgeted prompt sections: profile, conversation history and schemes.
+
+Tokens are estimated locally (no tokenizer download, no API call) with a
+BPE-like heuristic: short words are one token, long words one token per
+~4 characters, punctuation one token each, and non-Latin scripts (which
+BPE vocabularies split finely) one token per ~2 characters. Good enough
+to keep prompts inside a budget.
+
+Truncation keeps the *start* of a text and cuts at a sentence boundary,
+so scheme descriptions never start mid-sentence. Chat history that does
+not fit is folded into a per-chat rolling summary, updated incrementally
+as messages age out and cached between turns.
+"""
+
+import math
+import re
+from typing import Any, Iterable
+
+# Default per-section token budgets
+DEFAULT_BUDGETS = {
+    "profile": 120,
+    "history": 250,
+    "summary": 100,
+    "schemes": 600,
+}
+
+# Latin words, runs of non-ASCII text, single ASCII punctuation marks
+_PIECE = re.compile(r"[A-Za-z0-9]+|[^\x00-\x7f\s]+|[^\sA-Za-z0-9]")
+_SENTENCE_END = re.compile(r"(?<=[.!?।])\s+|\n+")
+
+# Words that make an old message worth keeping in the summary
+_SALIENT_WORDS = {
+    "age", "old", "years", "income", "salary", "lakh", "state", "district", "student", "farmer",
+    "woman", "women", "girl", "widow", "disabled", "disability", "caste", "sc", "st", "obc",
+    "scheme", "yojana", "scholarship", "pension", "loan", "business", "job", "unemployed",
+}
+_FILLER_MESSAGES = {"hi", "hello", "hey", "hii", "ok", "okay", "thanks", "thank you", "yes", "no"}
+
+
+def count_tokens(text: str) -> int:
+    """Estimate the number of LLM tokens in text."""
+    if not text:
+        return 0
+    tokens = 0
+    for piece in _PIECE.findall(text):
+        if piece.isascii():
+            tokens += 1 if len(piece) <= 4 else math.ceil(len(piece) / 4)
+        else:
+            tokens += math.ceil(len(piece) / 2)
+    return tokens
+
+
+def split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text) if s.strip()]
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """
+    Keep the start of text within budget tokens, cutting at a sentence
+    boundary (or a word boundary if the first sentence alone is too long).
+    """
+    if count_tokens(text) <= budget:
+        return text
+    kept = []
+    used = 0
+    for sentence in split_sentences(text):
+        cost = count_tokens(sentence)
+        if used + cost > budget:
+            break
+        kept.append(sentence)
+        used += cost
+    if kept:
+        return " ".join(kept)
+
+    words = []
+    used = 1  # room for the ellipsis
+    for word in text.split():
+        cost = count_tokens(word)
+        if used + cost > budget:
+            break
+        words.append(word)
+        used += cost
+    return " ".join(words) + "…" if words else ""
+
+
+def _is_salient(message: str) -> bool:
+    lowered = message.lower()
+    return any(ch.isdigit() for ch in lowered) or bool(set(re.findall(r"[a-z]+", lowered)) & _SALIENT_WORDS)
+
+
+class RollingSummary:
+    """
+    Extractive summary of the messages that aged out of a chat's history.
+
+    Each message is folded in exactly once (tracked by `folded`), so
+    updating the summary each turn only costs the newly aged-out messages.
+    """
+
+    __slots__ = ("notes", "folded")
+
+    def __init__(self):
+        self.notes: list[tuple[bool, str]] = []
+        self.folded = 0
+
+    def fold(self, messages: list[str], note_budget: int, budget: int) -> None:
+        for message in messages:
+            text = " ".join(message.split())
+            if text.lower().strip(" .!?") in _FILLER_MESSAGES:
+                continue
+            self.notes.append((_is_salient(text), truncate_to_tokens(text, note_budget)))
+        self.folded += len(messages)
+
+        # Over budget: drop the oldest small talk first, then the oldest facts
+        while self.notes and count_tokens(self.text()) > budget:
+            chatter = next((i for i, (salient, _) in enumerate(self.notes) if not salient), 0)
+            del self.notes[chatter]
+
+    def text(self) -> str:
+        return " | ".join(note for _, note in self.notes)
+
+
+class PromptBuilder:
+    """Builds prompt sections within per-section token budgets."""
+
+    def __init__(self, budgets: dict[str, int] | None = None):
+        self.budgets = {**DEFAULT_BUDGETS, **(budgets or {})}
+        self._summaries: dict[str, RollingSummary] = {}
+
+    def forget(self, chat_id: str) -> None:
+        """Drop the cached summary of a chat (on /start or when its history is cleared)."""
+        self._summaries.pop(chat_id, None)
+
+    def profile_section(self, profile: Any) -> str:
+        """Structured profile fields (UserProfile.get_eligibility_summary()) within budget."""
+        return truncate_to_tokens(profile.get_eligibility_summary(), self.budgets["profile"])
+
+    def history_section(self, chat_id: str, messages: Iterable[str], total: int | None = None) -> str:
+        """
+        The most recent whole messages that fit the history budget, preceded
+        by the rolling summary of everything older.
+
+        `messages` may be only the tail of the chat (a ring buffer); `total`
+        is then the number of messages the chat has ever had, so messages
+        are counted from its start and each is still folded in only once.
+        """
+        messages = list(messages)
+        total = len(messages) if total is None else total
+        offset = total - len(messages)
+        budget = self.budgets["history"]
+        recent = []
+        used = 0
+        for message in reversed(messages):
+            cost = count_tokens(message) + 1
+            if used + cost > budget:
+                break
+            recent.append(message)
+            used += cost
+        recent.reverse()
+
+        older = total - len(recent)
+        summary = self._summaries.get(chat_id)
+        if summary is None or summary.folded > older:
+            # New chat, or history was reset underneath us - start over
+            summary = self._summaries[chat_id] = RollingSummary()
+        # Messages that already left the ring buffer can no longer be folded in
+        summary.folded = max(summary.folded, offset)
+        if older > summary.folded:
+            summary.fold(messages[summary.folded - offset:older - offset], note_budget=30,
+                         budget=self.budgets["summary"])
+
+        lines = []
+        if summary.notes:
+            lines.append(f"Earlier: {summary.text()}")
+        lines.extend(f"- {m}" for m in recent)
+        return "\n".join(lines)
+
+    def schemes_section(self, schemes: list[dict[str, Any]]) -> str:
+        """
+        'Matching schemes' block: each scheme gets an equal share of the
+        budget and its objective is cut at a sentence boundary.
+        """
+        if not schemes:
+            return ""
+        share = self.budgets["schemes"] // len(schemes)
+        blocks = []
+        for i, scheme in enumerate(schemes, 1):
+            source_url = scheme.get("source_url", "Unknown")
+            scheme_name = scheme.get("scheme_name", source_url.split("/")[-1] if source_url else "Unknown")
+            header = f"**Scheme {i}: {scheme_name}** [{scheme.get('source', 'local')}]"
+            objective = truncate_to_tokens(scheme.get("objective", ""), max(share - count_tokens(header), 0))
+            blocks.append(f"{header}\n{objective}" if objective else header)
+        return "\n\n".join(blocks)
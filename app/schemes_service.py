@@ -1,189 +1,285 @@
+import asyncio
 import json
 from typing import Any
-from tavily import TavilyClient
-from app.config import TAVILY_API_KEY
-
-# Global caches for DBMS-like structure
-_scheme_master_cache = None
-_scheme_details_cache = None
-
-# Initialize Tavily client for web search
-_tavily_client = None
-
-def get_tavily_client():
-    """Get or initialize Tavily client."""
-    global _tavily_client
-    if _tavily_client is None:
-        _tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
-    return _tavily_client
+from tavily import AsyncTavilyClient
+from app.config import (
+    TAVILY_API_KEY,
+    SCHEME_SNAPSHOT_PATH,
+    SCHEME_RULES_PATH,
+    RULES_REQUIRED,
+    INDIC_LEXICON_PATH,
+    WEB_SEARCH_DEADLINE,
+    WEB_SEARCH_HEDGE_DELAY,
+    WEB_SEARCH_START_DELAY,
+    LOCAL_SEARCH_MIN_SCORE,
+    CATALOG_OFFLOAD_THRESHOLD,
+)
+from app.catalog import Scheme, SchemeCatalog
+from app.catalog_manager import CatalogManager
+from app.eligibility_rules import evaluate_rules
+from app.indic import IndicLexicon
+from app.metrics import OUTBOUND_REQUESTS
+from app.search_index import tokenize_query
+from app.singleflight import SingleFlight, normalize_query
+
+# Live catalog managers, one per (master, details, snapshot, rules) path set
+_catalog_managers: dict[tuple, CatalogManager] = {}
+
+# Coalesce identical in-flight searches / Tavily calls across chats
+search_flight = SingleFlight("search")
+web_search_flight = SingleFlight("web search")
+
+# Maps Indic-script / romanized query words onto catalog terms
+indic_lexicon = IndicLexicon.from_json(INDIC_LEXICON_PATH)
+
+# Tavily client for web search (created on first use)
+_async_tavily_client = None
+
+def get_async_tavily_client():
+    """Get or initialize async Tavily client."""
+    global _async_tavily_client
+    if _async_tavily_client is None:
+        _async_tavily_client = AsyncTavilyClient(api_key=TAVILY_API_KEY)
+    return _async_tavily_client
+
+def get_catalog_manager(master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", snapshot_path: str = SCHEME_SNAPSHOT_PATH, rules_path: str = SCHEME_RULES_PATH) -> CatalogManager:
+    """Get or create the catalog manager for a set of data files."""
+    key = (master_path, details_path, snapshot_path, rules_path)
+    manager = _catalog_managers.get(key)
+    if manager is None:
+        manager = _catalog_managers.setdefault(key, CatalogManager(master_path, details_path, snapshot_path, rules_path, RULES_REQUIRED))
+    return manager
+
+def load_catalog(master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", snapshot_path: str = SCHEME_SNAPSHOT_PATH) -> SchemeCatalog:
+    """
+    Return the current immutable scheme catalog (loaded on first use).
+    
+    Prefers the compiled binary snapshot (mmapped, cold fields decoded lazily)
+    when it is up to date, otherwise joins the master + details JSON tables.
+    Hold on to the returned catalog for the whole request: a hot reload swaps
+    in a new version without touching catalogs already handed out.
+    """
+    return get_catalog_manager(master_path, details_path, snapshot_path).get()
 
 def load_scheme_master(path: str = "data/scheme_master.json") -> list[dict[str, Any]]:
-    """Load scheme master (lookup table) and cache."""
-    global _scheme_master_cache
-    if _scheme_master_cache is None:
-        with open(path, "r", encoding="utf-8") as f:
-            _scheme_master_cache = json.load(f)
-    return _scheme_master_cache
+    """Scheme master rows (scheme_id, scheme_name) from the catalog, as caller-owned dicts."""
+    return [{"scheme_id": s.scheme_id, "scheme_name": s.scheme_name} for s in load_catalog(master_path=path).schemes]
 
 def load_scheme_details(path: str = "data/scheme_details.json") -> list[dict[str, Any]]:
-    """Load scheme details and cache."""
-    global _scheme_details_cache
-    if _scheme_details_cache is None:
-        with open(path, "r", encoding="utf-8") as f:
-            _scheme_details_cache = json.load(f)
-    return _scheme_details_cache
+    """Scheme details rows from the catalog, as caller-owned dicts."""
+    rows = []
+    for scheme in load_catalog(details_path=path).schemes:
+        row = scheme.to_dict()
+        del row["scheme_name"]
+        rows.append(row)
+    return rows
+
+def get_scheme_by_id(scheme_id: int, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json") -> Scheme | None:
+    """Retrieve the read-only scheme record using scheme_id as primary key."""
+    return load_catalog(master_path, details_path).get(scheme_id)
 
 def get_scheme_details_by_id(scheme_id: int, details_path: str = "data/scheme_details.json") -> dict[str, Any] | None:
-    """Retrieve scheme details using scheme_id as foreign key."""
-    details = load_scheme_details(details_path)
-    for detail in details:
-        if detail.get("scheme_id") == scheme_id:
-            return detail
-    return None
-
-def search_scheme_master_by_name(query: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json") -> list[int]:
-    """Search scheme master by name AND scheme details (eligibility, benefits, documents) and return matching scheme IDs."""
-    master = load_scheme_master(master_path)
-    details = load_scheme_details(details_path)
+    """Retrieve scheme details using scheme_id as foreign key (caller-owned copy)."""
+    scheme = get_scheme_by_id(scheme_id, details_path=details_path)
+    return scheme.to_dict() if scheme else None
+
+def get_scheme_name_by_id(scheme_id: int, master_path: str = "data/scheme_master.json") -> str | None:
+    """Retrieve scheme name from scheme master using scheme_id as primary key."""
+    scheme = get_scheme_by_id(scheme_id, master_path=master_path)
+    return scheme.scheme_name if scheme else None
+
+def get_scheme_id_by_name(scheme_name: str, master_path: str = "data/scheme_master.json") -> int | None:
+    """Retrieve scheme_id for an exact (case-insensitive) scheme name."""
+    scheme = load_catalog(master_path).get_by_name(scheme_name)
+    return scheme.scheme_id if scheme else None
+
+def search_tokens(query: str, catalog: SchemeCatalog | None = None) -> list[str]:
+    """
+    Catalog search tokens for a query in English, an Indic script or romanized Indic.
     
-    query_lower = query.lower().strip()
-    tokens = [t.strip() for t in query_lower.replace("/", " ").split() if t.strip() and len(t.strip()) > 2]
+    Latin words the catalog already contains are only expanded by exact lexicon forms.
+    """
+    vocabulary = catalog.index.postings if catalog is not None else ()
+    return tokenize_query(indic_lexicon.translate(query, vocabulary))
+
+
+def search_scheme_master_by_name(query: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", ranking: str = "match", top_k: int | None = None, catalog: SchemeCatalog | None = None) -> list[int]:
+    """
+    Search scheme master by name AND scheme details (eligibility, benefits, documents) and return matching scheme IDs.
     
-    print(f"[SEARCH] Query: '{query}' -> Tokens (length > 2): {tokens}")
+    Args:
+        query: User's search text
+        ranking: "match" orders all-token matches before partial matches (file order);
+                 "bm25" orders by BM25F relevance score
+        top_k: Maximum number of IDs to return (None = all matches)
+        catalog: Catalog version to search (defaults to the current one)
+    """
+    if catalog is None:
+        catalog = load_catalog(master_path, details_path)
+    index = catalog.index
     
-    exact_matches = []
-    partial_matches = []
+    tokens = search_tokens(query, catalog)
     
-    # Create a details lookup by scheme_id for faster searching
-    details_dict = {d.get("scheme_id"): d for d in details}
+    print(f"[SEARCH] Query: '{query}' -> Tokens (length > 2): {tokens}")
     
-    for scheme in master:
-        scheme_id = scheme.get("scheme_id")
-        scheme_name = (scheme.get("scheme_name", "") or "").lower()
-        
-        # Get all searchable text from scheme details
-        detail = details_dict.get(scheme_id, {})
-        eligibility_text = " ".join(detail.get("eligibility", [])).lower()
-        benefits_text = " ".join(detail.get("benefits", [])).lower()
-        documents_text = " ".join(detail.get("documents_required", [])).lower()
-        objective_text = (detail.get("objective", "") or "").lower()
-        tags_text = " ".join(detail.get("tags", [])).lower()
-        
-        # Combine all searchable content
-        searchable_text = f"{scheme_name} {objective_text} {eligibility_text} {benefits_text} {documents_text} {tags_text}"
-        
-        if not tokens:
-            continue
-        
-        # Check how many tokens match
-        matching_tokens = 0
-        for term in tokens:
-            if term in searchable_text:
-                matching_tokens += 1
-                print(f"[SEARCH MATCH] ID {scheme_id}: '{term}' found in '{searchable_text[:60]}'")
-        
-        # If all tokens match, it's an exact match
-        if matching_tokens == len(tokens):
-            exact_matches.append(scheme_id)
-        elif matching_tokens > 0:
-            partial_matches.append(scheme_id)
+    if ranking == "bm25":
+        ranked = index.rank(tokens, top_k)
+        print(f"[SEARCH RESULT] BM25 top {len(ranked)}: {[(sid, round(score, 2)) for sid, score in ranked[:5]]}")
+        return [scheme_id for scheme_id, _ in ranked]
+    
+    # Exact = all tokens matched, partial = some tokens matched
+    exact_matches, partial_matches = index.search(tokens)
     
     # Prioritize exact matches first
     result = exact_matches + partial_matches
     print(f"[SEARCH RESULT] Found {len(exact_matches)} exact + {len(partial_matches)} partial = {len(result)} total")
-    return result
+    return result[:top_k] if top_k is not None else result
+
+
+def _web_response_to_schemes(response: dict[str, Any]) -> list[dict[str, Any]]:
+    """Convert a Tavily search response into scheme dicts."""
+    web_schemes = []
+    if response.get("results"):
+        for i, result in enumerate(response["results"][:5], 1):
+            scheme_data = {
+                "source_url": result.get("url", ""),
+                "scheme_name": result.get("title", f"Scheme {i}"),
+                "objective": result.get("content", ""),
+                "source": "web_search"
+            }
+            web_schemes.append(scheme_data)
+    return web_schemes
 
 
-def search_web_for_schemes(query: str) -> list[dict[str, Any]]:
+async def asearch_web_for_schemes(query: str, deadline: float = WEB_SEARCH_DEADLINE, hedge_after: float = WEB_SEARCH_HEDGE_DELAY) -> list[dict[str, Any]]:
     """
-    Search the web using Tavily AI when data is not available locally.
+    Async Tavily web search, shared by concurrent callers with the same query.
     
-    Args:
-        query: Search query for government schemes
+    See _asearch_web_for_schemes; each caller gets its own copies of the results.
+    """
+    results = await web_search_flight.do(
+        ("web", normalize_query(query), deadline, hedge_after),
+        lambda: _asearch_web_for_schemes(query, deadline, hedge_after),
+    )
+    return [dict(r) for r in results]
+
+async def _asearch_web_for_schemes(query: str, deadline: float, hedge_after: float) -> list[dict[str, Any]]:
+    """
+    Async Tavily web search with a hard deadline and a hedged request.
+    
+    If the first request has not answered after `hedge_after` seconds, an
+    identical second request is sent and whichever answers first wins. When
+    `deadline` expires, all pending requests are cancelled and whatever has
+    completed so far is returned (possibly nothing).
     
     Returns:
         List of scheme information from web search
     """
-    try:
-        client = get_tavily_client()
-        
-        # Enhance query to focus on Indian government schemes
-        enhanced_query = f"Indian government schemes {query}"
-        
-        # Perform web search
-        response = client.search(query=enhanced_query, max_results=5)
-        
-        web_schemes = []
-        if response.get("results"):
-            for i, result in enumerate(response["results"][:5], 1):
-                scheme_data = {
-                    "source_url": result.get("url", ""),
-                    "scheme_name": result.get("title", f"Scheme {i}"),
-                    "objective": result.get("content", ""),
-                    "source": "web_search"
-                }
-                web_schemes.append(scheme_data)
-        
-        return web_schemes
-    
-    except Exception as e:
-        print(f"Tavily web search error: {e}")
-        return []
+    client = get_async_tavily_client()
+    enhanced_query = f"Indian government schemes {query}"
+    loop = asyncio.get_running_loop()
+    stop_at = loop.time() + deadline
 
+    def start_request() -> asyncio.Task:
+        return asyncio.create_task(client.search(query=enhanced_query, max_results=5, timeout=deadline))
 
-def search_schemes(query: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json") -> str:
+    pending = {start_request()}
+    hedged = hedge_after <= 0 or hedge_after >= deadline
+    collected: list[dict[str, Any]] = []
+
+    try:
+        while pending:
+            remaining = stop_at - loop.time()
+            if remaining <= 0:
+                print(f"[WEB] Deadline {deadline}s expired with {len(pending)} request(s) pending")
+                break
+            wait_for = remaining if hedged else min(remaining, hedge_after)
+            done, pending = await asyncio.wait(pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                try:
+                    collected.extend(_web_response_to_schemes(task.result()))
+                    OUTBOUND_REQUESTS.inc(service="tavily", outcome="ok")
+                except Exception as e:
+                    print(f"Tavily web search error: {e}")
+                    OUTBOUND_REQUESTS.inc(service="tavily", outcome="error")
+            if collected:
+                break
+
+            if not hedged:
+                # First request is slow (or failed) - hedge with a duplicate
+                hedged = True
+                print(f"[WEB] No answer after {hedge_after}s, sending hedged request")
+                pending.add(start_request())
+    finally:
+        for task in pending:
+            task.cancel()
+            # Deadline expired, or the other (hedged) request answered first
+            OUTBOUND_REQUESTS.inc(service="tavily", outcome="cancelled")
+
+    return collected[:5]
+
+
+class SearchResult:
     """
-    Search schemes by name and details using DBMS foreign key logic:
-    1. Search in scheme_master by name AND scheme_details (eligibility, benefits, documents)
-    2. Get matching scheme IDs
-    3. Retrieve full details from scheme_details using scheme_id
-    
-    Args:
-        query: User's question/search for schemes
-        master_path: Path to scheme_master.json
-        details_path: Path to scheme_details.json
+    Outcome of one search pass (local BM25, web fallback or catalog fallback).
     
-    Returns:
-        Formatted string with relevant schemes
+    One result feeds every consumer of a query: the LLM prompt text, the
+    numbered list kept in last_shown_schemes, and metadata for logging.
     """
-    # Step 1: Search master table by name AND details
-    matching_ids = search_scheme_master_by_name(query, master_path, details_path)
-    
-    relevant_schemes = []
-    
-    # Load master once for efficiency
-    master = load_scheme_master(master_path)
-    master_dict = {m.get("scheme_id"): m.get("scheme_name") for m in master}
-    
-    # Step 2: If matches found, retrieve details using foreign key
-    if matching_ids:
-        for scheme_id in matching_ids[:5]:  # Limit to 5 results
-            details = get_scheme_details_by_id(scheme_id, details_path)
-            if details:
-                # Add scheme_name from master dict lookup
-                details["scheme_name"] = master_dict.get(scheme_id, "Unknown Scheme")
-                relevant_schemes.append(details)
-    
-    # Step 3: If no schemes found locally, try web search
-    if not relevant_schemes:
-        print(f"[SEARCH] No local schemes found for '{query}'. Searching the web...")
-        relevant_schemes = search_web_for_schemes(query)
-    
-    # Step 4: If still no schemes found, return first 5 from local database
-    if not relevant_schemes:
-        print(f"[SEARCH] Web search also returned nothing. Using fallback.")
-        all_details = load_scheme_details(details_path)
-        master = load_scheme_master(master_path)
-        master_dict = {m.get("scheme_id"): m.get("scheme_name") for m in master}
-        for detail in all_details[:5]:
-            detail["scheme_name"] = master_dict.get(detail.get("scheme_id"))
-        relevant_schemes = all_details[:5]
-    
-    print(f"[SEARCH] Returning {len(relevant_schemes)} formatted schemes")
-    
-    # Format schemes for LLM
+
+    def __init__(self, query: str, items: list, source: str, scores: dict[int, float] | None = None, catalog_version: int = 0, web_searched: bool = False):
+        self.query = query
+        # Scheme records (local / fallback) or web result dicts
+        self.items = items
+        # "local", "web_search" or "fallback"
+        self.source = source
+        # scheme_id -> BM25 score for local matches
+        self.scores = scores or {}
+        self.catalog_version = catalog_version
+        self.web_searched = web_searched
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def as_list(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """Caller-owned scheme dicts, best first."""
+        items = self.items if limit is None else self.items[:limit]
+        return [item.to_dict() if isinstance(item, Scheme) else dict(item) for item in items]
+
+    def result_key(self, limit: int | None = None) -> tuple:
+        """Hashable identity of the results shown (scheme ids or web URLs), for coalescing keys."""
+        items = self.items if limit is None else self.items[:limit]
+        ids = tuple(item.scheme_id if isinstance(item, Scheme) else item.get("source_url") for item in items)
+        return (self.source, self.catalog_version, ids)
+
+    def as_last_shown(self, limit: int = 5) -> list[dict[str, Any]]:
+        """Entries stored for number selection ("tell me about 2")."""
+        return [
+            {
+                "scheme_name": s.get("scheme_name"),
+                "source_url": s.get("source_url"),
+                "objective": s.get("objective")
+            }
+            for s in self.as_list(limit)
+        ]
+
+    @property
+    def metadata(self) -> dict[str, Any]:
+        return {
+            "query": self.query,
+            "source": self.source,
+            "count": len(self.items),
+            "scores": self.scores,
+            "catalog_version": self.catalog_version,
+            "web_searched": self.web_searched,
+        }
+
+
+def format_schemes_for_llm(schemes: list[dict[str, Any]]) -> str:
+    """Format scheme dicts as the 'Matching schemes' block of an LLM prompt."""
     formatted = ""
-    for i, scheme in enumerate(relevant_schemes, 1):
+    for i, scheme in enumerate(schemes, 1):
         source_url = scheme.get('source_url', 'Unknown')
         scheme_name = scheme.get('scheme_name', source_url.split('/')[-1] if source_url else 'Unknown')
         objective = scheme.get('objective', '')[:800]
@@ -194,125 +290,239 @@ def search_schemes(query: str, master_path: str = "data/scheme_master.json", det
     return formatted
 
 
-def get_all_schemes(master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json") -> list[dict[str, Any]]:
-    """Get all schemes by joining master and details tables."""
-    master = load_scheme_master(master_path)
-    result = []
-    
-    for master_entry in master:
-        scheme_id = master_entry.get("scheme_id")
-        details = get_scheme_details_by_id(scheme_id, details_path)
-        
-        if details:
-            # Combine master + details (like SQL JOIN)
-            combined = {
-                "scheme_id": scheme_id,
-                "scheme_name": master_entry.get("scheme_name"),
-                **details
-            }
-            result.append(combined)
-    
+def _rank_local(query: str, catalog: SchemeCatalog, limit: int) -> list[tuple[int, float]]:
+    """BM25 search of the catalog: (scheme_id, score) pairs, best first."""
+    ranked = catalog.index.rank(search_tokens(query, catalog), limit)
+    best_score = ranked[0][1] if ranked else 0.0
+    print(f"[SEARCH] Local: {len(ranked)} schemes for '{query}', best score {best_score:.2f}")
+    return ranked
+
+
+def _local_is_good_enough(ranked: list[tuple[int, float]]) -> bool:
+    return bool(ranked) and ranked[0][1] >= LOCAL_SEARCH_MIN_SCORE
+
+
+def _finish_search(query: str, catalog: SchemeCatalog, ranked: list[tuple[int, float]], web: list[dict[str, Any]] | None) -> SearchResult:
+    """Pick local, web or fallback results in priority order."""
+    scores = dict(ranked)
+    local = [catalog.get(scheme_id) for scheme_id, _ in ranked]
+    web_searched = web is not None
+
+    if _local_is_good_enough(ranked) or (local and not web):
+        result = SearchResult(query, local, "local", scores, catalog.version, web_searched)
+    elif web:
+        result = SearchResult(query, web, "web_search", scores, catalog.version, web_searched)
+    else:
+        # Fallback: return first 5 from local database
+        print(f"[SEARCH] Web search also returned nothing. Using fallback.")
+        result = SearchResult(query, list(catalog.schemes[:5]), "fallback", {}, catalog.version, web_searched)
+
+    print(f"[SEARCH] Returning {len(result)} schemes from {result.source}")
     return result
 
 
-def search_schemes_as_list(query: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json") -> list[dict]:
-    """
-    Search schemes and return as list using DBMS logic, searching in both names and details.
+async def arun_search(query: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", catalog: SchemeCatalog | None = None, limit: int = 10) -> SearchResult:
     """
-    # Step 1: Search master table and details by name, eligibility, benefits, documents
-    matching_ids = search_scheme_master_by_name(query, master_path, details_path)
+    Async single search pass, coalesced across concurrent identical queries.
     
-    matched = []
+    Keyed by normalized query + catalog version, so a trending query runs
+    one local search (and at most one Tavily call) for all chats asking it.
+    SearchResult views hand out copies, so sharing one result is safe.
+    """
+    if catalog is None:
+        catalog = load_catalog(master_path, details_path)
+    return await search_flight.do(
+        ("search", normalize_query(query), catalog.version, limit),
+        lambda: _arun_search(query, catalog, limit),
+    )
+
+
+async def _arun_search(query: str, catalog: SchemeCatalog, limit: int) -> SearchResult:
+    """
+    Race local BM25 search against Tavily.
     
-    # Step 2: Retrieve details using foreign keys
-    if matching_ids:
-        for scheme_id in matching_ids[:10]:
-            details = get_scheme_details_by_id(scheme_id, details_path)
-            if details:
-                # Add scheme_name
-                master = load_scheme_master(master_path)
-                for m in master:
-                    if m.get("scheme_id") == scheme_id:
-                        details["scheme_name"] = m.get("scheme_name")
-                        break
-                matched.append(details)
+    The web search is started alongside the local search but waits up to
+    WEB_SEARCH_START_DELAY before sending a (paid) request. If the local
+    results are good enough (best score >= LOCAL_SEARCH_MIN_SCORE) the web
+    task is cancelled; otherwise it is released immediately and awaited with
+    its own deadline.
+    """
+    need_web = asyncio.Event()
+
+    async def web_search() -> list[dict[str, Any]]:
+        try:
+            await asyncio.wait_for(need_web.wait(), WEB_SEARCH_START_DELAY)
+        except asyncio.TimeoutError:
+            pass
+        return await asearch_web_for_schemes(query)
+
+    web_task = asyncio.create_task(web_search())
+    web = None
+    try:
+        # Local search (offloaded on large catalogs so the event loop stays free)
+        if len(catalog) >= CATALOG_OFFLOAD_THRESHOLD:
+            ranked = await asyncio.to_thread(_rank_local, query, catalog, limit)
+        else:
+            ranked = _rank_local(query, catalog, limit)
+
+        if not _local_is_good_enough(ranked):
+            # Local results are weak or missing - let the web search go now
+            print(f"[SEARCH] Weak local results for '{query}'. Searching the web...")
+            need_web.set()
+            web = await web_task
+    finally:
+        if not web_task.done():
+            web_task.cancel()
+
+    return _finish_search(query, catalog, ranked, web)
+
+
+def run_search(query: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", catalog: SchemeCatalog | None = None, limit: int = 10) -> SearchResult:
+    """
+    Blocking single search pass (runs arun_search on a private event loop).
     
-    # Step 3: If no local schemes found, try web search
-    if not matched:
-        print(f"No local schemes found for '{query}'. Searching the web...")
-        matched = search_web_for_schemes(query)
-        if not matched:
-            # Fallback: return first 5 from local database
-            all_details = load_scheme_details(details_path)
-            master = load_scheme_master(master_path)
-            master_dict = {m.get("scheme_id"): m.get("scheme_name") for m in master}
-            for detail in all_details[:5]:
-                detail["scheme_name"] = master_dict.get(detail.get("scheme_id"))
-            matched = all_details[:5]
+    For scripts and other sync callers - async handlers should await
+    arun_search instead.
+    """
+    return asyncio.run(arun_search(query, master_path, details_path, catalog, limit))
+
+
+def search_schemes(query: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", catalog: SchemeCatalog | None = None) -> str:
+    """
+    Search schemes and return the top 5 formatted for the LLM.
     
-    return matched
+    Thin view over run_search - use run_search directly when the list or
+    metadata is needed too, so the query is only searched once.
+    """
+    return format_schemes_for_llm(run_search(query, master_path, details_path, catalog).as_list(5))
+
+
+def search_schemes_as_list(query: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", catalog: SchemeCatalog | None = None) -> list[dict]:
+    """
+    Search schemes and return up to 10 as a list (thin view over run_search).
+    """
+    return run_search(query, master_path, details_path, catalog).as_list(10)
+
+
+def get_all_schemes(master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", catalog: SchemeCatalog | None = None) -> list[dict[str, Any]]:
+    """Get all schemes by joining master and details tables."""
+    if catalog is None:
+        catalog = load_catalog(master_path, details_path)
+    return [scheme.to_dict() for scheme in catalog.schemes]
+
 
-from langchain_core.messages import HumanMessage
 from langchain_groq import ChatGroq
-from app.config import GROQ_API_KEY, MODEL_NAME
+from app.config import (
+    GROQ_API_KEY,
+    MODEL_NAME,
+    ELIGIBILITY_LLM_TIMEOUT,
+    ELIGIBILITY_CACHE_SIZE,
+    ELIGIBILITY_CACHE_TTL,
+    ELIGIBILITY_BATCH_WINDOW_MS,
+    ELIGIBILITY_BATCH_MAX,
+    LLM_MAX_CONCURRENCY,
+    LLM_RPM,
+    LLM_TPM,
+    LLM_MAX_RETRIES,
+)
+from app.cache import TTLCache
+from app.llm_batcher import EligibilityBatcher
+from app.llm_gateway import LLMGateway, LLMBusyError, PRIORITY_INTERACTIVE
 
 llm = ChatGroq(
     api_key=GROQ_API_KEY,
     model=MODEL_NAME,
-    temperature=0
+    temperature=0,
+    max_retries=0  # retries / backoff are handled by llm_gateway
 )
 
-def get_eligible_schemes_using_ai(user_context: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json") -> list[dict]:
-    """
-    TOKEN-SAFE AI eligibility matcher using DBMS concepts.
-    - Load all eligibility tags from scheme_details
-    - Match user context with eligibility criteria
-    - Use scheme_id to join back with scheme_master for names
-    """
+# Every async LLM call in the bot goes through this gateway (shared limits)
+llm_gateway = LLMGateway(
+    llm,
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    rpm=LLM_RPM,
+    tpm=LLM_TPM,
+    max_retries=LLM_MAX_RETRIES,
+)
 
-    # Step 1: Load details to check eligibility
-    scheme_details = load_scheme_details(details_path)
-    if not scheme_details:
-        return []
+# AI eligibility answers keyed by (profile fingerprint, shortlisted ids, catalog version)
+eligibility_cache = TTLCache(maxsize=ELIGIBILITY_CACHE_SIZE, ttl=ELIGIBILITY_CACHE_TTL)
 
-    # Step 2: Simple keyword extraction from user context
-    context_lower = user_context.lower()
-    context_keywords = set(context_lower.split())
+# Same cap the eligibility prompt gives the LLM
+MAX_ELIGIBLE_SCHEMES = 5
+# Schemes sent to the LLM per eligibility call
+ELIGIBILITY_SHORTLIST_SIZE = 8
 
-    # Step 3: LOCAL PRE-FILTER (check eligibility tags and objectives)
-    shortlisted_ids = []
-    for detail in scheme_details:
-        eligibility_text = " ".join(detail.get("eligibility", [])).lower()
-        objective_text = (detail.get("objective", "") or "").lower()
-        tags_text = " ".join(detail.get("tags", [])).lower()
-        
-        searchable_text = f"{eligibility_text} {objective_text} {tags_text}"
+async def _ainvoke_text(prompt: str, priority: int) -> str:
+    response = await llm_gateway.ainvoke(prompt, priority)
+    return response.content
 
-        if any(word in searchable_text for word in context_keywords):
-            shortlisted_ids.append(detail.get("scheme_id"))
+# Coalesces identical in-flight eligibility calls (keyed like eligibility_cache)
+eligibility_flight = SingleFlight("eligibility")
 
-        if len(shortlisted_ids) >= 8:  # HARD LIMIT - check all but return max 8
-            break
+# Optional micro-batching of concurrent eligibility calls (None when disabled)
+eligibility_batcher = EligibilityBatcher(
+    _ainvoke_text,
+    window=ELIGIBILITY_BATCH_WINDOW_MS / 1000,
+    max_batch=ELIGIBILITY_BATCH_MAX,
+    timeout=ELIGIBILITY_LLM_TIMEOUT,
+    propagate=(LLMBusyError,),
+) if ELIGIBILITY_BATCH_WINDOW_MS > 0 else None
 
-    if not shortlisted_ids:
-        return []
+def _shortlist_eligible_schemes(user_context: str, catalog: SchemeCatalog, exclude: set[int] = frozenset(), profile_data: dict[str, Any] | None = None) -> list[int]:
+    """
+    LOCAL PRE-FILTER: score every scheme against the profile and keep the best 8.
+    
+    One matrix-vector product over the catalog's scheme x feature matrix
+    (state, gender, occupation, age band, disability, caste, tag words);
+    schemes limited to other states than the user's are never shortlisted.
+    """
+    matrix = catalog.eligibility_matrix
+    vector = matrix.vectorize(profile_data, user_context)
+    return matrix.top_k(vector, ELIGIBILITY_SHORTLIST_SIZE, exclude, matrix.state_mask(profile_data))
 
-    # Step 4: JOIN operation - get scheme names from master
-    scheme_master = load_scheme_master(master_path)
-    master_dict = {s.get("scheme_id"): s.get("scheme_name") for s in scheme_master}
+def _resolve_eligibility_locally(profile_data: dict[str, Any], catalog: SchemeCatalog) -> tuple[list[dict], set[int]]:
+    """
+    RULE ENGINE: decide eligibility from the compiled catalog rules.
     
-    scheme_lines = []
-    shortlisted_details = []
-    for scheme_id in shortlisted_ids:
-        scheme_name = master_dict.get(scheme_id, "Unknown")
-        scheme_lines.append(f"{scheme_id}. {scheme_name}")
-        # Also get the details for later use
-        details = get_scheme_details_by_id(scheme_id, details_path)
-        if details:
-            shortlisted_details.append(details)
-
-    # Step 5: BUILD A SMALL PROMPT
-    prompt = f"""
+    Returns (eligible results, ids already decided either way); only the
+    undecided schemes need to go to the LLM.
+    """
+    eligible = []
+    decided = set()
+    for scheme in catalog.schemes:
+        verdict, reason = evaluate_rules(catalog.rules.get(scheme.scheme_id), profile_data)
+        if verdict is None:
+            continue
+        decided.add(scheme.scheme_id)
+        if verdict:
+            eligible.append({
+                "scheme_id": scheme.scheme_id,
+                "scheme_name": scheme.scheme_name,
+                "source_url": scheme.source_url,
+                "objective": scheme.objective[:800],
+                "eligibility_reason": reason
+            })
+    return eligible, decided
+
+def _prepare_eligibility(user_context: str, profile_data: dict[str, Any] | None, catalog: SchemeCatalog) -> tuple[list[dict], list[int]]:
+    """Rule engine first, then the keyword pre-filter over the schemes it left undecided."""
+    local, decided = _resolve_eligibility_locally(profile_data, catalog) if profile_data else ([], set())
+    if local:
+        print(f"[RULES] {len(local)} eligible, {len(decided) - len(local)} excluded without the LLM")
+    if len(local) >= MAX_ELIGIBLE_SCHEMES:
+        return local, []
+    return local, _shortlist_eligible_schemes(user_context, catalog, exclude=decided, profile_data=profile_data)
+
+def _eligibility_scheme_lines(shortlisted_ids: list[int], catalog: SchemeCatalog) -> list[str]:
+    """"<id>. <name>" lines for the prompt; scheme names come pre-joined on the catalog records."""
+    return [f"{scheme_id}. {catalog.get(scheme_id).scheme_name or 'Unknown'}" for scheme_id in shortlisted_ids]
+
+def _build_eligibility_prompt(user_context: str, shortlisted_ids: list[int], catalog: SchemeCatalog) -> str:
+    """BUILD A SMALL PROMPT listing only the shortlisted schemes."""
+    scheme_lines = _eligibility_scheme_lines(shortlisted_ids, catalog)
+
+    return f"""
 You are an Indian government scheme eligibility expert.
 
 User information:
@@ -338,15 +548,51 @@ Rules:
 - Must include scheme_id
 """
 
-    # Step 6: AI CALL (SAFE SIZE)
-    response = llm.invoke([HumanMessage(content=prompt)])
+def _join_eligibility_results(result: list[dict], catalog: SchemeCatalog, shortlisted_ids: list[int]) -> list[dict]:
+    """
+    JOIN the LLM's {scheme_id, eligibility_reason} items back to the catalog.
+    
+    Only ids from the shortlist it was shown are kept, each once. The
+    shortlist never holds schemes the rule engine already decided, so the
+    LLM cannot overrule (or repeat) a local verdict.
+    """
+    allowed = set(shortlisted_ids)
+    seen = set()
+    final = []
+    for r in result:
+        if not isinstance(r, dict):
+            continue
+        try:
+            scheme_id = int(r.get("scheme_id"))
+        except (TypeError, ValueError):
+            continue
+        if scheme_id not in allowed or scheme_id in seen:
+            continue
+        seen.add(scheme_id)
+        scheme = catalog.get(scheme_id)
+        
+        if scheme and scheme.scheme_name:
+            final.append({
+                "scheme_id": scheme_id,
+                "scheme_name": scheme.scheme_name,
+                "source_url": scheme.source_url,
+                "objective": scheme.objective[:800],
+                "eligibility_reason": r.get("eligibility_reason", "")
+            })
+    
+    print(f"[AI] Returning {len(final)} eligible schemes")
+    return final
 
-    # Step 7: PARSE AND JOIN RESULTS
+def _parse_eligibility_response(response_text: str, catalog: SchemeCatalog, shortlisted_ids: list[int]) -> list[dict] | None:
+    """
+    PARSE the LLM JSON answer and JOIN results back to the catalog by scheme_id.
+    
+    Returns None (not []) when the answer could not be parsed, so callers can
+    tell a failed call from "no eligible schemes".
+    """
     try:
-        import json
-        
         # Try to extract JSON from response
-        response_text = response.content.strip()
+        response_text = response_text.strip()
         print(f"[AI RESPONSE] {response_text[:100]}...")
         
         # Find JSON array in response
@@ -355,42 +601,124 @@ Rules:
         
         if json_start == -1 or json_end == 0:
             print("[ERROR] No JSON array found in response")
-            return []
+            return None
         
         json_str = response_text[json_start:json_end]
         result = json.loads(json_str)
         
         if not isinstance(result, list):
             print(f"[ERROR] Response is not a list: {type(result)}")
-            return []
+            return None
 
         print(f"[AI] Parsed {len(result)} schemes from AI response")
-        
-        # Attach scheme details and names using scheme_id
-        final = []
-        for r in result:
-            scheme_id = r.get("scheme_id")
-            scheme_name = master_dict.get(scheme_id)
-            details = get_scheme_details_by_id(scheme_id, details_path)
-            
-            if details and scheme_name:
-                final.append({
-                    "scheme_id": scheme_id,
-                    "scheme_name": scheme_name,
-                    "source_url": details.get("source_url", ""),
-                    "objective": details.get("objective", "")[:800],
-                    "eligibility_reason": r.get("eligibility_reason", "")
-                })
-        
-        print(f"[AI] Returning {len(final)} eligible schemes")
-        return final
+        return _join_eligibility_results(result, catalog, shortlisted_ids)
 
     except json.JSONDecodeError as e:
         print(f"[ERROR] JSON parse error: {e}")
-        print(f"[ERROR] Response was: {response.content[:200]}")
-        return []
+        print(f"[ERROR] Response was: {response_text[:200]}")
+        return None
     except Exception as e:
         print(f"[ERROR] Eligibility matching error: {e}")
         import traceback
         traceback.print_exc()
+        return None
+
+def _eligibility_cache_key(user_context: str, profile_fingerprint: str | None, shortlisted_ids: list[int], catalog: SchemeCatalog) -> tuple:
+    """Cache key: who is asking (profile fingerprint or normalized text), which schemes, which catalog."""
+    who = profile_fingerprint or " ".join(user_context.lower().split())
+    return (who, tuple(shortlisted_ids), catalog.version)
+
+async def _acall_eligibility_llm(user_context: str, shortlisted_ids: list[int], catalog: SchemeCatalog, timeout: float, offload: bool, priority: int) -> list[dict] | None:
+    """
+    Prompt, LLM call and parse for one shortlist; None on timeout or unparseable answer.
+    
+    Raises LLMBusyError when the gateway gives up on a rate-limited LLM.
+    """
+    # Step 2: BUILD A SMALL PROMPT
+    prompt = _build_eligibility_prompt(user_context, shortlisted_ids, catalog)
+
+    # Step 3: AI CALL with deadline (micro-batched with concurrent requests when enabled)
+    if eligibility_batcher is not None:
+        result = await eligibility_batcher.submit(
+            prompt, user_context, _eligibility_scheme_lines(shortlisted_ids, catalog), shortlisted_ids, priority,
+            timeout=timeout,
+        )
+        return _join_eligibility_results(result, catalog, shortlisted_ids) if result is not None else None
+
+    try:
+        response = await asyncio.wait_for(llm_gateway.ainvoke(prompt, priority), timeout)
+    except asyncio.TimeoutError:
+        print(f"[ERROR] Eligibility LLM call timed out after {timeout}s")
+        return None
+
+    # Step 4: PARSE AND JOIN RESULTS
+    if offload:
+        return await asyncio.to_thread(_parse_eligibility_response, response.content, catalog, shortlisted_ids)
+    return _parse_eligibility_response(response.content, catalog, shortlisted_ids)
+
+def _merge_eligibility(local: list[dict], llm_results: list[dict]) -> list[dict]:
+    """Rule engine results first, then fresh copies of LLM results for schemes not already listed."""
+    seen = {r["scheme_id"] for r in local}
+    merged = list(local)
+    for r in llm_results:
+        if r["scheme_id"] not in seen:
+            seen.add(r["scheme_id"])
+            merged.append(dict(r))
+    return merged
+
+async def aget_eligible_schemes_using_ai(user_context: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", catalog: SchemeCatalog | None = None, timeout: float = ELIGIBILITY_LLM_TIMEOUT, profile_fingerprint: str | None = None, profile_data: dict[str, Any] | None = None, priority: int = PRIORITY_INTERACTIVE) -> list[dict]:
+    """
+    AI eligibility matcher for the async handlers (rules first, then one LLM call).
+    
+    - Schemes the compiled rules decide from profile_data never reach the LLM
+    - The LLM call goes through llm_gateway with a timeout (only rule results
+      when it expires); pass PRIORITY_BACKGROUND for non-interactive work
+    - Cancelling the calling task cancels the in-flight LLM request
+    - Pre-filter and JSON parsing run in a worker thread on large catalogs
+    - With ELIGIBILITY_BATCH_WINDOW_MS set, concurrent calls share one LLM request
+    - Concurrent identical requests share one in-flight LLM call
+    - Answers are cached by profile fingerprint + shortlist + catalog version,
+      so identical profiles (across users too) skip the LLM. Pass
+      profile_fingerprint only when user_context is derived from that profile.
+    """
+    if catalog is None:
+        catalog = load_catalog(master_path, details_path)
+    if not catalog.schemes:
         return []
+
+    offload = len(catalog) >= CATALOG_OFFLOAD_THRESHOLD
+
+    # Step 1: RULE ENGINE + LOCAL PRE-FILTER
+    if offload:
+        local, shortlisted_ids = await asyncio.to_thread(_prepare_eligibility, user_context, profile_data, catalog)
+    else:
+        local, shortlisted_ids = _prepare_eligibility(user_context, profile_data, catalog)
+    if not shortlisted_ids:
+        return local
+
+    cache_key = _eligibility_cache_key(user_context, profile_fingerprint, shortlisted_ids, catalog)
+    cached = eligibility_cache.get(cache_key)
+    if cached is not None:
+        print(f"[AI CACHE] Hit ({eligibility_cache.hits} hits / {eligibility_cache.misses} misses)")
+        return _merge_eligibility(local, cached)
+
+    # Steps 2-4 are shared by concurrent identical requests (same key as the cache)
+    final = await eligibility_flight.do(
+        cache_key, lambda: _acall_eligibility_llm(user_context, shortlisted_ids, catalog, timeout, offload, priority)
+    )
+    if final is None:
+        return local
+
+    # Only cache answers the LLM actually gave (not timeouts / parse errors)
+    eligibility_cache.set(cache_key, [dict(r) for r in final])
+    return _merge_eligibility(local, final)
+
+def get_eligible_schemes_using_ai(user_context: str, master_path: str = "data/scheme_master.json", details_path: str = "data/scheme_details.json", catalog: SchemeCatalog | None = None, profile_data: dict[str, Any] | None = None) -> list[dict]:
+    """
+    Blocking AI eligibility matcher (runs aget_eligible_schemes_using_ai on
+    a private event loop, so it shares the rule engine, cache and gateway).
+    
+    For scripts and other sync callers - async handlers should await
+    aget_eligible_schemes_using_ai instead.
+    """
+    return asyncio.run(aget_eligible_schemes_using_ai(user_context, master_path, details_path, catalog, profile_data=profile_data))
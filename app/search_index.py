@@ -0,0 +1,302 @@
+"""
+Inverted token index over the scheme catalog for fast local search.
+"""
+
+import bisect
+import heapq
+import math
+import re
+from functools import lru_cache
+from typing import Any, Iterable
+
+# Fields searched by search_scheme_master_by_name, in the order they are joined
+SEARCH_FIELDS = ("scheme_name", "objective", "eligibility", "benefits", "documents_required", "tags")
+
+# BM25F parameters: per-field weights and length normalisation
+BM25_K1 = 1.2
+BM25_FIELD_WEIGHTS = {
+    "scheme_name": 3.0,
+    "tags": 2.5,
+    "eligibility": 1.5,
+    "objective": 1.0,
+    "benefits": 0.5,
+    "documents_required": 0.2,
+}
+BM25_FIELD_B = {
+    "scheme_name": 0.5,
+    "tags": 0.3,
+    "eligibility": 0.75,
+    "objective": 0.75,
+    "benefits": 0.75,
+    "documents_required": 0.75,
+}
+
+
+# Fields whose words (names, tags, key phrases of the objective) feed the typo-tolerant trigram index
+FUZZY_FIELDS = ("scheme_name", "tags", "objective")
+# Shortest query term that gets typo correction, and the edit distance allowed by length
+FUZZY_MIN_LENGTH = 5
+FUZZY_LONG_TERM = 8
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Query words that carry no meaning for scheme search (dropped before expansion)
+STOPWORDS = frozenset((
+    "the", "and", "for", "with", "from", "are", "was", "what", "which", "who", "how", "can", "get",
+    "any", "all", "about", "this", "that", "these", "there", "their", "into", "under", "tell", "show",
+    "give", "want", "need", "have", "has", "please", "some", "me", "my", "you", "your", "our",
+))
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase alphanumeric words of a text, in order (how catalog fields are indexed)."""
+    return _WORD.findall(text.lower())
+
+
+def tokenize_query(query: str) -> list[str]:
+    """Split a user query into lowercase search tokens (length > 2, stopwords dropped)."""
+    return [t for t in tokenize(query) if len(t) > 2 and t not in STOPWORDS]
+
+
+def _field_text(record: Any, field: str) -> str:
+    """Return the searchable text of one field."""
+    value = record.get(field)
+    if isinstance(value, (list, tuple)):
+        return " ".join(value)
+    return value or ""
+
+
+def field_tokens(record: Any) -> dict[str, list[str]]:
+    """{field: tokens} of the SEARCH_FIELDS of one scheme record."""
+    return {field: tokenize(_field_text(record, field)) for field in SEARCH_FIELDS}
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Edit distance between a and b, or max_distance + 1 once it is certain to exceed it."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return min(previous[-1], max_distance + 1)
+
+
+def _trigrams(word: str) -> set[str]:
+    padded = f"${word}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Character-trigram postings over catalog words for typo-tolerant lookup.
+
+    Candidates come from the postings of the query's trigrams (q-gram
+    filter: one edit changes at most 3 trigrams), and only those are
+    verified with a bounded edit distance - no pairwise scan of the
+    vocabulary.
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self.words = tuple(sorted(set(words)))
+        # trigram -> indexes into self.words
+        self.postings: dict[str, list[int]] = {}
+        for i, word in enumerate(self.words):
+            for gram in _trigrams(word):
+                self.postings.setdefault(gram, []).append(i)
+
+    @staticmethod
+    def max_distance(term: str) -> int:
+        return 2 if len(term) >= FUZZY_LONG_TERM else 1
+
+    def lookup(self, term: str) -> tuple[str, ...]:
+        """Closest catalog words within the allowed edit distance (empty if none)."""
+        if len(term) < FUZZY_MIN_LENGTH:
+            return ()
+        k = self.max_distance(term)
+        grams = _trigrams(term)
+        shared: dict[int, int] = {}
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] = shared.get(i, 0) + 1
+
+        needed = max(1, len(grams) - 3 * k)
+        best = k + 1
+        matches: list[str] = []
+        for i, count in shared.items():
+            word = self.words[i]
+            if count < needed or abs(len(word) - len(term)) > k:
+                continue
+            distance = bounded_levenshtein(term, word, k)
+            if distance > k:
+                continue
+            if distance < best:
+                best, matches = distance, [word]
+            elif distance == best:
+                matches.append(word)
+        return tuple(sorted(matches))
+
+
+class SchemeSearchIndex:
+    """
+    Token -> posting list index built once over the joined scheme records.
+
+    Postings map each catalog word to the schemes that contain it, with the
+    token positions per field. A query term matches the word itself and
+    every word it is a prefix of ("farmer" -> "farmers"), found by bisecting
+    the sorted vocabulary, so lookups stay logarithmic in catalog size.
+
+    A term that matches no catalog word at all falls back to the closest
+    scheme-name / tag / objective words by edit distance
+    ("scholorship" -> "scholarship").
+    """
+
+    def __init__(self, schemes: Iterable[Any]):
+        self._build((scheme.get("scheme_id"), field_tokens(scheme)) for scheme in schemes)
+
+    @classmethod
+    def from_tokens(cls, rows: Iterable[tuple[int, dict[str, list[str]]]]) -> "SchemeSearchIndex":
+        """Build from precomputed (scheme_id, {field: tokens}) rows, e.g. a snapshot's token table."""
+        index = cls.__new__(cls)
+        index._build(rows)
+        return index
+
+    def _build(self, rows: Iterable[tuple[int, dict[str, list[str]]]]) -> None:
+        # token -> {scheme_id: {field: [positions]}}
+        self.postings: dict[str, dict[int, dict[str, list[int]]]] = {}
+        # scheme_id -> position in scheme master (file order)
+        self.scheme_order: dict[int, int] = {}
+        # scheme_id -> {field: token count}
+        self.field_lengths: dict[int, dict[str, int]] = {}
+        fuzzy_words: set[str] = set()
+
+        for order, (scheme_id, tokens_by_field) in enumerate(rows):
+            self.scheme_order[scheme_id] = order
+            lengths = self.field_lengths[scheme_id] = {}
+            for field in SEARCH_FIELDS:
+                tokens = tokens_by_field.get(field, ())
+                lengths[field] = len(tokens)
+                for position, token in enumerate(tokens):
+                    fields = self.postings.setdefault(token, {}).setdefault(scheme_id, {})
+                    fields.setdefault(field, []).append(position)
+                if field in FUZZY_FIELDS:
+                    fuzzy_words.update(t for t in tokens if not t.isdigit())
+
+        # Sorted, so all words sharing a prefix are one contiguous slice
+        self.vocabulary = tuple(sorted(self.postings))
+        self.fuzzy = TrigramIndex(fuzzy_words)
+        self.expand_term = lru_cache(maxsize=4096)(self._expand_term)
+        self._build_bm25_tables()
+
+    def _build_bm25_tables(self) -> None:
+        """Precompute BM25F length normalisers and per-token IDF."""
+        doc_count = len(self.field_lengths)
+        self.doc_count = doc_count
+
+        avg_lengths = {}
+        for field in SEARCH_FIELDS:
+            total = sum(lengths[field] for lengths in self.field_lengths.values())
+            avg_lengths[field] = (total / doc_count) if doc_count else 0.0
+
+        # scheme_id -> {field: 1 - b + b * len / avg_len}
+        self.length_norms: dict[int, dict[str, float]] = {}
+        for scheme_id, lengths in self.field_lengths.items():
+            norms = self.length_norms[scheme_id] = {}
+            for field in SEARCH_FIELDS:
+                b = BM25_FIELD_B[field]
+                avg = avg_lengths[field]
+                norms[field] = (1 - b + b * lengths[field] / avg) if avg else 1.0
+
+        self.idf = {token: self._idf(len(postings)) for token, postings in self.postings.items()}
+
+    def _idf(self, doc_freq: int) -> float:
+        """BM25 inverse document frequency (always positive)."""
+        return math.log(1 + (self.doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def _prefixed(self, prefix: str) -> tuple[str, ...]:
+        """Catalog words starting with prefix (the word itself included)."""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        # "\uffff" sorts after every character that can follow the prefix
+        end = bisect.bisect_right(self.vocabulary, prefix + "\uffff", start)
+        return self.vocabulary[start:end]
+
+    def _expand_term(self, term: str) -> tuple[str, ...]:
+        """
+        Return the catalog words the query term matches (itself, its singular
+        and the words they prefix), or, when there are none, its closest typo
+        corrections.
+        """
+        # Plural query words also match the singular ("girls" -> "girl", "girls")
+        if len(term) > 3 and term.endswith("s") and not term.endswith("ss"):
+            term = term[:-1]
+        return self._prefixed(term) or self.fuzzy.lookup(term)
+
+    def matching_ids(self, term: str) -> set[int]:
+        """Return the ids of schemes whose text contains the query term."""
+        ids: set[int] = set()
+        for token in self.expand_term(term):
+            ids.update(self.postings[token])
+        return ids
+
+    def search(self, tokens: list[str]) -> tuple[list[int], list[int]]:
+        """
+        Match query tokens against the index.
+
+        Returns:
+            (exact, partial) scheme ID lists in scheme master order. Exact
+            matches contain every token, partial matches contain at least one.
+        """
+        if not tokens:
+            return [], []
+
+        posting_sets = [self.matching_ids(term) for term in set(tokens)]
+        matched = set().union(*posting_sets)
+        exact_set = set.intersection(*posting_sets)
+
+        order = self.scheme_order.get
+        exact = sorted(exact_set, key=order)
+        partial = sorted(matched - exact_set, key=order)
+        return exact, partial
+
+    def term_idf(self, term: str) -> float:
+        """IDF of a query term, using the precomputed table when it is a catalog token."""
+        if term in self.idf:
+            expansions = self.expand_term(term)
+            if len(expansions) == 1:
+                return self.idf[term]
+        return self._idf(len(self.matching_ids(term)))
+
+    def rank(self, tokens: list[str], top_k: int | None = None) -> list[tuple[int, float]]:
+        """
+        Score schemes against the query tokens with BM25F.
+
+        Args:
+            tokens: Query tokens from tokenize_query
+            top_k: Keep only the k best schemes (bounded heap); None keeps all
+
+        Returns:
+            (scheme_id, score) pairs, best first. Ties keep scheme master order.
+        """
+        scores: dict[int, float] = {}
+        for term in set(tokens):
+            idf = self.term_idf(term)
+            weighted_tf: dict[int, float] = {}
+            for token in self.expand_term(term):
+                for scheme_id, fields in self.postings[token].items():
+                    norms = self.length_norms[scheme_id]
+                    tf = weighted_tf.get(scheme_id, 0.0)
+                    for field, positions in fields.items():
+                        tf += BM25_FIELD_WEIGHTS[field] * len(positions) / norms[field]
+                    weighted_tf[scheme_id] = tf
+            for scheme_id, tf in weighted_tf.items():
+                scores[scheme_id] = scores.get(scheme_id, 0.0) + idf * tf / (BM25_K1 + tf)
+
+        order = self.scheme_order
+        sort_key = lambda item: (item[1], -order[item[0]])
+        if top_k is None:
+            return sorted(scores.items(), key=sort_key, reverse=True)
+        return heapq.nlargest(top_k, scores.items(), key=sort_key)
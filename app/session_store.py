@@ -0,0 +1,474 @@
+"""
+Per-chat session state (profile, chat memory, last shown schemes) that
+survives restarts.
+
+SessionCache is an in-memory read-through cache in front of a pluggable
+SessionStore. Handlers fetch sessions with aget(), which reads a cache
+miss from the store on a worker thread, then read and mutate Session
+objects in memory; a session is marked touched when it is fetched (or via touch()), and a
+debounced flush serializes the touched sessions, keeps only those whose
+JSON actually changed, and writes them in one batch on a worker thread.
+
+SQLiteSessionStore keeps sessions in one table in WAL mode: reads use
+their own connection and run alongside a write batch, and several worker
+processes can share the database file. Each chat should still be
+handled by a single worker at a time, since every worker caches the
+sessions it has seen.
+
+Memory is bounded: each chat keeps only its last CHAT_MEMORY_LIMIT
+messages (older ones live on in the prompt builder's rolling summary),
+and a periodic sweeper evicts sessions idle for longer than the TTL and
+then the least recently used ones beyond the size cap. Only sessions
+already saved are evicted, so an evicted chat reloads from the store on
+its next message.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from typing import Any, Callable, Collection, Iterable
+
+from app.config import (
+    CHAT_MEMORY_LIMIT,
+    SESSION_CACHE_SIZE,
+    SESSION_DB_PATH,
+    SESSION_FLUSH_INTERVAL,
+    SESSION_IDLE_TTL,
+)
+from app.user_profile import UserProfile
+
+
+def _json_default(value: Any) -> Any:
+    # Ring buffers serialize as lists; anything else as its string form
+    return list(value) if isinstance(value, deque) else str(value)
+
+
+class Session:
+    """Everything the bot remembers about one chat."""
+
+    __slots__ = ("chat_id", "profile", "memory", "message_count", "last_shown", "last_seen")
+
+    def __init__(self, chat_id: str, profile: UserProfile | None = None, memory: Iterable[str] | None = None,
+                 last_shown: list[dict[str, Any]] | None = None, message_count: int | None = None):
+        self.chat_id = chat_id
+        self.profile = profile or UserProfile(chat_id)
+        # Last CHAT_MEMORY_LIMIT user messages, oldest first
+        self.memory: deque[str] = deque(memory or (), maxlen=CHAT_MEMORY_LIMIT)
+        # Messages ever added, including those that fell out of memory
+        self.message_count = max(message_count or 0, len(self.memory))
+        # Schemes listed in the last answer, for "tell me about 2"
+        self.last_shown = last_shown if last_shown is not None else []
+        # time.monotonic() of the last get(), for idle eviction
+        self.last_seen = time.monotonic()
+
+    def add_message(self, text: str) -> None:
+        self.memory.append(text)
+        self.message_count += 1
+
+    def to_json(self) -> str:
+        return json.dumps(
+            {
+                "profile": self.profile.get_profile(),
+                "memory": self.memory,
+                "message_count": self.message_count,
+                "last_shown": self.last_shown,
+            },
+            ensure_ascii=False, separators=(",", ":"), default=_json_default,
+        )
+
+    @classmethod
+    def from_json(cls, chat_id: str, raw: str) -> "Session":
+        data = json.loads(raw)
+        return cls(
+            chat_id,
+            UserProfile.from_dict(chat_id, data.get("profile") or {}),
+            data.get("memory") or [],
+            list(data.get("last_shown") or []),
+            data.get("message_count"),
+        )
+
+
+class SessionStore(ABC):
+    """
+    Persistence backend for sessions (serialized as JSON strings).
+
+    Both load() and write_batch() may be called from worker threads
+    (SessionCache.aget() and flushes), possibly at the same time.
+    """
+
+    @abstractmethod
+    def load(self, chat_id: str) -> str | None:
+        """Saved JSON of a chat's session, or None."""
+
+    @abstractmethod
+    def write_batch(self, upserts: dict[str, str], deletes: Iterable[str]) -> None:
+        """Save {chat_id: JSON} and remove `deletes` in one batch."""
+
+    def close(self) -> None:
+        pass
+
+
+class MemorySessionStore(SessionStore):
+    """No persistence - sessions live only as long as the process."""
+
+    def load(self, chat_id: str) -> str | None:
+        return None
+
+    def write_batch(self, upserts: dict[str, str], deletes: Iterable[str]) -> None:
+        pass
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite database in WAL mode."""
+
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._write_conn = self._connect()
+        self._read_conn = self._connect()
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        with self._write_lock, self._write_conn:
+            self._write_conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " chat_id TEXT PRIMARY KEY,"
+                " data TEXT NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL: durable across process crashes, one fsync per checkpoint
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def load(self, chat_id: str) -> str | None:
+        with self._read_lock:
+            row = self._read_conn.execute("SELECT data FROM sessions WHERE chat_id = ?", (chat_id,)).fetchone()
+        return row[0] if row else None
+
+    def write_batch(self, upserts: dict[str, str], deletes: Iterable[str]) -> None:
+        now = time.time()
+        # One transaction per batch; deletes first so a cleared-then-recreated chat ends up saved
+        with self._write_lock, self._write_conn:
+            self._write_conn.executemany("DELETE FROM sessions WHERE chat_id = ?", [(c,) for c in deletes])
+            self._write_conn.executemany(
+                "INSERT INTO sessions (chat_id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(chat_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                [(chat_id, data, now) for chat_id, data in upserts.items()],
+            )
+
+    def count(self) -> int:
+        with self._read_lock:
+            return self._read_conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def close(self) -> None:
+        with self._write_lock:
+            self._write_conn.close()
+        with self._read_lock:
+            self._read_conn.close()
+
+
+def open_session_store(path: str) -> SessionStore:
+    """SQLite store at path, or an in-memory store when path is empty."""
+    if not path:
+        return MemorySessionStore()
+    return SQLiteSessionStore(path)
+
+
+class SessionCache:
+    """
+    Read-through, write-back cache of Sessions.
+
+    Writes are debounced: the first touch arms a `flush_interval` timer,
+    and everything touched until it fires is written in one batch.
+
+    sweep() evicts sessions idle for `idle_ttl` seconds, then the least
+    recently used beyond `max_sessions`; start_sweeper() runs it (after a
+    flush) every few seconds. Sessions with unsaved changes are never
+    evicted. Listeners added with on_evict() are called with each evicted
+    chat_id, so per-chat state kept elsewhere can be dropped too.
+    """
+
+    def __init__(self, store: SessionStore, flush_interval: float = 2.0, max_sessions: int = 5000,
+                 idle_ttl: float = 1800.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # Least recently used first
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+        # chat_id -> JSON last loaded from / written to the store
+        self._saved: dict[str, str] = {}
+        # UTF-8 size of _saved, kept up to date so stats() never walks the cache
+        self._saved_bytes = 0
+        self._touched: set[str] = set()
+        self._deleted: set[str] = set()
+        # Deletes handed to the running flush; the store may still hold the old row
+        self._deleting: set[str] = set()
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+        self._sweeper: asyncio.Task | None = None
+        self._evict_listeners: list[Callable[[str], None]] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.flushes = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, chat_id: str) -> bool:
+        return chat_id in self._sessions
+
+    def get(self, chat_id: str, create: bool = True) -> Session | None:
+        """
+        The chat's session, loaded from the store on a cache miss (None if
+        absent and not create). A miss reads the store on the calling
+        thread; handlers on the event loop use aget().
+        """
+        session = self._hit(chat_id)
+        if session is None:
+            self.misses += 1
+            raw = None if self._pending_delete(chat_id) else self.store.load(chat_id)
+            session = self._admit(chat_id, raw, create)
+        return session
+
+    async def aget(self, chat_id: str, create: bool = True) -> Session | None:
+        """get() that reads the store on a worker thread, so a miss never blocks the event loop."""
+        session = self._hit(chat_id)
+        if session is not None:
+            return session
+        self.misses += 1
+        raw = None if self._pending_delete(chat_id) else await asyncio.to_thread(self.store.load, chat_id)
+        # Another task may have loaded, created or cleared the chat meanwhile
+        session = self._hit(chat_id)
+        if session is not None:
+            return session
+        if self._pending_delete(chat_id):
+            raw = None
+        return self._admit(chat_id, raw, create)
+
+    def _pending_delete(self, chat_id: str) -> bool:
+        return chat_id in self._deleted or chat_id in self._deleting
+
+    def _hit(self, chat_id: str) -> Session | None:
+        session = self._sessions.get(chat_id)
+        if session is not None:
+            self.hits += 1
+            self._sessions.move_to_end(chat_id)
+            self._seen(chat_id, session)
+        return session
+
+    def _admit(self, chat_id: str, raw: str | None, create: bool) -> Session | None:
+        if raw is None and not create:
+            return None
+        session = Session.from_json(chat_id, raw) if raw else Session(chat_id)
+        self._sessions[chat_id] = session
+        if raw:
+            self._remember(chat_id, raw)
+        self._seen(chat_id, session)
+        return session
+
+    def _seen(self, chat_id: str, session: Session) -> None:
+        session.last_seen = time.monotonic()
+        self.touch(chat_id)
+
+    def touch(self, chat_id: str) -> None:
+        """Mark a session as possibly changed, so the next flush checks it."""
+        self._touched.add(chat_id)
+        self._arm()
+
+    def clear(self, chat_id: str) -> None:
+        """Forget a chat's session, in memory and (on the next flush) in the store."""
+        self._sessions.pop(chat_id, None)
+        self._forget(chat_id)
+        self._touched.discard(chat_id)
+        self._deleted.add(chat_id)
+        self._arm()
+
+    def _arm(self) -> None:
+        if self._timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (scripts) - close() writes everything
+            return
+        self._timer = loop.call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._timer = None
+        if self._flush_task is not None and not self._flush_task.done():
+            # One batch at a time; try again after this one
+            self._arm()
+            return
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    def _collect(self) -> dict[str, str]:
+        """JSON of the touched sessions that changed since they were last saved."""
+        upserts = {}
+        for chat_id in self._touched:
+            session = self._sessions.get(chat_id)
+            if session is None:
+                continue
+            data = session.to_json()
+            if data != self._saved.get(chat_id):
+                upserts[chat_id] = data
+        self._touched.clear()
+        return upserts
+
+    async def flush(self) -> None:
+        """Write changed sessions and pending deletes to the store in one batch."""
+        # The sweeper flushes too; batches must not overlap
+        async with self._flush_lock:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        upserts = self._collect()
+        self._deleting, self._deleted = self._deleted, set()
+        if not upserts and not self._deleting:
+            return
+        try:
+            await asyncio.to_thread(self.store.write_batch, upserts, self._deleting)
+        except Exception as e:
+            print(f"[SESSIONS] Write-back of {len(upserts)} session(s) failed: {e}")
+            # Keep them dirty for the next flush
+            self._touched.update(upserts)
+            self._deleted |= self._deleting
+            self._arm()
+            return
+        finally:
+            deleting, self._deleting = self._deleting, set()
+
+        for chat_id, data in upserts.items():
+            if chat_id in self._sessions:
+                self._remember(chat_id, data)
+        self.writes += len(upserts)
+        self.flushes += 1
+        print(f"[SESSIONS] Saved {len(upserts)} session(s), deleted {len(deleting)}")
+
+    def on_evict(self, listener: Callable[[str], None]) -> None:
+        """Call listener(chat_id) whenever a session is evicted from memory."""
+        self._evict_listeners.append(listener)
+
+    def _remember(self, chat_id: str, data: str) -> None:
+        """Record the JSON the store now holds for a cached session."""
+        self._forget(chat_id)
+        self._saved[chat_id] = data
+        self._saved_bytes += len(data.encode("utf-8"))
+
+    def _forget(self, chat_id: str) -> None:
+        data = self._saved.pop(chat_id, None)
+        if data is not None:
+            self._saved_bytes -= len(data.encode("utf-8"))
+
+    def _evict(self, chat_id: str) -> None:
+        self._sessions.pop(chat_id, None)
+        self._forget(chat_id)
+        self.evictions += 1
+        for listener in self._evict_listeners:
+            try:
+                listener(chat_id)
+            except Exception as e:
+                print(f"[SESSIONS] Eviction listener failed for {chat_id}: {e}")
+
+    def sweep(self, now: float | None = None, keep: Collection[str] = ()) -> int:
+        """
+        Evict idle sessions, then least recently used ones over capacity.
+
+        Sessions with changes not yet written (touched since the last
+        flush) and those in `keep` (chats being handled right now) are
+        skipped; flush first to make the former evictable.
+
+        Returns:
+            Number of sessions evicted
+        """
+        now = time.monotonic() if now is None else now
+        evictable = [chat_id for chat_id in self._sessions if chat_id not in self._touched and chat_id not in keep]
+        over = len(self._sessions) - self.max_sessions
+        evicted = 0
+        # evictable is in LRU order: idle sessions come first, then the oldest of the rest
+        for chat_id in evictable:
+            idle = now - self._sessions[chat_id].last_seen >= self.idle_ttl
+            if not idle and evicted >= over:
+                break
+            self._evict(chat_id)
+            evicted += 1
+        return evicted
+
+    def start_sweeper(self, interval: float, busy: Callable[[], Collection[str]] | None = None) -> None:
+        """
+        Flush and sweep every `interval` seconds on the running event loop;
+        `busy()` returns chats whose sessions must stay (handlers in flight).
+        """
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.get_running_loop().create_task(self._sweep_forever(interval, busy))
+
+    async def _sweep_forever(self, interval: float, busy: Callable[[], Collection[str]] | None) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+                evicted = self.sweep(keep=busy() if busy else ())
+            except Exception as e:
+                print(f"[SESSIONS] Sweep failed: {e}")
+                continue
+            if evicted:
+                stats = self.stats()
+                print(f"[SESSIONS] Evicted {evicted} idle session(s); {stats['cached']} cached, "
+                      f"{stats['bytes']} bytes")
+
+    async def close(self) -> None:
+        """Write everything outstanding and close the store."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+        await self.flush()
+        self.store.close()
+
+    def stats(self) -> dict[str, Any]:
+        # Called from the metrics thread: read counters only, never iterate
+        # the containers the event loop is mutating
+        return {
+            "cached": len(self._sessions),
+            # Serialized size of the cached sessions as last saved (unsaved changes not counted)
+            "bytes": self._saved_bytes,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending": len(self._touched) + len(self._deleted),
+            "writes": self.writes,
+            "flushes": self.flushes,
+        }
+
+
+_sessions: SessionCache | None = None
+
+
+def get_sessions() -> SessionCache:
+    """Get or open the process-wide session cache."""
+    global _sessions
+    if _sessions is None:
+        _sessions = SessionCache(
+            open_session_store(SESSION_DB_PATH), SESSION_FLUSH_INTERVAL, SESSION_CACHE_SIZE, SESSION_IDLE_TTL,
+        )
+    return _sessions
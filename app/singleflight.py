@@ -0,0 +1,70 @@
+"""
+Single-flight coalescing of identical concurrent async work
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def normalize_query(text: str) -> str:
+    """Case / whitespace-insensitive form of a user query for coalescing keys."""
+    return " ".join(text.lower().split())
+
+
+class SingleFlight:
+    """
+    Runs at most one coroutine per key at a time.
+
+    Callers that arrive while a call for the same key is in flight await
+    the same task instead of starting their own. One caller being cancelled
+    does not cancel the shared task for the others; it is only cancelled
+    once every caller waiting on it has gone. Results are shared as-is -
+    return immutable values or copy them per caller.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[Hashable, int] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+            logger.debug("%s: joined in-flight call (%d shared so far)", self.name, self.shared)
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda done: self._forget(key, done))
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._inflight.get(key) is task and self._waiters[key] == 1 and not task.done():
+                # Last interested caller left - stop the backend call too
+                task.cancel()
+            raise
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: Hashable, done: asyncio.Task) -> None:
+        if self._inflight.get(key) is done:
+            del self._inflight[key]
+            del self._waiters[key]
+        # Mark the exception retrieved if every caller was cancelled
+        if not done.cancelled():
+            done.exception()
@@ -0,0 +1,82 @@
+"""
+Stream LLM replies into Telegram by progressively editing one message
+"""
+
+import asyncio
+import time
+from contextlib import aclosing
+from typing import AsyncIterator
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+# Telegram's maximum message length
+MAX_MESSAGE_CHARS = 4096
+CURSOR = " ▌"
+
+
+async def _edit(message: Message, text: str) -> float:
+    """Edit message text; returns seconds Telegram asked us to back off (0 if none)."""
+    try:
+        await message.edit_text(text)
+    except RetryAfter as e:
+        retry_after = e.retry_after
+        return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+    except BadRequest as e:
+        # Same text as before - harmless
+        if "not modified" not in str(e).lower():
+            raise
+    return 0.0
+
+
+async def stream_reply(incoming: Message, chunks: AsyncIterator[str], edit_interval: float,
+                       placeholder: str = "…") -> str:
+    """
+    Reply to `incoming` with a placeholder and edit it as chunks arrive.
+
+    Edits are throttled to one per `edit_interval` seconds (and pushed back
+    further when Telegram answers RetryAfter). Text beyond Telegram's
+    message limit is sent as follow-up messages once the stream ends. If
+    the stream fails, the placeholder is deleted and the error re-raised.
+
+    Returns:
+        The full reply text
+    """
+    sent = await incoming.reply_text(placeholder)
+    text = ""
+    shown = placeholder
+    next_edit = time.monotonic() + edit_interval
+
+    try:
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                text += chunk
+                now = time.monotonic()
+                if now < next_edit or not text.strip():
+                    continue
+                preview = text[:MAX_MESSAGE_CHARS - len(CURSOR)] + CURSOR
+                if preview != shown:
+                    backoff = await _edit(sent, preview)
+                    if not backoff:
+                        # Only text Telegram accepted counts as shown
+                        shown = preview
+                    next_edit = now + max(edit_interval, backoff)
+    except BaseException:
+        try:
+            await sent.delete()
+        except Exception:
+            pass
+        raise
+
+    text = text.strip() or "Sorry, I couldn't come up with an answer. Please try again."
+    first, rest = text[:MAX_MESSAGE_CHARS], text[MAX_MESSAGE_CHARS:]
+    if first != shown:
+        backoff = await _edit(sent, first)
+        if backoff:
+            # Final text must land - wait out the flood limit once
+            await asyncio.sleep(backoff)
+            await _edit(sent, first)
+    while rest:
+        await incoming.reply_text(rest[:MAX_MESSAGE_CHARS])
+        rest = rest[MAX_MESSAGE_CHARS:]
+    return text
@@ -2,6 +2,14 @@
 User profile management - stores user information for scheme matching
 """
 
+import hashlib
+from collections import deque
+
+from app.config import PROFILE_RAW_TEXT_LIMIT
+
+# Fields that do not affect which schemes a user is eligible for
+NON_ELIGIBILITY_FIELDS = ("raw_text", "language")
+
 class UserProfile:
     """Stores user information provided during conversation."""
     
@@ -21,9 +29,20 @@ class UserProfile:
             "family_income": None,
             "has_land": None,
             "language": "English",  # Default language
-            "raw_text": []  # Store raw user messages for AI context
+            "raw_text": deque(maxlen=PROFILE_RAW_TEXT_LIMIT)  # Last raw user messages for AI context
         }
     
+    @classmethod
+    def from_dict(cls, chat_id: str, profile_data: dict) -> "UserProfile":
+        """Rebuild a profile from saved profile_data (unknown keys are ignored)."""
+        profile = cls(chat_id)
+        for key, value in profile_data.items():
+            if key == "raw_text":
+                profile.profile_data["raw_text"].extend(value or [])
+            else:
+                profile.add_info(key, value)
+        return profile
+    
     def add_info(self, key: str, value):
         """Add or update user information."""
         if key in self.profile_data:
@@ -38,39 +57,59 @@ class UserProfile:
         return self.profile_data
     
     def get_profile_summary(self) -> str:
-        """Get a text summary of collected information."""
+        """Get a text summary of collected information (raw messages are not included)."""
         summary = []
         for key, value in self.profile_data.items():
             if value and key != "raw_text":
                 summary.append(f"{key}: {value}")
-        
-        if self.profile_data["raw_text"]:
-            summary.append(f"\nUser messages: {' | '.join(self.profile_data['raw_text'][:5])}")
-        
         return "\n".join(summary)
     
+    def get_eligibility_summary(self) -> str:
+        """Get a text summary of the structured fields only (no raw messages)."""
+        summary = []
+        for key, value in self.profile_data.items():
+            if value and key not in NON_ELIGIBILITY_FIELDS:
+                summary.append(f"{key}: {value}")
+        return "\n".join(summary)
+    
+    def get_fingerprint(self) -> str:
+        """
+        Stable hash of the normalized structured profile.
+        
+        Users with identical profiles (e.g. "20, Male, Student, Maharashtra")
+        share a fingerprint, so eligibility answers can be reused across them.
+        """
+        normalized = sorted(
+            (key, " ".join(str(value).lower().split()))
+            for key, value in self.profile_data.items()
+            if value is not None and key not in NON_ELIGIBILITY_FIELDS
+        )
+        raw = "|".join(f"{key}={value}" for key, value in normalized)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+    
     def is_empty(self) -> bool:
         """Check if profile has any meaningful data."""
         return all(v is None for k, v in self.profile_data.items() if k != "raw_text") and not self.profile_data["raw_text"]
 
 
-# Global storage for user profiles
-user_profiles: dict[str, UserProfile] = {}
-
+# Profiles live in the chat's session (app/session_store.py), which persists them
 
 def get_or_create_profile(chat_id: str) -> UserProfile:
     """Get existing profile or create new one."""
-    if chat_id not in user_profiles:
-        user_profiles[chat_id] = UserProfile(chat_id)
-    return user_profiles[chat_id]
+    from app.session_store import get_sessions
+    return get_sessions().get(chat_id).profile
 
 
 def get_profile(chat_id: str) -> UserProfile | None:
     """Get user profile by chat ID."""
-    return user_profiles.get(chat_id)
+    from app.session_store import get_sessions
+    session = get_sessions().get(chat_id, create=False)
+    return session.profile if session else None
 
 
 def clear_profile(chat_id: str):
     """Clear user profile."""
-    if chat_id in user_profiles:
-        del user_profiles[chat_id]
+    from app.session_store import get_sessions
+    session = get_sessions().get(chat_id, create=False)
+    if session:
+        session.profile = UserProfile(chat_id)
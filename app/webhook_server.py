@@ -0,0 +1,129 @@
+"""
+Webhook mode: one aiohttp server on the bot's event loop receives
+Telegram updates and serves the health, readiness and metrics routes.
+
+Telegram POSTs each update to WEBHOOK_URL + WEBHOOK_PATH with the secret
+registered in set_webhook() in the X-Telegram-Bot-Api-Secret-Token
+header; requests without it are rejected. Accepted updates go straight
+onto the Application's update_queue, so the handlers (and the
+concurrent update processor) run exactly as they do under polling.
+
+To try it locally, POST a recorded update with the secret header:
+    curl -H "X-Telegram-Bot-Api-Secret-Token: $WEBHOOK_SECRET" \\
+         -H "Content-Type: application/json" -d @update.json localhost:$PORT/telegram
+"""
+
+import asyncio
+import hmac
+import json
+import secrets
+import signal
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from app import metrics
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+APPLICATION_KEY = web.AppKey("application", Application)
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.Response(text="I am alive! Bot is running.")
+
+
+async def healthz(request: web.Request) -> web.Response:
+    status, body = metrics.health_response()
+    return web.Response(status=status, text=body)
+
+
+async def readyz(request: web.Request) -> web.Response:
+    status, body = metrics.readiness_response()
+    return web.Response(status=status, text=body, content_type="application/json")
+
+
+async def prometheus_metrics(request: web.Request) -> web.Response:
+    status, body = metrics.metrics_response()
+    return web.Response(status=status, body=body.encode("utf-8"), headers={"Content-Type": metrics.CONTENT_TYPE})
+
+
+def make_webhook_handler(secret: str):
+    async def receive_update(request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), secret.encode()):
+            return web.Response(status=403, text="Forbidden")
+        try:
+            data = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.Response(status=400, text="Invalid JSON")
+
+        application = request.app[APPLICATION_KEY]
+        try:
+            update = Update.de_json(data, application.bot)
+        except Exception as e:
+            print(f"[WEBHOOK] Could not parse update: {e}")
+            return web.Response(status=400, text="Invalid update")
+        # Acknowledge at once; Telegram retries (and holds back later updates) on slow replies
+        await application.update_queue.put(update)
+        return web.Response(text="OK")
+
+    return receive_update
+
+
+def build_web_app(application: Application, path: str, secret: str) -> web.Application:
+    """aiohttp app with the health / readiness / metrics routes and the webhook endpoint at `path`."""
+    web_app = web.Application()
+    web_app[APPLICATION_KEY] = application
+    web_app.router.add_get("/", health)
+    web_app.router.add_get("/healthz", healthz)
+    web_app.router.add_get("/readyz", readyz)
+    web_app.router.add_get("/metrics", prometheus_metrics)
+    web_app.router.add_post(path, make_webhook_handler(secret))
+    return web_app
+
+
+async def run_webhook(application: Application, port: int, url: str, path: str = "/telegram",
+                      secret: str = "") -> None:
+    """
+    Start the bot, register the webhook and serve until SIGINT / SIGTERM.
+
+    An empty `secret` is replaced by a random one; it is registered again
+    on every start, so it need not be stable.
+    """
+    if not url:
+        raise ValueError("WEBHOOK_URL must be set in webhook mode")
+    secret = secret or secrets.token_urlsafe(32)
+    webhook_url = url.rstrip("/") + path
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: rely on KeyboardInterrupt
+            pass
+
+    runner = web.AppRunner(build_web_app(application, path, secret), access_log=None)
+    await application.initialize()
+    # run_polling() / run_webhook() call these hooks; with our own server we do
+    if application.post_init:
+        await application.post_init(application)
+    try:
+        await application.start()
+        await application.bot.set_webhook(webhook_url, secret_token=secret, allowed_updates=Update.ALL_TYPES)
+        await runner.setup()
+        await web.TCPSite(runner, "0.0.0.0", port).start()
+        print(f"[WEBHOOK] Listening on port {port}, Telegram posts to {webhook_url}")
+        await stop.wait()
+    finally:
+        print("[WEBHOOK] Shutting down...")
+        await runner.cleanup()
+        if application.running:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
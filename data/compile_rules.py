@@ -0,0 +1,19 @@
+import json
+import os
+import sys
+
+# Allow importing the app package when run as `python compile_rules.py` from data/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.eligibility_rules import load_rules, source_digest, write_rules
+
+# Load the scheme details table
+with open('scheme_details.json', 'r', encoding='utf-8') as f:
+    scheme_details = json.load(f)
+
+# Compile eligibility text into structured rules
+write_rules(scheme_details, 'scheme_rules.json', source_digest('scheme_details.json'))
+
+rules = load_rules('scheme_rules.json')
+compiled = sum(1 for r in rules.values() if r["compiled"])
+print(f"✓ Created scheme_rules.json with {len(rules)} schemes ({compiled} fully compiled, "
+      f"{len(rules) - compiled} partly left to the LLM)")
@@ -1,8 +1,17 @@
 import json
+import os
+import sys
+
+# Allow importing the app package when run as `python file_split.py` from data/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.catalog_snapshot import write_snapshot
+from app.eligibility_rules import write_rules
 
 INPUT_FILE = "final_sequential_ids.json"
 MASTER_FILE = "scheme_master.json"
 DETAILS_FILE = "scheme_details.json"
+SNAPSHOT_FILE = "scheme_catalog.bin"
+RULES_FILE = "scheme_rules.json"
 
 # Load original data
 with open(INPUT_FILE, "r", encoding="utf-8") as f:
@@ -40,6 +49,17 @@ with open(MASTER_FILE, "w", encoding="utf-8") as f:
 with open(DETAILS_FILE, "w", encoding="utf-8") as f:
     json.dump(details_table, f, indent=2, ensure_ascii=False)
 
+# Write compiled binary snapshot (MASTER joined with DETAILS)
+write_snapshot(
+    [{**m, **d} for m, d in zip(master_table, details_table)],
+    SNAPSHOT_FILE
+)
+
+# Write compiled eligibility rules
+write_rules(details_table, RULES_FILE)
+
 print("✅ Split completed successfully")
 print("📁 Created:", MASTER_FILE)
 print("📁 Created:", DETAILS_FILE)
+print("📁 Created:", SNAPSHOT_FILE)
+print("📁 Created:", RULES_FILE)
@@ -1,4 +1,11 @@
 import json
+import os
+import sys
+
+# Allow importing the app package when run as `python split_schemes.py` from data/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.catalog_snapshot import write_snapshot
+from app.eligibility_rules import source_digest, write_rules
 
 # Load the original final.json
 with open('final.json', 'r', encoding='utf-8') as f:
@@ -38,5 +45,16 @@ with open('scheme_master.json', 'w', encoding='utf-8') as f:
 with open('scheme_details.json', 'w', encoding='utf-8') as f:
     json.dump(scheme_details, f, ensure_ascii=False, indent=2)
 
+# Save compiled binary snapshot (master joined with details)
+write_snapshot(
+    [{**m, **d} for m, d in zip(scheme_master, scheme_details)],
+    'scheme_catalog.bin'
+)
+
+# Save compiled eligibility rules
+write_rules(scheme_details, 'scheme_rules.json', source_digest('scheme_details.json'))
+
 print(f"✓ Created scheme_master.json with {len(scheme_master)} schemes")
 print(f"✓ Created scheme_details.json with {len(scheme_details)} schemes")
+print(f"✓ Created scheme_catalog.bin with {len(scheme_master)} schemes")
+print(f"✓ Created scheme_rules.json with {len(scheme_details)} schemes")
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Importing app modules reads app.config; keep tests offline and off the real session database
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "1:test")
+os.environ["SESSION_DB_PATH"] = ""
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
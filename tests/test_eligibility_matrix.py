@@ -0,0 +1,54 @@
+import numpy as np
+
+from app.catalog import Scheme
+from app.eligibility_matrix import EligibilityMatrix
+
+
+def _scheme(scheme_id, name, state="All India", tags=()):
+    return Scheme.from_tables(
+        {"scheme_id": scheme_id, "scheme_name": name},
+        {"state": state, "tags": list(tags), "objective": "", "eligibility": []},
+    )
+
+
+SCHEMES = [
+    _scheme(1, "Scholarship For Girl Students", tags=["Education"]),
+    _scheme(2, "Kerala Farmers Pension", state="Kerala", tags=["Agriculture"]),
+    _scheme(3, "Scholarship For Girl Students Abroad", tags=["Education"]),
+    _scheme(4, "Haryana Farmers Support", state="Haryana", tags=["Agriculture"]),
+    _scheme(5, "Scholarship For Girl Students In Hostels", tags=["Education"]),
+]
+
+
+def _matrix():
+    return EligibilityMatrix(SCHEMES, {})
+
+
+def test_storage_is_one_entry_per_set_feature():
+    matrix = _matrix()
+    assert len(matrix.rows) == len(matrix.columns) == len(matrix.weights)
+    assert len(matrix.rows) < len(SCHEMES) * len(matrix.features)
+
+
+def test_scores_match_the_dense_product():
+    matrix = _matrix()
+    dense = np.zeros((len(SCHEMES), len(matrix.features)), dtype=np.float32)
+    dense[matrix.rows, matrix.columns] = matrix.weights
+    vector = matrix.vectorize({"gender": "Female", "occupation": "Student", "state": "Kerala"})
+    assert np.allclose(matrix.scores(vector), dense @ vector)
+
+
+def test_top_k_keeps_ties_in_file_order():
+    matrix = _matrix()
+    vector = matrix.vectorize({"gender": "Female", "occupation": "Student"})
+    # Schemes 1, 3 and 5 score the same; the earliest rows win
+    assert matrix.top_k(vector, 2) == [1, 3]
+    assert matrix.top_k(vector, 2, exclude=[1]) == [3, 5]
+
+
+def test_state_mask_drops_schemes_limited_to_other_states():
+    matrix = _matrix()
+    profile = {"occupation": "Farmer", "state": "Kerala"}
+    vector = matrix.vectorize(profile)
+    assert matrix.top_k(vector, 5, mask=matrix.state_mask(profile)) == [2]
+    assert matrix.state_mask({}) is None
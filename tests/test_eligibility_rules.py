@@ -0,0 +1,104 @@
+import pytest
+
+import json
+
+from app.catalog_manager import CatalogManager
+from app.eligibility_rules import (
+    StaleRulesError,
+    compile_eligibility,
+    evaluate_rules,
+    load_rules,
+    source_digest,
+    write_rules,
+)
+
+
+def test_compiles_known_templates():
+    rules = compile_eligibility([
+        "The applicant should be a woman.",
+        "Age between 18 and 40 years",
+        "The applicant must be a resident of Kerala.",
+    ])
+    assert rules["compiled"]
+    assert rules["gender"] == "Female"
+    assert (rules["age_min"], rules["age_max"]) == (18, 40)
+    assert rules["states"] == ("Kerala",)
+
+
+def test_unknown_lines_are_kept_unparsed():
+    rules = compile_eligibility(["Should have passed class 12 with 60% marks"])
+    assert not rules["compiled"]
+    assert rules["unparsed"] == ("Should have passed class 12 with 60% marks",)
+
+
+def test_rules_are_read_only():
+    rules = compile_eligibility(["The applicant should be a woman."])
+    with pytest.raises(TypeError):
+        rules["gender"] = "Male"
+    assert isinstance(rules["states"], tuple)
+
+
+def test_eligible_when_every_criterion_is_met():
+    rules = compile_eligibility(["The applicant should be a woman.", "Age between 18 and 40 years"])
+    verdict, reason = evaluate_rules(rules, {"gender": "Female", "age": 30})
+    assert verdict is True
+    assert "age 30" in reason
+
+
+def test_violated_necessary_condition_excludes():
+    rules = compile_eligibility(["The applicant must be a resident of Kerala.", "Something else entirely"])
+    verdict, reason = evaluate_rules(rules, {"state": "Delhi"})
+    assert verdict is False
+    assert "Kerala" in reason
+
+
+def test_missing_profile_data_is_undecided():
+    rules = compile_eligibility(["Age between 18 and 40 years"])
+    assert evaluate_rules(rules, {}) == (None, "")
+
+
+def test_no_criteria_is_undecided_not_eligible():
+    assert evaluate_rules(compile_eligibility([]), {"gender": "Female", "age": 30}) == (None, "")
+    assert evaluate_rules(None, {"age": 30}) == (None, "")
+
+
+def test_write_and_load_round_trip(tmp_path):
+    path = tmp_path / "rules.json"
+    write_rules([{"scheme_id": 7, "eligibility": ["The applicant should be a woman."]}], str(path), "abc")
+    rules = load_rules(str(path), "abc")
+    assert list(rules) == [7]
+    assert rules[7]["gender"] == "Female"
+    assert isinstance(rules[7]["unparsed"], tuple)
+    with pytest.raises(StaleRulesError):
+        load_rules(str(path), "other")
+
+
+def test_digest_ignores_line_endings(tmp_path):
+    unix, windows = tmp_path / "a.json", tmp_path / "b.json"
+    unix.write_bytes(b'[\n  {"scheme_id": 1}\n]\n')
+    windows.write_bytes(b'[\r\n  {"scheme_id": 1}\r\n]\r\n')
+    assert source_digest(str(unix)) == source_digest(str(windows))
+
+
+def _tables(tmp_path):
+    master, details = tmp_path / "master.json", tmp_path / "details.json"
+    master.write_text(json.dumps([{"scheme_id": 1, "scheme_name": "Women Scheme"}]))
+    details.write_text(json.dumps([{"scheme_id": 1, "eligibility": ["The applicant should be a woman."]}]))
+    return str(master), str(details)
+
+
+def test_catalog_uses_rules_compiled_from_current_details(tmp_path):
+    master, details = _tables(tmp_path)
+    rules_path = str(tmp_path / "rules.json")
+    write_rules(json.load(open(details)), rules_path, source_digest(details))
+    catalog = CatalogManager(master, details, rules_path=rules_path).get()
+    assert catalog.rules[1]["gender"] == "Female"
+
+
+def test_stale_rules_disable_the_engine_or_fail_when_required(tmp_path):
+    master, details = _tables(tmp_path)
+    rules_path = str(tmp_path / "rules.json")
+    write_rules(json.load(open(details)), rules_path, "outdated")
+    assert not CatalogManager(master, details, rules_path=rules_path).get().rules
+    with pytest.raises(StaleRulesError):
+        CatalogManager(master, details, rules_path=rules_path, rules_required=True).get()
@@ -0,0 +1,55 @@
+from app.indic import IndicLexicon, detect_script, phonetic_key, romanize
+
+LEXICON = IndicLexicon(
+    [
+        {"en": ["farmer", "agriculture"], "forms": ["किसान", "kisan", "kisaan"]},
+        {"en": ["abroad", "overseas"], "forms": ["विदेश", "परदेश", "videsh", "pardesh"]},
+        {"en": ["scholarship"], "forms": ["छात्रवृत्ति", "chhatravriti", "wazifa"]},
+    ],
+    stopwords=["के", "लिए"],
+)
+
+
+def test_detect_script():
+    assert detect_script("scholarship for girls") == "latin"
+    assert detect_script("किसान योजना") == "devanagari"
+    assert detect_script("কৃষক") == "bengali"
+
+
+def test_romanize_shares_one_table_across_scripts():
+    assert romanize("किसान") == "kisan"
+    # Same letters in the Bengali block
+    assert phonetic_key(romanize("কিসান")) == phonetic_key(romanize("किसान"))
+
+
+def test_indic_words_map_to_catalog_terms():
+    assert LEXICON.translate("किसान के लिए") == "farmer agriculture"
+
+
+def test_unknown_indic_word_is_romanized():
+    assert LEXICON.translate("योजना") == "yojana"
+
+
+def test_latin_exact_form_expands():
+    assert LEXICON.translate("kisan yojana") == "kisan farmer agriculture yojana"
+
+
+def test_unknown_latin_spelling_falls_back_to_phonetic_key():
+    assert LEXICON.translate("kisaaan") == "kisaaan farmer agriculture"
+
+
+def test_state_names_do_not_expand_phonetically():
+    # "pradesh" has the same phonetic key as "pardesh" (abroad)
+    assert LEXICON.translate("schemes in Madhya Pradesh") == "schemes in Madhya Pradesh"
+
+
+def test_catalog_words_do_not_expand_phonetically():
+    assert phonetic_key("kissan") == phonetic_key("kisan")
+    assert LEXICON.translate("kissan", vocabulary={"kissan"}) == "kissan"
+    assert LEXICON.translate("kissan") == "kissan farmer agriculture"
+
+
+def test_madhya_pradesh_search_tokens_stay_literal():
+    from app.schemes_service import search_tokens
+
+    assert search_tokens("schemes in Madhya Pradesh") == ["schemes", "madhya", "pradesh"]
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+from app.llm_batcher import EligibilityBatcher, parse_single_response
+
+
+class FakeLLM:
+    def __init__(self, answer, delay=0.0):
+        self.answer = answer
+        self.delay = delay
+        self.prompts = []
+
+    async def __call__(self, prompt, priority):
+        self.prompts.append((prompt, priority))
+        await asyncio.sleep(self.delay)
+        return self.answer
+
+
+def _submit(batcher, user, scheme_ids, **kwargs):
+    lines = [f"ID {i}: scheme {i}" for i in scheme_ids]
+    return batcher.submit(f"prompt for {user}", user, lines, scheme_ids, **kwargs)
+
+
+def test_concurrent_requests_share_one_call():
+    llm = FakeLLM(json.dumps({
+        "U1": [{"scheme_id": "1", "eligibility_reason": "a"}, {"scheme_id": 3}],
+        "U2": [{"scheme_id": 3.0}, {"scheme_id": "x"}, {"scheme_id": 3}],
+    }))
+
+    async def run():
+        batcher = EligibilityBatcher(llm, window=0.01, max_batch=8, timeout=1.0)
+        return await asyncio.gather(_submit(batcher, "u1", [1, 2]), _submit(batcher, "u2", [3]))
+
+    first, second = asyncio.run(run())
+    assert len(llm.prompts) == 1
+    # ids are coerced to int; ids off the caller's shortlist and repeats are dropped
+    assert first == [{"scheme_id": 1, "eligibility_reason": "a"}]
+    assert second == [{"scheme_id": 3}]
+
+
+def test_single_request_answer_is_validated():
+    assert parse_single_response('[{"scheme_id": "2"}, {"scheme_id": 9}, "junk"]', [2]) == [{"scheme_id": 2}]
+
+
+def test_each_caller_keeps_its_own_timeout():
+    llm = FakeLLM(json.dumps({"U1": [{"scheme_id": 1}], "U2": [{"scheme_id": 2}]}), delay=0.1)
+
+    async def run():
+        batcher = EligibilityBatcher(llm, window=0.01, max_batch=8, timeout=1.0)
+        return await asyncio.gather(
+            _submit(batcher, "hurried", [1], timeout=0.05),
+            _submit(batcher, "patient", [2]),
+        )
+
+    hurried, patient = asyncio.run(run())
+    assert hurried is None
+    assert patient == [{"scheme_id": 2}]
+
+
+def test_propagated_errors_reach_every_caller():
+    class Busy(Exception):
+        pass
+
+    async def invoke(prompt, priority):
+        raise Busy()
+
+    async def run():
+        batcher = EligibilityBatcher(invoke, window=0.01, max_batch=2, timeout=1.0, propagate=(Busy,))
+        return await asyncio.gather(_submit(batcher, "a", [1]), _submit(batcher, "b", [2]), return_exceptions=True)
+
+    assert all(isinstance(r, Busy) for r in asyncio.run(run()))
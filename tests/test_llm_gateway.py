@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import groq
+import httpx
+import pytest
+
+from app.llm_gateway import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, LLMBusyError, LLMGateway, TokenBucket
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """ainvoke raises the queued errors first, then echoes the prompt."""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.started = []
+
+    async def ainvoke(self, messages):
+        self.started.append((messages[0].content, time.monotonic()))
+        await asyncio.sleep(self.delay)
+        if self.errors:
+            raise self.errors.pop(0)
+        return Reply(messages[0].content)
+
+
+def _rate_limited(retry_after):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": str(retry_after)}, request=request)
+    return groq.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_token_bucket_goes_into_debt():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    now[0] += 1.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_caller_waiting_for_budget_holds_no_slot():
+    async def run():
+        gateway = LLMGateway(FakeLLM(), max_concurrency=1, rpm=1, tpm=0)
+        await gateway.ainvoke("first")
+        # Out of requests for this minute: the second caller sleeps before taking a slot
+        waiting = asyncio.create_task(gateway.ainvoke("second"))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        assert gateway.active == 0 and gateway.queued == 0
+        waiting.cancel()
+
+    asyncio.run(run())
+
+
+def test_rate_limit_pauses_every_caller():
+    llm = FakeLLM([_rate_limited(0.2)], delay=0.01)
+
+    async def run():
+        gateway = LLMGateway(llm, max_concurrency=4, rpm=0, tpm=0, base_delay=0.01)
+        first = asyncio.create_task(gateway.ainvoke("first"))
+        await asyncio.sleep(0.05)
+        assert gateway.tripped
+        paused_at = time.monotonic()
+        assert (await gateway.ainvoke("second")).content == "second"
+        assert (await first).content == "first"
+        return gateway, paused_at
+
+    gateway, paused_at = asyncio.run(run())
+    assert gateway.rate_limited == 1 and gateway.retries == 1
+    # Nothing was sent while the pause from retry-after was running
+    later = [started for prompt, started in llm.started[1:]]
+    assert min(later) >= paused_at + 0.1
+
+
+def test_gives_up_with_llm_busy_error():
+    llm = FakeLLM([_rate_limited(0)] * 3)
+
+    async def run():
+        gateway = LLMGateway(llm, max_concurrency=1, rpm=0, tpm=0, max_retries=2, base_delay=0.001)
+        with pytest.raises(LLMBusyError):
+            await gateway.ainvoke("hello")
+        return gateway
+
+    gateway = asyncio.run(run())
+    assert gateway.failures == 1 and gateway.calls == 3
+
+
+def test_interactive_callers_go_before_background_ones():
+    llm = FakeLLM(delay=0.02)
+
+    async def run():
+        gateway = LLMGateway(llm, max_concurrency=1, rpm=0, tpm=0)
+        busy = asyncio.create_task(gateway.ainvoke("busy"))
+        await asyncio.sleep(0.005)
+        background = asyncio.create_task(gateway.ainvoke("background", PRIORITY_BACKGROUND))
+        await asyncio.sleep(0.005)
+        interactive = asyncio.create_task(gateway.ainvoke("interactive", PRIORITY_INTERACTIVE))
+        await asyncio.gather(busy, background, interactive)
+
+    asyncio.run(run())
+    assert [prompt for prompt, _ in llm.started] == ["busy", "interactive", "background"]
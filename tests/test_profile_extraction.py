@@ -0,0 +1,49 @@
+import pytest
+
+from app.profile_extraction import extract_profile_fields
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I am a 22-year-old student from Maharashtra", {"age": 22, "occupation": "Student", "state": "Maharashtra"}),
+    ("I am 25 years old", {"age": 25}),
+    ("my income is 2 lakh", {"income": 200_000}),
+    ("I earn 15000 per month", {"income": 180_000}),
+    ("we are farmers", {"occupation": "Farmer"}),
+    ("we are small farmers from Punjab", {"occupation": "Farmer", "state": "Punjab"}),
+    ("I am 22 years", {"age": 22}),
+    ("salary: 25,000", {"income": 25_000}),
+    ("income of Rs 1.5 lakh", {"income": 150_000}),
+    ("low income, 20 years old", {"family_income": "Low", "age": 20}),
+    ("I earn nothing, I am 20 years old", {"age": 20}),
+    ("I am a woman looking for schemes", {"gender": "Female"}),
+    ("I am SC", {"caste": "SC"}),
+])
+def test_extracts_fields(text, expected):
+    assert extract_profile_fields(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "tell me about pm kisan",
+    "Mahila samman scheme details",
+    "kisan credit card",
+])
+def test_scheme_names_do_not_change_the_profile(text):
+    assert extract_profile_fields(text) == {}
+
+
+@pytest.mark.parametrize("text", ["I have lived here for 5 years", "I have 2 years of experience"])
+def test_durations_are_not_ages(text):
+    assert "age" not in extract_profile_fields(text)
+
+
+@pytest.mark.parametrize("text", ["scholarship for girls", "schemes for farmers", "help for women"])
+def test_plurals_describe_the_scheme_not_the_user(text):
+    assert extract_profile_fields(text) == {}
+
+
+def test_small_bare_number_is_not_an_income():
+    assert extract_profile_fields("income 20") == {}
+
+
+def test_st_in_a_name_is_not_a_caste():
+    assert "caste" not in extract_profile_fields("I study at St. Xavier's")
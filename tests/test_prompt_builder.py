@@ -0,0 +1,55 @@
+from app.prompt_builder import PromptBuilder, count_tokens, truncate_to_tokens
+
+
+def test_count_tokens_heuristic():
+    assert count_tokens("") == 0
+    assert count_tokens("a farmer") == 3
+    # Long words cost one token per ~4 characters, punctuation one each
+    assert count_tokens("scholarships!") == 4
+    # Non-Latin scripts cost one token per ~2 characters (vowel signs included)
+    assert count_tokens("किसान") == 3
+    assert count_tokens("किसान योजना") == 6
+
+
+def test_truncate_cuts_at_sentence_boundary():
+    text = "First sentence here. Second sentence is longer than the rest. Third."
+    assert truncate_to_tokens(text, 100) == text
+    assert truncate_to_tokens(text, 6) == "First sentence here."
+
+
+def test_truncate_falls_back_to_words():
+    assert truncate_to_tokens("one two three four five six", 5) == "one two three…"
+
+
+def test_history_keeps_recent_messages_and_summarizes_older_ones():
+    builder = PromptBuilder({"history": 12, "summary": 40})
+    messages = ["hi", "I am 22 years old from Kerala", "I study engineering", "what about loans", "and grants"]
+    section = builder.history_section("1", messages)
+    lines = section.splitlines()
+    assert lines[-2:] == ["- what about loans", "- and grants"]
+    # Small talk is dropped, facts survive in the summary
+    assert lines[0] == "Earlier: I am 22 years old from Kerala | I study engineering"
+
+
+def test_history_folds_each_message_once():
+    builder = PromptBuilder({"history": 6, "summary": 100})
+    messages = ["my income is 1 lakh", "scheme one", "scheme two"]
+    builder.history_section("1", messages)
+    section = builder.history_section("1", messages + ["scheme three"])
+    assert section.count("my income is 1 lakh") == 1
+
+    builder.forget("1")
+    assert "Earlier" not in builder.history_section("1", ["scheme three"])
+
+
+def test_schemes_share_the_budget():
+    builder = PromptBuilder({"schemes": 40})
+    long_objective = "This scheme helps students. " * 20
+    section = builder.schemes_section([
+        {"scheme_name": "A", "objective": long_objective},
+        {"scheme_name": "B", "objective": long_objective, "source": "web"},
+    ])
+    assert section.startswith("**Scheme 1: A** [local]\n")
+    assert "**Scheme 2: B** [web]" in section
+    assert count_tokens(section) <= 40 + 2
+    assert builder.schemes_section([]) == ""
@@ -0,0 +1,18 @@
+import json
+
+from app import schemes_service
+
+
+def test_table_loaders_round_trip_the_json_files():
+    with open("data/scheme_master.json", encoding="utf-8") as f:
+        assert schemes_service.load_scheme_master() == json.load(f)
+    with open("data/scheme_details.json", encoding="utf-8") as f:
+        assert schemes_service.load_scheme_details() == json.load(f)
+
+
+def test_sync_search_wrappers_share_the_async_pass():
+    query = "post matric scholarship for scheduled caste students"
+    result = schemes_service.run_search(query)
+    assert result.source == "local"
+    assert schemes_service.search_schemes_as_list(query) == result.as_list(10)
+    assert schemes_service.search_schemes(query).startswith("\n\n**Scheme 1: ")
@@ -0,0 +1,86 @@
+from app.search_index import SchemeSearchIndex, TrigramIndex, bounded_levenshtein, field_tokens, tokenize_query
+
+SCHEMES = [
+    {"scheme_id": 1, "scheme_name": "Scholarship For Girl Students", "tags": ["Education", "Girl"],
+     "objective": "Financial support for girl students in higher education."},
+    {"scheme_id": 2, "scheme_name": "Farmers Crop Insurance", "tags": ["Agriculture"],
+     "objective": "Insurance for farmers against crop loss."},
+    {"scheme_id": 3, "scheme_name": "Forest Dwellers Support", "tags": ["Forest"],
+     "objective": "Support for forest dwelling communities."},
+]
+
+
+def _index():
+    return SchemeSearchIndex(SCHEMES)
+
+
+def test_query_drops_stopwords_and_short_words():
+    assert tokenize_query("What is the scholarship for girls?") == ["scholarship", "girls"]
+
+
+def test_plural_and_prefix_match():
+    index = _index()
+    assert index.matching_ids("girls") == {1}
+    # "farmer" is a prefix of "farmers"
+    assert index.matching_ids("farmer") == {2}
+
+
+def test_no_substring_matches_inside_words():
+    # "est" only occurs inside "forest" - prefixes match, substrings do not
+    assert _index().matching_ids("est") == set()
+
+
+def test_search_splits_exact_and_partial():
+    exact, partial = _index().search(tokenize_query("insurance for farmers"))
+    assert exact == [2]
+    assert partial == []
+    exact, partial = _index().search(["support", "girl"])
+    assert exact == [1]
+    assert partial == [3]
+
+
+def test_from_tokens_matches_records():
+    rows = [(s["scheme_id"], field_tokens(s)) for s in SCHEMES]
+    built = SchemeSearchIndex.from_tokens(rows)
+    index = _index()
+    assert built.vocabulary == index.vocabulary
+    assert built.search(["crop"]) == index.search(["crop"])
+
+
+def test_rank_prefers_name_matches():
+    ranked = _index().rank(tokenize_query("scholarship for girls"))
+    assert ranked[0][0] == 1
+    assert all(score > 0 for _, score in ranked)
+
+
+def test_rank_top_k_keeps_the_best_in_order():
+    index = _index()
+    everything = index.rank(["support", "girl"])
+    assert index.rank(["support", "girl"], top_k=1) == everything[:1]
+
+
+def test_rank_ties_keep_file_order():
+    index = SchemeSearchIndex([
+        {"scheme_id": 5, "scheme_name": "Pension"},
+        {"scheme_id": 4, "scheme_name": "Pension"},
+    ])
+    assert [scheme_id for scheme_id, _ in index.rank(["pension"])] == [5, 4]
+
+
+def test_bounded_levenshtein_stops_past_the_limit():
+    assert bounded_levenshtein("kisan", "kisaan", 2) == 1
+    assert bounded_levenshtein("scholarship", "insurance", 2) == 3
+
+
+def test_trigram_lookup_returns_closest_words():
+    fuzzy = TrigramIndex(["scholarship", "scholar", "insurance"])
+    assert fuzzy.lookup("scholorship") == ("scholarship",)
+    # Too short for typo correction
+    assert fuzzy.lookup("schl") == ()
+
+
+def test_typo_falls_back_to_closest_word():
+    index = _index()
+    assert index.matching_ids("scholorship") == {1}
+    # Known words are never typo-corrected
+    assert index.expand_term("crop") == ("crop",)
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.session_store import Session, SessionCache, SessionStore, SQLiteSessionStore
+
+
+class RecordingStore(SessionStore):
+    def __init__(self, saved=None):
+        self.saved = dict(saved or {})
+        self.load_threads = []
+        self.batches = []
+
+    def load(self, chat_id):
+        self.load_threads.append(threading.current_thread())
+        return self.saved.get(chat_id)
+
+    def write_batch(self, upserts, deletes):
+        self.batches.append((dict(upserts), set(deletes)))
+        for chat_id in deletes:
+            self.saved.pop(chat_id, None)
+        self.saved.update(upserts)
+
+
+def test_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
+
+
+def test_aget_loads_misses_off_the_event_loop():
+    store = RecordingStore({"1": Session("1", memory=["hello"]).to_json()})
+
+    async def run():
+        cache = SessionCache(store, flush_interval=60)
+        session = await cache.aget("1")
+        assert list(session.memory) == ["hello"]
+        assert await cache.aget("1") is session
+        assert await cache.aget("2", create=False) is None
+
+    asyncio.run(run())
+    assert store.load_threads and threading.main_thread() not in store.load_threads
+
+
+def test_flush_writes_only_changed_sessions():
+    store = RecordingStore()
+
+    async def run():
+        cache = SessionCache(store, flush_interval=60)
+        cache.get("1").add_message("hi")
+        await cache.flush()
+        cache.get("1")
+        await cache.flush()
+        return cache
+
+    cache = asyncio.run(run())
+    assert len(store.batches) == 1
+    assert cache.writes == 1
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"))
+    store.write_batch({"1": "{}", "2": "{}"}, [])
+    store.write_batch({}, ["2"])
+    assert store.load("1") == "{}"
+    assert store.load("2") is None
+    assert store.count() == 1
+    store.close()
+
+
+def test_memory_is_a_ring_buffer():
+    session = Session("1")
+    for i in range(100):
+        session.add_message(str(i))
+    assert len(session.memory) < 100
+    assert session.memory[-1] == "99"
+    assert session.message_count == 100
+    restored = Session.from_json("1", session.to_json())
+    assert list(restored.memory) == list(session.memory)
+    assert restored.message_count == 100
+
+
+def test_sweep_evicts_idle_and_over_capacity_sessions():
+    store = RecordingStore()
+    evicted = []
+
+    async def run():
+        cache = SessionCache(store, flush_interval=60, max_sessions=2, idle_ttl=100)
+        cache.on_evict(evicted.append)
+        for chat_id in ("1", "2", "3", "4"):
+            cache.get(chat_id).add_message("hi")
+        # Unsaved sessions are never evicted
+        assert cache.sweep() == 0
+        await cache.flush()
+        cache.get("4")
+        assert cache.sweep(keep={"1"}) == 2
+        return cache
+
+    cache = asyncio.run(run())
+    assert evicted == ["2", "3"]
+    assert "1" in cache and "4" in cache
+
+
+def test_stats_bytes_follow_saves_and_clears():
+    store = RecordingStore()
+
+    async def run():
+        cache = SessionCache(store, flush_interval=60)
+        cache.get("1").add_message("hi")
+        cache.get("2").add_message("héllo")
+        await cache.flush()
+        expected = sum(len(store.saved[c].encode("utf-8")) for c in ("1", "2"))
+        assert cache.stats()["bytes"] == expected
+
+        cache.get("1").add_message("again")
+        await cache.flush()
+        assert cache.stats()["bytes"] == sum(len(store.saved[c].encode("utf-8")) for c in ("1", "2"))
+
+        cache.clear("1")
+        assert cache.stats()["bytes"] == len(store.saved["2"].encode("utf-8"))
+
+    asyncio.run(run())
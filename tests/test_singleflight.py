@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import SingleFlight, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query("  Schemes for   GIRLS ") == "schemes for girls"
+
+
+def test_identical_concurrent_calls_share_one_run():
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        assert len(flight) == 0
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert results == ["answer"] * 5
+    assert len(runs) == 1
+    assert flight.calls == 1 and flight.shared == 4
+
+
+def test_different_keys_and_later_calls_run_separately():
+    async def run():
+        flight = SingleFlight("test")
+        await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0)), flight.do("b", lambda: asyncio.sleep(0)))
+        await flight.do("a", lambda: asyncio.sleep(0))
+        return flight
+
+    assert asyncio.run(run()).calls == 3
+
+
+def test_errors_reach_every_caller():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def run():
+        flight = SingleFlight("test")
+        return await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(run()))
+
+
+def test_cancelling_one_caller_keeps_the_call_for_the_others():
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(0.05)
+            return "done"
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        flight = SingleFlight("test")
+        first = asyncio.create_task(flight.do("key", work))
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "done"
+
+        # Once the last caller leaves, the backend call is cancelled too
+        last = asyncio.create_task(flight.do("other", work))
+        await asyncio.sleep(0.01)
+        last.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await last
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [1]
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from app.webhook_server import SECRET_HEADER, build_web_app
+
+SECRET = "s3cret"
+UPDATE = {
+    "update_id": 1,
+    "message": {
+        "message_id": 10,
+        "date": 1700000000,
+        "chat": {"id": 42, "type": "private"},
+        "text": "hello",
+    },
+}
+
+
+def _run(check):
+    async def run():
+        application = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+        async with TestClient(TestServer(build_web_app(application, "/telegram", SECRET))) as client:
+            await check(client, application.update_queue)
+
+    asyncio.run(run())
+
+
+def test_rejects_missing_or_wrong_secret():
+    async def check(client, queue):
+        response = await client.post("/telegram", json=UPDATE)
+        assert response.status == 403
+        response = await client.post("/telegram", json=UPDATE, headers={SECRET_HEADER: "wrong"})
+        assert response.status == 403
+        assert queue.empty()
+
+    _run(check)
+
+
+def test_valid_update_is_queued():
+    async def check(client, queue):
+        response = await client.post("/telegram", json=UPDATE, headers={SECRET_HEADER: SECRET})
+        assert response.status == 200
+        update = queue.get_nowait()
+        assert update.update_id == 1
+        assert update.effective_chat.id == 42
+
+    _run(check)
+
+
+def test_bad_json_is_rejected():
+    async def check(client, queue):
+        response = await client.post(
+            "/telegram", data=b"{not json", headers={SECRET_HEADER: SECRET, "Content-Type": "application/json"}
+        )
+        assert response.status == 400
+        assert queue.empty()
+
+    _run(check)
+
+
+def test_health_route():
+    async def check(client, queue):
+        response = await client.get("/healthz")
+        assert response.status == 200
+
+    _run(check)